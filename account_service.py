@@ -0,0 +1,98 @@
+import asyncio
+from collections import deque
+from OOP.bank_account import AccountRegistry
+
+"""Asyncio front end for Account: many connections can submit transactions concurrently from one event loop instead
+of needing a thread each. Transactions of one account wait in that account's queue and are applied in arrival order;
+everything that piled up while the account waited for its turn is applied in one batch."""
+
+
+class AccountService:
+    """
+    Accepts deposits and withdrawals for the accounts of 'registry' and returns their confirmation codes as
+    awaitables:
+        service = AccountService(registry)
+        code = await service.deposit('A100', 50)
+    Each account has its own queue. The first transaction of an idle account schedules a drain of its queue on the
+    event loop; the drain applies up to 'max_batch' queued transactions in order without yielding, then schedules
+    itself again if more are waiting, so a busy account can't starve the others. Errors (an unknown account,
+    an invalid amount, a failing ledger) are raised by the await of the transaction that caused them.
+    The service must be used from one event loop.
+    """
+    TRANSACTIONS = ('deposit', 'withdraw')
+
+    def __init__(self, registry=None, max_batch=256):
+        if not isinstance(max_batch, int) or max_batch < 1:
+            raise ValueError('Batch size must be a positive integer.')
+        self._registry = AccountRegistry() if registry is None else registry
+        self._max_batch = max_batch
+        self._queues = {}
+        self._closing = False
+        self._idle = None
+        self._batches = 0
+
+    @property
+    def registry(self):
+        return self._registry
+
+    @property
+    def pending(self):
+        """Number of transactions waiting in the queues."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def submit(self, account_number, transaction, value):
+        """Queues a transaction and returns a future of its confirmation code."""
+        if self._closing:
+            raise RuntimeError('The service is closed.')
+        if transaction not in self.TRANSACTIONS:
+            raise ValueError(f'Transaction must be one of {", ".join(self.TRANSACTIONS)}.')
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._queues.get(account_number)
+        if queue is None:
+            queue = self._queues[account_number] = deque()
+            loop.call_soon(self._drain, account_number)
+        queue.append((transaction, value, future))
+        return future
+
+    async def deposit(self, account_number, value):
+        return await self.submit(account_number, 'deposit', value)
+
+    async def withdraw(self, account_number, value):
+        return await self.submit(account_number, 'withdraw', value)
+
+    def _drain(self, account_number):
+        queue = self._queues[account_number]
+        self._batches += 1
+        try:
+            for _ in range(min(len(queue), self._max_batch)):
+                transaction, value, future = queue.popleft()
+                if future.cancelled():
+                    continue
+                try:
+                    code = getattr(self._registry, transaction)(account_number, value)
+                except Exception as ex:  # e.g. an OSError of the ledger, the caller must not wait forever
+                    future.set_exception(ex)
+                else:
+                    future.set_result(code)
+        finally:
+            if queue:
+                asyncio.get_running_loop().call_soon(self._drain, account_number)
+            else:
+                del self._queues[account_number]
+                if not self._queues and self._idle is not None:
+                    self._idle.set()
+
+    async def close(self):
+        """Stops accepting transactions and waits until the queued ones are applied."""
+        self._closing = True
+        if self._idle is None:  # one event for every caller, overlapping close() calls all wait on it
+            self._idle = asyncio.Event()
+        if self._queues:
+            await self._idle.wait()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
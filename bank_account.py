@@ -1,15 +1,36 @@
 from datetime import timedelta, datetime
+import contextlib
 import numbers
 import itertools
+import threading
+import time
 from collections import namedtuple
 
 """The project is a simulation of a bank account where you can deposit and withdraw money.
 After each transaction an unique code is generated based on the time, account number, and type of operation. You can also get your interest paid based on the adjustable interest rate"""
 
 Confirmation = namedtuple('Confirmation', 'account_number transaction_code transaction_id time_utc time')
+InterestPosting = namedtuple('InterestPosting', 'account_numbers interest balances confirmation_codes')
+
+# exact types checked before the slower numbers.Real ABC check, subclasses and other reals still go through the ABC
+_REAL_TYPES = frozenset((int, float))
+
+
+def _numpy():
+    # numpy is only needed by the batch interest posting
+    import numpy as np
+    return np
 
 
 class Timezone:
+    """
+    A named UTC offset. Instances are immutable and hashable; use Timezone.get() to share one instance
+    between everything that uses the same zone.
+    """
+    __slots__ = ('_name', '_hours_offset', '_minutes_offset', '_offset')
+
+    _interned = {}
+
     def __init__(self, name, hours_offset, minutes_offset=0):
         if name is None or len(str(name).strip()) == 0:
             raise ValueError('Timezone name cannot be empty.')
@@ -40,22 +61,135 @@ class Timezone:
     def name(self):
         return self._name
 
+    @classmethod
+    def get(cls, name, hours_offset, minutes_offset=0):
+        """The shared instance of this zone, created (and validated) only the first time it is asked for."""
+        # the types are part of the key: ('UTC', 0.0, 0.0) equals ('UTC', 0, 0) but must still be rejected,
+        # and a name of 1 equals True but becomes another zone name
+        key = (name, hours_offset, minutes_offset, type(name), type(hours_offset), type(minutes_offset))
+        try:
+            return cls._interned[key]
+        except KeyError:
+            hashable = True
+        except TypeError:  # an unhashable name, only the normalized key gets cached
+            hashable = False
+        timezone = cls(name, hours_offset, minutes_offset)
+        # equal zones asked for with different arguments (e.g. ' UTC' and 'UTC') still share one instance
+        timezone = cls._interned.setdefault(timezone._key(), timezone)
+        if hashable:
+            cls._interned.setdefault(key, timezone)
+        return timezone
+
+    def _key(self):
+        return self._name, self._hours_offset, self._minutes_offset
+
     def __eq__(self, other):
         return (isinstance(other, Timezone) and
                 self.name == other.name and
                 self._hours_offset == other._hours_offset and
                 self._minutes_offset == other._minutes_offset)
 
+    def __hash__(self):
+        return hash(self._key())
+
     def __repr__(self):
         return (f"Timezone(name={self.name}, "
                 f"hours_offset={self._hours_offset},"
                 f" minutes_offset={self._minutes_offset}")
 
 
+UTC = Timezone.get('UTC', 0, 0)
+
+
+def _check_timezone(timezone):
+    if timezone is None:
+        return UTC
+    if not isinstance(timezone, Timezone):
+        raise ValueError('Invalid timezone specified.')
+    return timezone
+
+
+def _split_code(confirmation_code):
+    parts = confirmation_code.split('-')
+    if len(parts) != 4:
+        raise ValueError('Invalid confirmation code')
+    return parts
+
+
+def _format_times(raw_dt_utc, timezone):
+    # the time field is always YYYYMMDDHHMMSS, slicing it is several times faster than strptime
+    if len(raw_dt_utc) != 14 or not (raw_dt_utc.isascii() and raw_dt_utc.isdigit()):
+        raise ValueError('Invalid transaction datetime')
+    try:
+        dt_utc = datetime(int(raw_dt_utc[:4]), int(raw_dt_utc[4:6]), int(raw_dt_utc[6:8]),
+                          int(raw_dt_utc[8:10]), int(raw_dt_utc[10:12]), int(raw_dt_utc[12:]))
+    except ValueError as ex:
+        raise ValueError('Invalid transaction datetime') from ex
+    dt_preferred = dt_utc + timezone.offset
+    return dt_utc.isoformat(), f"{dt_preferred.isoformat(' ')} ({timezone.name})"
+
+
+class ConfirmationCodeGenerator:
+    """
+    Builds the confirmation codes '<transaction code>-<account number>-<UTC time>-<prefix><transaction id>'.
+    The UTC time has second resolution, so it is only formatted again when the second changes, and it never goes
+    back even if the system clock does. Transaction ids come from the generator's own counter; give every process
+    (e.g. every worker of a process pool) its own prefix so their codes can't collide. A prefix can't end in a
+    digit, or prefix '1' with id 1100 and prefix '11' with id 100 would give the same code; end it with e.g. '.'.
+    Safe to share between threads: the counter is an itertools.count, whose next() is atomic under the GIL, and the
+    cached time is replaced as one (second, text) tuple, so a thread never sees a second with another second's text.
+    Replacing it takes a lock, once a second, so a thread that read the clock earlier can't put an older time back.
+    """
+    __slots__ = ('_prefix', '_counter', '_stamp', '_stamp_lock')
+
+    def __init__(self, prefix='', start=100):
+        prefix = str(prefix)
+        if '-' in prefix:
+            raise ValueError('Prefix cannot contain "-".')
+        if prefix[-1:].isdigit():
+            raise ValueError('Prefix cannot end with a digit.')
+        self._prefix = prefix
+        self._counter = itertools.count(start)
+        self._stamp = (None, '')
+        self._stamp_lock = threading.Lock()
+
+    @property
+    def prefix(self):
+        return self._prefix
+
+    def timestamp(self):
+        now = int(time.time())
+        second, text = self._stamp
+        if second is not None and now <= second:
+            return text
+        with self._stamp_lock:
+            second, text = self._stamp  # another thread may have stored a newer second meanwhile
+            if second is None or now > second:
+                text = time.strftime('%Y%m%d%H%M%S', time.gmtime(now))
+                self._stamp = (now, text)
+            return text
+
+    def __call__(self, transaction_code, account_number):
+        return f'{transaction_code}-{account_number}-{self.timestamp()}-{self._prefix}{next(self._counter)}'
+
+    def bulk(self, transaction_code, account_numbers):
+        """Codes for many accounts at once, with one timestamp. Ids stay unique when other threads draw codes at the
+        same time, they are just not necessarily consecutive then."""
+        account_numbers = list(account_numbers)
+        head, tail = f'{transaction_code}-', f'-{self.timestamp()}-{self._prefix}'
+        ids = itertools.islice(self._counter, len(account_numbers))
+        return [f'{head}{account_number}{tail}{transaction_id}'
+                for account_number, transaction_id in zip(account_numbers, ids)]
+
+
 class Account:
-    transaction_counter = itertools.count(100)
+    __slots__ = ('_account_number', '_first_name', '_last_name', '_timezone', '_balance')
+
+    # replace it with ConfirmationCodeGenerator(prefix=...) in every worker process to keep codes unique
+    code_generator = ConfirmationCodeGenerator()
+    ledger = None  # a ledger.Ledger that records every transaction, if set
     _interest_rate = 0.5
-    _transaction_codes = {'deposit': 'D', 'withdraw': 'W', 'interest': 'I', 'rejected': 'X'}
+    _transaction_codes = {'deposit': 'D', 'withdraw': 'W', 'interest': 'I', 'rejected': 'X', 'open': 'O'}
 
     def __init__(self, account_number, first_name, last_name, timezone=None, initial_balance=0):
         self._account_number = account_number
@@ -63,9 +197,13 @@ class Account:
         self._last_name = last_name
 
         if timezone is None:
-            timezone = Timezone('UTC', 0, 0)
+            timezone = UTC
         self._timezone = timezone
         self._balance = Account.validate_real_number(initial_balance, min_value=0)
+        if Account.ledger is not None:
+            # without it an account that never transacts, and its initial balance, would be missing from a replay
+            self._record(self.confirmation_code(Account._transaction_codes['open']), 'open', self._balance,
+                         self._balance)
 
     @property
     def account_number(self):
@@ -119,51 +257,95 @@ class Account:
 
     @staticmethod
     def validate_real_number(value, min_value=None):
-        if not isinstance(value, numbers.Real):
+        if type(value) not in _REAL_TYPES and not isinstance(value, numbers.Real):
             raise ValueError('Value must be a real number')
         if min_value is not None and value < min_value:
             raise ValueError(f'Value must be at least {min_value}.')
         return value
 
     def confirmation_code(self, transaction_code):
-        dt_str = datetime.utcnow().strftime('%Y%m%d%H%M%S')
-        return f'{transaction_code}-{self.account_number}-{dt_str}-{next(Account.transaction_counter)}'
+        return Account.code_generator(transaction_code, self.account_number)
 
     @staticmethod
     def validate_name(value, field_title):
-        if value is None or len(str(value).strip()) == 0:
+        if type(value) is str:
+            name = value.strip()
+        else:
+            name = '' if value is None else str(value).strip()
+        if not name:
             raise ValueError(f'{field_title} cannot be empty')
-        return str(value).strip()
+        return name
+
+    @classmethod
+    def load_trusted(cls, rows, timezone=None):
+        """
+        Creates accounts from (account_number, first_name, last_name, balance) rows without validating them, for bulk
+        loads of data that was validated when it was first stored, e.g. the balances from ledger.recover().
+        The names must already be stripped strings and the balances non-negative real numbers. Nothing is recorded
+        in Account.ledger, the accounts are expected to be in it already.
+        """
+        if timezone is None:
+            timezone = UTC
+        new = cls.__new__
+        accounts = []
+        for account_number, first_name, last_name, balance in rows:
+            account = new(cls)
+            account._account_number = account_number
+            account._first_name = first_name
+            account._last_name = last_name
+            account._timezone = timezone
+            account._balance = balance
+            accounts.append(account)
+        return accounts
 
     @staticmethod
     def parse_confirmation_code(confirmation_code, preferred_timezone=None):
-        parts = confirmation_code.split('-')
-        if len(parts) != 4:
-            raise ValueError('Invalid confirmation code')
-
-        transaction_code, account_number, raw_dt_utc, transaction_id = parts
+        timezone = _check_timezone(preferred_timezone)
+        transaction_code, account_number, raw_dt_utc, transaction_id = _split_code(confirmation_code)
+        return Confirmation(account_number, transaction_code, transaction_id, *_format_times(raw_dt_utc, timezone))
 
-        try:
-            dt_utc = datetime.strptime(raw_dt_utc, '%Y%m%d%H%M%S')
-        except ValueError as ex:
-            raise ValueError('Invalid transaction datetime') from ex
-
-        if preferred_timezone is None:
-            preferred_timezone = Timezone('UTC', 0, 0)
-
-        if not isinstance(preferred_timezone, Timezone):
-            raise ValueError('Invalid timezone specified.')
-
-        dt_preferred = dt_utc + preferred_timezone.offset
-        dt_preferred_str = f"{dt_preferred.strftime('%Y-%m-%d %H:%M:%S')} ({preferred_timezone.name()})"
+    @staticmethod
+    def parse_confirmation_codes(confirmation_codes, preferred_timezone=None):
+        """
+        Parses many codes lazily, yielding a Confirmation for each. 'confirmation_codes' is any iterable of codes,
+        e.g. an open log file with one code per line; surrounding whitespace and blank lines are skipped.
+        Codes from the same second share the formatted times, so those are only computed when the second changes.
+        """
+        timezone = _check_timezone(preferred_timezone)
+        last_raw_dt_utc = times = None
+        for confirmation_code in confirmation_codes:
+            confirmation_code = confirmation_code.strip()
+            if not confirmation_code:
+                continue
+            transaction_code, account_number, raw_dt_utc, transaction_id = _split_code(confirmation_code)
+            if raw_dt_utc != last_raw_dt_utc:
+                times = _format_times(raw_dt_utc, timezone)
+                last_raw_dt_utc = raw_dt_utc
+            yield Confirmation(account_number, transaction_code, transaction_id, *times)
 
-        return Confirmation(account_number, transaction_code, transaction_id, dt_utc.isoformat(), dt_preferred_str)
+    @staticmethod
+    def parse_confirmation_codes_columnar(confirmation_codes, preferred_timezone=None):
+        """Like parse_confirmation_codes(), but returns one Confirmation whose fields are lists (columns)."""
+        columns = Confirmation([], [], [], [], [])
+        confirmations = Account.parse_confirmation_codes(confirmation_codes, preferred_timezone)
+        # transposing a bounded chunk of rows at a time is faster than appending value by value
+        while chunk := list(itertools.islice(confirmations, 65536)):
+            for column, values in zip(columns, zip(*chunk)):
+                column.extend(values)
+        return columns
+
+    def _record(self, conf_code, transaction, value, balance):
+        # called before the new balance is stored: if the ledger fails, the balance doesn't change either
+        if Account.ledger is not None:
+            Account.ledger.append(conf_code, self._account_number, transaction, value, balance)
 
     def deposit(self, value):
         value = Account.validate_real_number(value, 0.01)
         transaction_code = Account._transaction_codes['deposit']
         conf_code = self.confirmation_code(transaction_code)
-        self._balance += value
+        balance = self._balance + value
+        self._record(conf_code, 'deposit', value, balance)
+        self._balance = balance
         return conf_code
 
     def withdraw(self, value):
@@ -176,17 +358,214 @@ class Account:
             transaction_code = Account._transaction_codes['withdraw']
 
         conf_code = self.confirmation_code(transaction_code)
-        if accepted:
-            self._balance -= value
+        balance = self._balance - value if accepted else self._balance
+        self._record(conf_code, 'withdraw' if accepted else 'rejected', value, balance)
+        self._balance = balance
         return conf_code
 
     def pay_interest(self):
         interest = self.balance * Account.get_interest_name() / 100
         conf_code = self.confirmation_code(Account._transaction_codes['interest'])
-        self._balance += interest
+        balance = self._balance + interest
+        self._record(conf_code, 'interest', interest, balance)
+        self._balance = balance
         return conf_code
 
 
+class AccountRegistry:
+    """
+    Accounts by account number, split into 'shards' dicts that each have their own lock, so threads working on
+    accounts in different shards don't wait for each other. Lookups are a hash and a dict access.
+    deposit(), withdraw() and transfer() hold the locks of the accounts involved; a transfer locks its two shards
+    in shard order, so two opposite transfers can't deadlock, and it is atomic: no one sees the money in between.
+    """
+    def __init__(self, shards=64):
+        if not isinstance(shards, int) or shards < 1:
+            raise ValueError('Number of shards must be a positive integer.')
+        self._count = shards
+        self._shards = [{} for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def _shard(self, account_number):
+        return hash(account_number) % self._count
+
+    def add(self, account):
+        if not isinstance(account, Account):
+            raise ValueError('Only Account objects can be added.')
+        index = self._shard(account.account_number)
+        with self._locks[index]:
+            if account.account_number in self._shards[index]:
+                raise ValueError(f'Account {account.account_number} already exists.')
+            self._shards[index][account.account_number] = account
+
+    def remove(self, account_number):
+        index = self._shard(account_number)
+        with self._locks[index]:
+            return self._shards[index].pop(account_number)
+
+    def get(self, account_number, default=None):
+        return self._shards[self._shard(account_number)].get(account_number, default)
+
+    def __getitem__(self, account_number):
+        return self._shards[self._shard(account_number)][account_number]
+
+    def __contains__(self, account_number):
+        return account_number in self._shards[self._shard(account_number)]
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+    def __iter__(self):
+        # over a copy, accounts added or removed meanwhile don't break the iteration
+        return iter([account for shard in self._shards for account in list(shard.values())])
+
+    # the hot paths compute the shard inline, a method call per operation is measurable
+    def deposit(self, account_number, value):
+        index = hash(account_number) % self._count
+        with self._locks[index]:
+            return self._shards[index][account_number].deposit(value)
+
+    def withdraw(self, account_number, value):
+        index = hash(account_number) % self._count
+        with self._locks[index]:
+            return self._shards[index][account_number].withdraw(value)
+
+    def transfer(self, from_number, to_number, value):
+        """Moves 'value' between two accounts. Returns the (withdraw, deposit) confirmation codes; a transfer that
+        the balance doesn't cover gets a rejected withdraw code and None, and changes nothing."""
+        if from_number == to_number:
+            raise ValueError('Cannot transfer to the same account.')
+        from_index, to_index = hash(from_number) % self._count, hash(to_number) % self._count
+        if from_index == to_index:
+            with self._locks[from_index]:
+                return self._transfer(from_number, from_index, to_number, to_index, value)
+        first, second = (from_index, to_index) if from_index < to_index else (to_index, from_index)
+        with self._locks[first], self._locks[second]:
+            return self._transfer(from_number, from_index, to_number, to_index, value)
+
+    def _transfer(self, from_number, from_index, to_number, to_index, value):
+        source, target = self._shards[from_index][from_number], self._shards[to_index][to_number]
+        withdraw_code = source.withdraw(value)
+        if withdraw_code[0] == Account._transaction_codes['rejected']:
+            return withdraw_code, None
+        try:
+            return withdraw_code, target.deposit(value)
+        except Exception:
+            # the withdrawal is already in the ledger, so it is reversed with a deposit rather than silently
+            source.deposit(value)
+            raise
+
+    def balances(self):
+        """
+        {account number: balance} of all accounts at one moment; every shard is locked while it is copied.
+        Can be a Ledger's balances function for periodic snapshots, those are taken outside the deposit's locks.
+        """
+        with self.locked():
+            return {number: account.balance for shard in self._shards for number, account in shard.items()}
+
+    @contextlib.contextmanager
+    def locked(self):
+        """Holds every shard lock, no transaction of the registry runs meanwhile. The locks are not reentrant, don't
+        call the registry's transaction methods inside."""
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield self
+        finally:
+            for lock in self._locks:
+                lock.release()
+
+
+class InterestBatch:
+    """
+    Interest posting for many accounts in one vectorized pass. The balances of 'accounts' (any iterable of Account,
+    e.g. an AccountRegistry) are copied into a NumPy column; post() applies the interest to the column and creates
+    the confirmation codes in bulk, write_back() stores the new balances in the Account objects and records the
+    posting in Account.ledger. Nothing is paid or recorded until write_back().
+    A transaction between loading and write_back() makes write_back() fail instead of being overwritten; the shards
+    of an AccountRegistry are locked while it is loaded and written back. post_interest() does it all in one step.
+    """
+    def __init__(self, accounts):
+        self._registry = accounts if isinstance(accounts, AccountRegistry) else None
+        if self._registry is None:
+            self._load(accounts)
+        else:
+            with self._registry.locked():
+                self._load(accounts)
+        self._posting = None
+
+    def _load(self, accounts):
+        self._accounts = list(accounts)
+        self._loaded = self._balances = self._current_balances()
+
+    def _current_balances(self):
+        np = _numpy()
+        return np.fromiter((account._balance for account in self._accounts), dtype=np.float64,
+                           count=len(self._accounts))
+
+    @property
+    def balances(self):
+        return self._balances
+
+    def post(self, rates=None):
+        """
+        Computes the interest like Account.pay_interest() does, for all accounts at once. 'rates' are percents: None
+        means Account's interest rate, otherwise one rate for all or an array with a rate per account. Posting again
+        before write_back() replaces the previous posting. Returns an InterestPosting with one entry per account.
+        """
+        np = _numpy()
+        if rates is None:
+            rates = Account.get_interest_name()
+        rates = np.asarray(rates, dtype=np.float64)
+        if rates.ndim and rates.shape != self._loaded.shape:
+            raise ValueError('There must be one rate per account.')
+        if np.any(rates < 0):
+            raise ValueError('Interest rate cannot be negative')
+        interest = self._loaded * rates / 100
+        self._balances = self._loaded + interest
+
+        account_numbers = [account.account_number for account in self._accounts]
+        codes = Account.code_generator.bulk(Account._transaction_codes['interest'], account_numbers)
+        self._posting = InterestPosting(account_numbers, interest, self._balances, codes)
+        return self._posting
+
+    def write_back(self):
+        """
+        Stores the posted balances in the accounts and records the posting in Account.ledger, if set. Raises
+        ValueError and changes nothing if a balance changed since the batch was loaded.
+        """
+        if self._registry is None:
+            self._write_back()
+        else:
+            with self._registry.locked():
+                self._write_back()
+
+    def _write_back(self):
+        if not _numpy().array_equal(self._current_balances(), self._loaded):
+            raise ValueError('Balances changed since the batch was loaded, load a new batch.')
+        for account, balance in zip(self._accounts, self._balances.tolist()):
+            account._balance = balance
+        posting = self._posting
+        if posting is not None and Account.ledger is not None:
+            Account.ledger.append_many(posting.confirmation_codes, posting.account_numbers, 'interest',
+                                       posting.interest.tolist(), posting.balances.tolist())
+        self._loaded, self._posting = self._balances, None
+
+
+def post_interest(accounts, rates=None):
+    """
+    InterestBatch(accounts).post(rates) followed by write_back(), returns the InterestPosting. An AccountRegistry
+    stays locked for the whole posting, so no transaction can get in between.
+    """
+    if isinstance(accounts, AccountRegistry):
+        with accounts.locked():
+            return post_interest(list(accounts), rates)
+    batch = InterestBatch(accounts)
+    posting = batch.post(rates)
+    batch.write_back()
+    return posting
+
+
 if __name__ == '__main__':
     a = Account('A100', 'Eric', 'Idle', initial_balance=-100)
     print(a.balance)
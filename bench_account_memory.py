@@ -0,0 +1,70 @@
+import numbers
+import os
+import sys
+from datetime import timedelta
+from OOP.bank_account import Account, Timezone
+from OOP.bench_utils import run_benchmarks
+
+"""Bytes per account and creation time of the slotted Account with the shared UTC Timezone against the previous
+classes, which kept a __dict__ and built a new Timezone('UTC', 0, 0) for every account. The account numbers and
+names are created up front, so only the objects themselves are measured.
+Run it with the project's parent folder on the path:
+    python -m OOP.bench_account_memory [--save-baseline] [--filter memory] [--output results.json]"""
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_account_memory.baseline.json')
+ACCOUNTS = 100000
+
+
+class DictTimezone:
+    """Timezone before __slots__ and interning."""
+    def __init__(self, name, hours_offset, minutes_offset=0):
+        if name is None or len(str(name).strip()) == 0:
+            raise ValueError('Timezone name cannot be empty.')
+        self._name = str(name).strip()
+        if not isinstance(hours_offset, numbers.Integral):
+            raise ValueError('Hour offset must be an integer.')
+        if not isinstance(minutes_offset, numbers.Integral):
+            raise ValueError('Minute offset must be an integer')
+        if minutes_offset > 59 or minutes_offset < -59:
+            raise ValueError('Minute offset must be between -59 and 59 (inclusive).')
+        offset = timedelta(hours=hours_offset, minutes=minutes_offset)
+        if offset < timedelta(hours=-12, minutes=0) or offset > timedelta(hours=14, minutes=0):
+            raise ValueError('Offset must be between -12:00 and +14:00.')
+        self._hours_offset = hours_offset
+        self._minutes_offset = minutes_offset
+        self._offset = offset
+
+
+class DictAccount:
+    """The state and the constructor of Account before __slots__."""
+    def __init__(self, account_number, first_name, last_name, timezone=None, initial_balance=0):
+        self._account_number = account_number
+        self._first_name = Account.validate_name(first_name, 'First name')
+        self._last_name = last_name
+        if timezone is None:
+            timezone = DictTimezone('UTC', 0, 0)
+        self._timezone = timezone
+        self._balance = Account.validate_real_number(initial_balance, min_value=0)
+
+
+def create(cls, numbers_and_balances):
+    return [cls(number, 'Eric', 'Idle', initial_balance=balance) for number, balance in numbers_and_balances]
+
+
+def main(argv=None):
+    numbers_and_balances = [(f'A{i}', i % 5000) for i in range(ACCOUNTS)]
+    cases = {
+        'accounts/create_dict': (lambda: create(DictAccount, numbers_and_balances), ACCOUNTS),
+        'accounts/create_slots': (lambda: create(Account, numbers_and_balances), ACCOUNTS),
+        'timezone/new': (lambda: [Timezone('CET', 1) for _ in range(1000)], 1000),
+        'timezone/get': (lambda: [Timezone.get('CET', 1) for _ in range(1000)], 1000),
+    }
+    memory_cases = {
+        'accounts/memory_dict': (lambda: create(DictAccount, numbers_and_balances), ACCOUNTS),
+        'accounts/memory_slots': (lambda: create(Account, numbers_and_balances), ACCOUNTS),
+    }
+    return run_benchmarks(cases, BASELINE, argv, memory_cases)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
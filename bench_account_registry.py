@@ -0,0 +1,91 @@
+import os
+import random
+import sys
+import threading
+from OOP.bank_account import Account, AccountRegistry
+from OOP.bench_utils import run_benchmarks
+
+"""Contention benchmark of AccountRegistry against what callers did before it: one dict of accounts behind a single
+lock. OPERATIONS deposits, withdrawals and transfers over ACCOUNTS accounts are split between 1 to 32 threads.
+Run it with the project's parent folder on the path:
+    python -m OOP.bench_account_registry [--save-baseline] [--filter threads=8] [--output results.json]"""
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_account_registry.baseline.json')
+ACCOUNTS = 10000
+OPERATIONS = 40000
+THREADS = (1, 2, 4, 8, 16, 32)
+
+
+class GlobalLockAccounts:
+    """A dict of accounts where every operation holds the same lock."""
+    def __init__(self):
+        self._accounts = {}
+        self._lock = threading.Lock()
+
+    def add(self, account):
+        with self._lock:
+            self._accounts[account.account_number] = account
+
+    def deposit(self, account_number, value):
+        with self._lock:
+            return self._accounts[account_number].deposit(value)
+
+    def withdraw(self, account_number, value):
+        with self._lock:
+            return self._accounts[account_number].withdraw(value)
+
+    def transfer(self, from_number, to_number, value):
+        with self._lock:
+            withdraw_code = self._accounts[from_number].withdraw(value)
+            if withdraw_code.startswith('X'):
+                return withdraw_code, None
+            return withdraw_code, self._accounts[to_number].deposit(value)
+
+
+def operations(count, seed=0):
+    rng = random.Random(seed)
+    result = []
+    for _ in range(count):
+        a, b = rng.sample(range(ACCOUNTS), 2)
+        kind = rng.random()
+        if kind < 0.3:
+            result.append(('deposit', (f'A{a}', rng.randint(1, 100))))
+        elif kind < 0.6:
+            result.append(('withdraw', (f'A{a}', rng.randint(1, 100))))
+        else:
+            result.append(('transfer', (f'A{a}', f'A{b}', rng.randint(1, 100))))
+    return result
+
+
+def populate(accounts):
+    for number in range(ACCOUNTS):
+        accounts.add(Account(f'A{number}', 'Eric', 'Idle', initial_balance=1000))
+    return accounts
+
+
+def run_threads(accounts, chunks):
+    def worker(chunk):
+        for name, arguments in chunk:
+            getattr(accounts, name)(*arguments)
+
+    threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def cases():
+    work = operations(OPERATIONS)
+    registry, global_lock = populate(AccountRegistry()), populate(GlobalLockAccounts())
+    result = {}
+    for threads in THREADS:
+        chunks = [work[i::threads] for i in range(threads)]
+        result[f'registry/threads={threads}'] = (lambda chunks=chunks: run_threads(registry, chunks), OPERATIONS)
+        result[f'global_lock/threads={threads}'] = (lambda chunks=chunks: run_threads(global_lock, chunks),
+                                                    OPERATIONS)
+    return result
+
+
+if __name__ == '__main__':
+    sys.exit(run_benchmarks(cases(), BASELINE))
@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import random
+import time
+from OOP.bank_account import Account, AccountRegistry
+from OOP.account_service import AccountService
+from OOP.bench_utils import save_results
+
+"""Load generator for AccountService: CLIENTS stand-in clients in the same process each send their share of
+TRANSACTIONS deposits and withdrawals and wait for every confirmation code before sending the next one, like a
+connection waiting for its reply. Reports the throughput and the p50/p99 latency of a transaction, spread over all
+ACCOUNTS accounts and with every client on the same few HOT_ACCOUNTS, where the per-account batching kicks in.
+The throughput of the same transactions called directly on AccountRegistry, one after another, is the reference.
+Run it with the project's parent folder on the path:
+    python -m OOP.bench_account_service [--clients 1 10 100] [--transactions 20000] [--output results.json]"""
+
+ACCOUNTS = 10000
+HOT_ACCOUNTS = 4
+TRANSACTIONS = 20000
+CLIENTS = (1, 10, 100, 1000)
+
+
+def populate(count):
+    registry = AccountRegistry()
+    for number in range(count):
+        registry.add(Account(f'A{number}', 'Eric', 'Idle', initial_balance=1000))
+    return registry
+
+
+def requests(count, accounts, seed):
+    rng = random.Random(seed)
+    return [(f'A{rng.randrange(accounts)}', rng.choice(('deposit', 'withdraw')), rng.randint(1, 100))
+            for _ in range(count)]
+
+
+def summary(latencies, seconds):
+    latencies.sort()
+    return {'transactions': len(latencies), 'seconds': seconds, 'tps': len(latencies) / seconds,
+            'p50_ms': latencies[len(latencies) // 2] * 1000, 'p99_ms': latencies[len(latencies) * 99 // 100] * 1000}
+
+
+async def client(service, work, latencies):
+    for account_number, transaction, value in work:
+        start = time.perf_counter()
+        await service.submit(account_number, transaction, value)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_service(clients, work):
+    latencies = []
+    async with AccountService(populate(ACCOUNTS)) as service:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(service, work[i::clients], latencies) for i in range(clients)))
+        seconds = time.perf_counter() - start
+    return summary(latencies, seconds)
+
+
+def run_direct(work):
+    registry = populate(ACCOUNTS)
+    start = time.perf_counter()
+    for account_number, transaction, value in work:
+        getattr(registry, transaction)(account_number, value)
+    seconds = time.perf_counter() - start
+    return {'transactions': len(work), 'seconds': seconds, 'tps': len(work) / seconds}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Latency and throughput of AccountService under load')
+    parser.add_argument('--clients', type=int, nargs='+', default=CLIENTS, help='Numbers of concurrent clients')
+    parser.add_argument('--transactions', type=int, default=TRANSACTIONS, help='Transactions per run')
+    parser.add_argument('--output', type=str, help='Save the results as json to this file')
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f'{"case":<36}{"tps":>12}{"p50 ms":>10}{"p99 ms":>10}')
+    for spread, accounts in (('spread', ACCOUNTS), ('hot', HOT_ACCOUNTS)):
+        work = requests(args.transactions, accounts, seed=0)
+        name = f'direct/{spread}'
+        results[name] = run_direct(work)
+        print(f'{name:<36}{results[name]["tps"]:>12,.0f}', flush=True)
+        for clients in args.clients:
+            name = f'service/{spread}/clients={clients}'
+            result = results[name] = asyncio.run(run_service(clients, work))
+            print(f'{name:<36}{result["tps"]:>12,.0f}{result["p50_ms"]:>10.3f}{result["p99_ms"]:>10.3f}', flush=True)
+    if args.output:
+        save_results(args.output, results)
+    return results
+
+
+if __name__ == '__main__':
+    main()
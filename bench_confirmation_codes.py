@@ -0,0 +1,80 @@
+import itertools
+import os
+import sys
+import threading
+from datetime import datetime
+from OOP.bank_account import Account, ConfirmationCodeGenerator, Confirmation, Timezone
+from OOP.bench_utils import run_benchmarks
+
+"""Throughput of confirmation code generation: the previous strftime-per-code version against
+ConfirmationCodeGenerator, called directly, through Account.deposit() and shared by several threads.
+And of parsing: the previous strptime-per-code parser against parse_confirmation_code() and the bulk parsers.
+Run it with the project's parent folder on the path:
+    python -m OOP.bench_confirmation_codes [--save-baseline] [--filter threads] [--output results.json]"""
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_confirmation_codes.baseline.json')
+CODES = 10000
+THREADS = (2, 8)
+
+_old_counter = itertools.count(100)
+
+
+def old_confirmation_code(transaction_code, account_number):
+    # Account.confirmation_code before the generator
+    dt_str = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    return f'{transaction_code}-{account_number}-{dt_str}-{next(_old_counter)}'
+
+
+def generate(generator, count):
+    for _ in range(count):
+        generator('D', 'A100')
+
+
+def generate_in_threads(generator, threads):
+    workers = [threading.Thread(target=generate, args=(generator, CODES // threads)) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def old_parse_confirmation_code(confirmation_code, preferred_timezone=None):
+    # Account.parse_confirmation_code before the bulk parser, with the name() call fixed
+    transaction_code, account_number, raw_dt_utc, transaction_id = confirmation_code.split('-')
+    dt_utc = datetime.strptime(raw_dt_utc, '%Y%m%d%H%M%S')
+    if preferred_timezone is None:
+        preferred_timezone = Timezone('UTC', 0, 0)
+    dt_preferred = dt_utc + preferred_timezone.offset
+    dt_preferred_str = f"{dt_preferred.strftime('%Y-%m-%d %H:%M:%S')} ({preferred_timezone.name})"
+    return Confirmation(account_number, transaction_code, transaction_id, dt_utc.isoformat(), dt_preferred_str)
+
+
+def log_lines(count):
+    # about 1000 codes per second, like a busy log
+    return [f'D-A{i % 977}-2024010{1 + i // 100000}{i // 1000 % 86400 // 3600:02}{i // 1000 % 3600 // 60:02}'
+            f'{i // 1000 % 60:02}-{i}\n' for i in range(count)]
+
+
+def cases():
+    generator = ConfirmationCodeGenerator(prefix='w1.')
+    account = Account('A100', 'Eric', 'Idle', initial_balance=100)
+    result = {
+        'codes/strftime_per_code': (lambda: generate(old_confirmation_code, CODES), CODES),
+        'codes/generator': (lambda: generate(generator, CODES), CODES),
+        'codes/account_deposit': (lambda: [account.deposit(1) for _ in range(CODES)], CODES),
+    }
+    for threads in THREADS:
+        result[f'codes/generator_threads={threads}'] = (lambda t=threads: generate_in_threads(generator, t), CODES)
+
+    lines = log_lines(CODES)
+    codes = [line.strip() for line in lines]
+    result['parse/strptime_per_code'] = (lambda: [old_parse_confirmation_code(code) for code in codes], CODES)
+    result['parse/parse_confirmation_code'] = (lambda: [Account.parse_confirmation_code(code) for code in codes],
+                                               CODES)
+    result['parse/bulk_lazy'] = (lambda: list(Account.parse_confirmation_codes(lines)), CODES)
+    result['parse/bulk_columnar'] = (lambda: Account.parse_confirmation_codes_columnar(lines), CODES)
+    return result
+
+
+if __name__ == '__main__':
+    sys.exit(run_benchmarks(cases(), BASELINE))
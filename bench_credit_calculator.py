@@ -0,0 +1,62 @@
+import os
+import random
+import sys
+from OOP import credit_calculator as cc
+from OOP.bench_utils import run_benchmarks
+
+"""Benchmarks of the credit calculator hot paths: latency of a single calculation for different numbers of periods,
+and throughput of the bulk (per loan dispatch) and batch (numpy) modes for different batch sizes.
+Run it with the project's parent folder on the path:
+    python -m OOP.bench_credit_calculator [--save-baseline] [--filter annuity] [--output results.json]"""
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_credit_calculator.baseline.json')
+PERIODS = (12, 120, 480, 14600)
+BATCH_SIZES = (1000, 100000)
+
+
+def _book(size, seed=0):
+    rng = random.Random(seed)
+    principals = [rng.randint(10000, 5000000) for _ in range(size)]
+    periods = [rng.randint(12, 480) for _ in range(size)]
+    rates = [rng.randint(10, 300) / 10 for _ in range(size)]
+    payments = [int(p * r / 1200) + rng.randint(100, 50000) for p, r in zip(principals, rates)]
+    return principals, periods, rates, payments
+
+
+def single_loan_cases():
+    cases = {}
+    for n in PERIODS:
+        cases[f'single/diff_schedule/n={n}'] = (lambda n=n: sum(cc.differential_schedule(1234567, n, 7.8)), 1)
+        cases[f'single/diff_summary/n={n}'] = (lambda n=n: cc.differential_summary(1234567, n, 7.8), 1)
+        cases[f'single/annuity_payment/n={n}'] = (lambda n=n: cc.calc_annuity_payment(1234567, n, 7.8), 1)
+        cases[f'single/annuity_payment_uncached/n={n}'] = (
+            lambda n=n: (cc.annuity_factor.cache_clear(), cc.calc_annuity_payment(1234567, n, 7.8)), 1)
+        cases[f'single/credit_principal/n={n}'] = (lambda n=n: cc.calc_credit_principal(23000, n, 7.8), 1)
+    cases['single/periods'] = (lambda: cc.calc_periods(1234567, 23000, 7.8), 1)
+    return cases
+
+
+def bulk_cases():
+    cases = {}
+    for size in BATCH_SIZES:
+        principals, periods, rates, payments = _book(size)
+        loans = [{'type': 'annuity', 'principal': p, 'periods': n, 'interest': r}
+                 for p, n, r in zip(principals, periods, rates)]
+        cases[f'bulk/calculate_annuity/size={size}'] = (lambda loans=loans: [cc.calculate(l) for l in loans], size)
+
+        try:
+            import numpy as np
+        except ImportError:
+            continue
+        p, n, r, a = (np.array(values) for values in (principals, periods, rates, payments))
+        cases[f'batch/annuity_payment/size={size}'] = (lambda p=p, n=n, r=r: cc.batch_annuity_payment(p, n, r), size)
+        cases[f'batch/credit_principal/size={size}'] = (lambda a=a, n=n, r=r: cc.batch_credit_principal(a, n, r),
+                                                        size)
+        cases[f'batch/periods/size={size}'] = (lambda p=p, a=a, r=r: cc.batch_periods(p, a, r), size)
+        cases[f'batch/differential_payment/size={size}'] = (
+            lambda p=p, n=n, r=r: cc.batch_differential_payment(p, n, r), size)
+    return cases
+
+
+if __name__ == '__main__':
+    sys.exit(run_benchmarks({**single_loan_cases(), **bulk_cases()}, BASELINE))
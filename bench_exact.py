@@ -0,0 +1,49 @@
+import random
+import sys
+import time
+from OOP.credit_calculator import calculate, exact_annuity_factor
+
+"""Compares the throughput of the float and the exact (fractions) calculations of the credit calculator, for a book
+with a few standard products (rates and terms repeat, so the cached exact factors get reused) and for a book where
+every loan has its own rate and term. Run it with the project's parent folder on the path:
+    python -m OOP.bench_exact [loans]"""
+
+
+def product_book(size, seed=0):
+    rng = random.Random(seed)
+    rates, terms = (3.9, 4.5, 5.6, 7.8, 9.9), (12, 24, 36, 60, 120, 240, 360)
+    return [{'type': rng.choice(('annuity', 'diff')), 'principal': rng.randint(10000, 5000000),
+             'periods': rng.choice(terms), 'interest': rng.choice(rates)} for _ in range(size)]
+
+
+def random_book(size, seed=0):
+    rng = random.Random(seed)
+    book = []
+    for _ in range(size):
+        principal, interest = rng.randint(10000, 5000000), rng.randint(10, 300) / 10
+        if rng.random() < 0.5:
+            book.append({'type': 'annuity', 'principal': principal, 'periods': rng.randint(12, 480),
+                         'interest': interest})
+        else:
+            book.append({'type': 'annuity', 'principal': principal, 'interest': interest,
+                         'payment': int(principal * interest / 1200) + rng.randint(100, 50000)})
+    return book
+
+
+def throughput(book, exact):
+    exact_annuity_factor.cache_clear()
+    start = time.perf_counter()
+    for loan in book:
+        calculate(loan, exact)
+    return len(book) / (time.perf_counter() - start)
+
+
+def main(size=20000):
+    print(f'{"book":<10}{"float loans/s":>16}{"exact loans/s":>16}{"slowdown":>10}')
+    for name, book in (('products', product_book(size)), ('random', random_book(size))):
+        float_speed, exact_speed = throughput(book, False), throughput(book, True)
+        print(f'{name:<10}{float_speed:>16,.0f}{exact_speed:>16,.0f}{float_speed / exact_speed:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,38 @@
+import os
+import sys
+from OOP.bank_account import Account, InterestBatch, post_interest
+from OOP.bench_utils import run_benchmarks
+
+"""End-of-day interest posting for ACCOUNTS accounts: Account.pay_interest() called one account at a time against
+InterestBatch (the vectorized pass with bulk confirmation codes) and post_interest() (including the write back).
+Run it with the project's parent folder on the path:
+    python -m OOP.bench_interest [--save-baseline] [--filter batch] [--output results.json]"""
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_interest.baseline.json')
+ACCOUNTS = 100000
+
+
+def per_account(accounts):
+    for account in accounts:
+        account.pay_interest()
+
+
+def create():
+    return [Account(f'A{i}', 'Eric', 'Idle', initial_balance=i % 5000) for i in range(ACCOUNTS)]
+
+
+def cases():
+    accounts = create()
+    # the other cases change the balances of 'accounts', the batch would refuse to write back over them
+    batch = InterestBatch(create())
+    return {
+        'interest/pay_interest_loop': (lambda: per_account(accounts), ACCOUNTS),
+        'interest/batch_load': (lambda: InterestBatch(accounts), ACCOUNTS),
+        'interest/batch_post': (lambda: batch.post(), ACCOUNTS),
+        'interest/batch_write_back': (lambda: batch.write_back(), ACCOUNTS),
+        'interest/post_interest': (lambda: post_interest(accounts), ACCOUNTS),
+    }
+
+
+if __name__ == '__main__':
+    sys.exit(run_benchmarks(cases(), BASELINE))
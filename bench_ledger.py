@@ -0,0 +1,76 @@
+import os
+import sys
+import tempfile
+from OOP.bank_account import Account
+from OOP.ledger import Ledger, replay, recover, write_snapshot, read_snapshot
+from OOP.bench_utils import run_benchmarks
+
+"""Deposits per second without a ledger and with a Ledger for every fsync policy, records per second of replay(), and
+recovery of ACCOUNTS accounts with HISTORY records each: full replay against the last snapshot plus a 1% tail.
+The ledger files are written to a temporary directory, set TMPDIR to measure another disk.
+Run it with the project's parent folder on the path:
+    python -m OOP.bench_ledger [--save-baseline] [--filter replay] [--output results.json]"""
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_ledger.baseline.json')
+DEPOSITS = 10000
+REPLAY_RECORDS = 200000
+ACCOUNTS = 200000
+HISTORY = 4
+
+
+def deposits(ledger, count):
+    Account.ledger = ledger
+    try:
+        account = Account('A100', 'Eric', 'Idle')
+        for _ in range(count):
+            account.deposit(10)
+        if ledger is not None:
+            ledger.flush()
+    finally:
+        Account.ledger = None
+
+
+def cases(directory):
+    result = {'deposit/no_ledger': (lambda: deposits(None, DEPOSITS), DEPOSITS)}
+    for policy in ('never', 'interval', 'batch'):
+        ledger = Ledger(os.path.join(directory, f'{policy}.ledger'), fsync=policy)
+        result[f'deposit/ledger_{policy}'] = (lambda ledger=ledger: deposits(ledger, DEPOSITS), DEPOSITS)
+    # an fsync per record is orders of magnitude slower, fewer deposits keep the run short
+    ledger = Ledger(os.path.join(directory, 'always.ledger'), fsync='always')
+    result['deposit/ledger_always'] = (lambda ledger=ledger: deposits(ledger, 100), 100)
+
+    path = os.path.join(directory, 'replay.ledger')
+    with Ledger(path, fsync='never') as ledger:
+        for i in range(REPLAY_RECORDS):
+            ledger.append(f'D-A{i % 10007}-20240101000000-{i}', f'A{i % 10007}', 'deposit', 10, i * 10)
+    result['replay'] = (lambda: replay(path), REPLAY_RECORDS)
+    result.update(recovery_cases(directory))
+    return result
+
+
+def recovery_cases(directory):
+    path = os.path.join(directory, 'recovery.ledger')
+    snapshot_path = os.path.join(directory, 'recovery.snapshot')
+    balances = {f'A{i}': 0.0 for i in range(ACCOUNTS)}
+    with Ledger(path, batch_size=10000, fsync='never') as ledger:
+        for step in range(HISTORY):
+            for account_number in balances:
+                balances[account_number] += 10
+                ledger.append(f'D-{account_number}-20240101000000-{step}', account_number, 'deposit', 10,
+                              balances[account_number])
+        ledger.snapshot(snapshot_path, balances)
+        for i in range(0, ACCOUNTS, 100):
+            ledger.append(f'D-A{i}-20240101000001-{i}', f'A{i}', 'deposit', 10, balances[f'A{i}'] + 10)
+    return {
+        'recovery/write_snapshot': (lambda: write_snapshot(os.path.join(directory, 'copy.snapshot'), balances, 0),
+                                    ACCOUNTS),
+        'recovery/read_snapshot': (lambda: read_snapshot(snapshot_path), ACCOUNTS),
+        'recovery/full_replay': (lambda: recover(path), ACCOUNTS),
+        'recovery/snapshot_and_tail': (lambda: recover(path, snapshot_path), ACCOUNTS),
+    }
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        exit_code = run_benchmarks(cases(directory), BASELINE)
+    sys.exit(exit_code)
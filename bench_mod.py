@@ -0,0 +1,60 @@
+import os
+import sys
+from OOP.modular_arithmetic import Mod
+from OOP.bench_utils import run_benchmarks
+
+"""Benchmarks of every Mod operator for a small (interned), a 64-bit and a 2048-bit prime modulus, hashing and dict
+insert throughput, and the memory per instance. The results can be stored as a baseline and compared with it later.
+The matching correctness checks against plain integers are in TestModProperties in test_modular_arithmetic.py.
+Run it with the project's parent folder on the path:
+    python -m OOP.bench_mod [--save-baseline] [--filter 2048] [--output results.json]"""
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_mod.baseline.json')
+MODULI = {'small': 65521, '64bit': 2 ** 64 - 59, '2048bit': 2 ** 2048 - 1942289}
+INSTANCES = 10000
+
+
+def _operands(modulus):
+    # values spread over the whole range, so big moduli really work with big numbers
+    x = Mod(modulus * 3 // 7 + 12345, modulus)
+    y = Mod(modulus * 5 // 11 + 678, modulus)
+    return x, y, modulus // 3
+
+
+def operator_cases():
+    cases = {}
+    for size, modulus in MODULI.items():
+        x, y, n = _operands(modulus)
+        exponent = modulus - 2  # as long as the modulus, the worst case of square-and-multiply
+        cases[f'mod/{size}/create'] = (lambda n=n, modulus=modulus: Mod(n, modulus), 1)
+        cases[f'mod/{size}/add'] = (lambda x=x, y=y: x + y, 1)
+        cases[f'mod/{size}/add_int'] = (lambda x=x, n=n: x + n, 1)
+        cases[f'mod/{size}/sub'] = (lambda x=x, y=y: x - y, 1)
+        cases[f'mod/{size}/mul'] = (lambda x=x, y=y: x * y, 1)
+        cases[f'mod/{size}/neg'] = (lambda x=x: -x, 1)
+        cases[f'mod/{size}/pow'] = (lambda x=x, e=exponent: x ** e, 1)
+        cases[f'mod/{size}/inverse_cached'] = (lambda x=x: x.inverse(), 1)  # hits the per-modulus cache
+        cases[f'mod/{size}/truediv'] = (lambda x=x, y=y: x / y, 1)
+        cases[f'mod/{size}/eq'] = (lambda x=x, y=y: x == y, 1)
+        cases[f'mod/{size}/lt'] = (lambda x=x, y=y: x < y, 1)
+        cases[f'mod/{size}/hash'] = (lambda x=x: hash(x), 1)
+    return cases
+
+
+def container_cases():
+    cases = {}
+    for size, modulus in MODULI.items():
+        items = [Mod(i * 7919 + modulus // 5, modulus) for i in range(INSTANCES)]
+        cases[f'mod/{size}/dict_insert'] = (lambda items=items: dict.fromkeys(items), INSTANCES)
+        cases[f'mod/{size}/set_build'] = (lambda items=items: set(items), INSTANCES)
+    return cases
+
+
+def memory_cases():
+    return {f'mod/{size}/memory': (lambda modulus=modulus: [Mod(i * 7919 + modulus // 5, modulus)
+                                                            for i in range(INSTANCES)], INSTANCES)
+            for size, modulus in MODULI.items()}
+
+
+if __name__ == '__main__':
+    sys.exit(run_benchmarks({**operator_cases(), **container_cases()}, BASELINE, memory_cases=memory_cases()))
@@ -0,0 +1,65 @@
+import os
+import random
+import sys
+from OOP.modular_arithmetic import Mod, mod_context
+from OOP.bench_utils import run_benchmarks
+
+"""Compares ways of multiplying under one fixed modulus of 256 to 4096 bits: a single reduction with the builtin %,
+with Barrett and with Montgomery reduction written in Python (the reference versions below, which show why
+ModContext only uses Montgomery in product() for large moduli), and a chain of CHAIN multiplications done with Mod
+objects (x *= v) against ModContext.product().
+Run it with the project's parent folder on the path:
+    python -m OOP.bench_mod_context [--save-baseline] [--filter 4096] [--output results.json]"""
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_mod_context.baseline.json')
+BITS = (256, 512, 1024, 2048, 4096)
+CHAIN = 10000
+
+
+def barrett_reduce(x, modulus, bits, mu):
+    """x % modulus for 0 <= x < modulus ** 2, mu = 4 ** bits // modulus."""
+    r = x - (((x >> (bits - 1)) * mu) >> (bits + 1)) * modulus
+    while r >= modulus:
+        r -= modulus
+    return r
+
+
+def montgomery_mul(a, b, modulus, bits, n_prime):
+    """a * b * 2 ** -bits % modulus for an odd modulus, n_prime = -modulus ** -1 % 2 ** bits."""
+    mask = (1 << bits) - 1
+    t = a * b
+    u = (t + ((t & mask) * n_prime & mask) * modulus) >> bits
+    return u - modulus if u >= modulus else u
+
+
+def mod_chain(mods, modulus):
+    x = Mod(1, modulus)
+    for value in mods:
+        x *= value
+    return x
+
+
+def cases():
+    rng = random.Random(0)
+    result = {}
+    for bits in BITS:
+        modulus = rng.getrandbits(bits) | (1 << (bits - 1)) | 1
+        context = mod_context(modulus)
+        a, b = rng.randrange(modulus), rng.randrange(modulus)
+        mu, n_prime = (1 << (2 * bits)) // modulus, -pow(modulus, -1, 1 << bits) % (1 << bits)
+        result[f'{bits}bit/reduce/builtin'] = (lambda a=a, b=b, modulus=modulus: a * b % modulus, 1)
+        result[f'{bits}bit/reduce/barrett'] = (lambda a=a, b=b, modulus=modulus, bits=bits, mu=mu:
+                                               barrett_reduce(a * b, modulus, bits, mu), 1)
+        # a and b stand in for numbers already in Montgomery form, the cost is the same
+        result[f'{bits}bit/reduce/montgomery'] = (lambda a=a, b=b, modulus=modulus, bits=bits, n_prime=n_prime:
+                                                  montgomery_mul(a, b, modulus, bits, n_prime), 1)
+
+        values = [rng.randrange(modulus) for _ in range(CHAIN)]
+        mods = [Mod(value, modulus) for value in values]
+        result[f'{bits}bit/chain/mod'] = (lambda mods=mods, modulus=modulus: mod_chain(mods, modulus), CHAIN)
+        result[f'{bits}bit/chain/product'] = (lambda values=values, context=context: context.product(values), CHAIN)
+    return result
+
+
+if __name__ == '__main__':
+    sys.exit(run_benchmarks(cases(), BASELINE))
@@ -0,0 +1,86 @@
+import os
+import sys
+from functools import total_ordering
+from OOP.modular_arithmetic import Mod
+from OOP.bench_utils import run_benchmarks
+
+"""Operations per second of the Mod operators against the previous version of the class, which checked both
+operands with isinstance and built every result through the validating __init__. Moduli up to
+SMALL_MODULUS_LIMIT also return interned instances.
+Run it with the project's parent folder on the path:
+    python -m OOP.bench_mod_dispatch [--save-baseline] [--filter interned] [--output results.json]"""
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_mod_dispatch.baseline.json')
+MODULI = {'interned': 65521, 'not_interned': 2 ** 61 - 1}
+
+
+@total_ordering
+class CheckedMod:
+    """The operator dispatch of Mod before the fast paths and the interning."""
+    __slots__ = ('_value', '_modulus')
+
+    def __init__(self, value, modulus):
+        if isinstance(value, int) and isinstance(modulus, int):
+            if modulus > 0:
+                self._modulus = modulus
+            else:
+                raise ValueError('Modulus must be a positive integer.')
+            self._value = value % modulus
+        else:
+            raise TypeError('Unsupported type.')
+
+    @property
+    def modulus(self):
+        return self._modulus
+
+    def __eq__(self, other):
+        try:
+            return self._value == self._get_value(other)
+        except TypeError:
+            return False
+
+    def __hash__(self):
+        return hash((self._value, self._modulus))
+
+    def __add__(self, other):
+        return self.__class__(self._value + self._get_value(other), self.modulus)
+
+    def __sub__(self, other):
+        return self.__class__(self._value - self._get_value(other), self.modulus)
+
+    def __mul__(self, other):
+        return self.__class__(self._value * self._get_value(other), self.modulus)
+
+    def __lt__(self, other):
+        return self._value < self._get_value(other)
+
+    def _get_value(self, other):
+        if isinstance(other, int):
+            return other % self.modulus
+        elif isinstance(other, self.__class__) and self._modulus == other._modulus:
+            return other._value
+        else:
+            raise TypeError('Incompatible types')
+
+
+CLASSES = {'checked': CheckedMod, 'mod': Mod}
+
+
+def cases():
+    result = {}
+    for size, modulus in MODULI.items():
+        for name, cls in CLASSES.items():
+            x, y = cls(40000, modulus), cls(54321, modulus)
+            result[f'{size}/add/{name}'] = (lambda x=x, y=y: x + y, 1)
+            result[f'{size}/sub/{name}'] = (lambda x=x, y=y: x - y, 1)
+            result[f'{size}/mul/{name}'] = (lambda x=x, y=y: x * y, 1)
+            result[f'{size}/add_int/{name}'] = (lambda x=x: x + 5, 1)
+            result[f'{size}/mul_int/{name}'] = (lambda x=x: x * 12345, 1)
+            result[f'{size}/eq/{name}'] = (lambda x=x, y=y: x == y, 1)
+            result[f'{size}/lt/{name}'] = (lambda x=x, y=y: x < y, 1)
+            result[f'{size}/create/{name}'] = (lambda cls=cls, modulus=modulus: cls(12345, modulus), 1)
+    return result
+
+
+if __name__ == '__main__':
+    sys.exit(run_benchmarks(cases(), BASELINE))
@@ -0,0 +1,87 @@
+import os
+import sys
+from functools import total_ordering
+from OOP.modular_arithmetic import Mod
+from OOP.bench_utils import run_benchmarks
+
+"""Compares the memory per instance and the speed of hashing, comparing and adding of Mod with the previous version
+of the class, which kept a __dict__ and reduced the value on every access.
+Run it with the project's parent folder on the path:
+    python -m OOP.bench_mod_memory [--save-baseline] [--filter 61bit] [--output results.json]"""
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_mod_memory.baseline.json')
+MODULI = {'16bit': 65521, '61bit': 2 ** 61 - 1, '2048bit': 2 ** 2048 - 1942289}
+INSTANCES = 200000
+SET_ITEMS = 1000
+
+
+@total_ordering
+class DictMod:
+    """The relevant part of Mod before it got __slots__ and reduced storage."""
+    def __init__(self, value, modulus):
+        if isinstance(value, int) and isinstance(modulus, int):
+            self._value = value
+            if modulus > 0:
+                self._modulus = modulus
+            else:
+                raise ValueError('Modulus must be a positive integer.')
+        else:
+            raise TypeError('Unsupported type.')
+
+    @property
+    def value(self):
+        return self._value % self.modulus
+
+    @property
+    def modulus(self):
+        return self._modulus
+
+    def __eq__(self, other):
+        try:
+            return self.value == self._get_value(other)
+        except TypeError:
+            return False
+
+    def __hash__(self):
+        return hash((self.value, self.modulus))
+
+    def __add__(self, other):
+        return self.__class__(self._value + self._get_value(other), self.modulus)
+
+    def __lt__(self, other):
+        return self.value < self._get_value(other) % self.modulus
+
+    def _get_value(self, other):
+        if isinstance(other, int):
+            return other % self.modulus
+        elif isinstance(other, self.__class__) and self.modulus == other.modulus:
+            return other.value
+        else:
+            raise TypeError('Incompatible types')
+
+
+CLASSES = {'dict': DictMod, 'slots': Mod}
+
+
+def cases():
+    result = {}
+    for size, modulus in MODULI.items():
+        for name, cls in CLASSES.items():
+            x, y = cls(123456789, modulus), cls(987654321, modulus)
+            items = [cls(i, modulus) for i in range(SET_ITEMS)]
+            result[f'{size}/hash/{name}'] = (lambda x=x: hash(x), 1)
+            result[f'{size}/eq/{name}'] = (lambda x=x, y=y: x == y, 1)
+            result[f'{size}/lt/{name}'] = (lambda x=x, y=y: x < y, 1)
+            result[f'{size}/add/{name}'] = (lambda x=x, y=y: x + y, 1)
+            result[f'{size}/set_build/{name}'] = (lambda items=items: set(items), SET_ITEMS)
+    return result
+
+
+def memory_cases():
+    return {f'{size}/memory/{name}': (lambda cls=cls, modulus=modulus: [cls(value * 7919, modulus)
+                                                                       for value in range(INSTANCES)], INSTANCES)
+            for size, modulus in MODULI.items() for name, cls in CLASSES.items()}
+
+
+if __name__ == '__main__':
+    sys.exit(run_benchmarks(cases(), BASELINE, memory_cases=memory_cases()))
@@ -0,0 +1,41 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+"""Measures how long a cold interpreter takes to import credit_calculator and to run a single calculation from the
+command line, next to an empty interpreter start as a reference. Run it from the project folder:
+    python bench_startup.py [repeats]"""
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CASES = {
+    'empty interpreter': [sys.executable, '-c', 'pass'],
+    'import credit_calculator': [sys.executable, '-c', 'import credit_calculator'],
+    'cli annuity payment': [sys.executable, '-m', 'credit_calculator', '--type=annuity', '--principal=1000000',
+                            '--periods=60', '--interest=10'],
+    'cli diff summary': [sys.executable, '-m', 'credit_calculator', '--type=diff', '--principal=1000000',
+                         '--periods=480', '--interest=10', '--summary'],
+}
+
+
+def measure(command, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=HERE, stdout=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), min(timings)
+
+
+def main(repeats=20):
+    results = {name: measure(command, repeats) for name, command in CASES.items()}
+    reference = results['empty interpreter'][0]
+    print(f'{"case":<26}{"median ms":>12}{"best ms":>10}{"over empty ms":>15}')
+    for name, (median, best) in results.items():
+        print(f'{name:<26}{median * 1000:>12.2f}{best * 1000:>10.2f}{(median - reference) * 1000:>15.2f}')
+    return results
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,123 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+
+"""Small helpers shared by the benchmark scripts: timing, memory measurement, saving the results as json and comparing
+them against a stored baseline. A benchmark script only has to build a dict of cases and call run_benchmarks()."""
+
+
+def measure(func, repeat=5, number=None):
+    """Best time of one call of 'func' in seconds. Like timeit, 'number' is picked so a run takes at least 0.2 s."""
+    timer = timeit.Timer(func)
+    if number is None:
+        number = timer.autorange()[0]
+    return min(timer.repeat(repeat, number)) / number
+
+
+def run_cases(cases, repeat=5, name_filter=None):
+    """'cases' maps a name to (func, items), where items is how many loans/values one call processes.
+    Returns a dict with the time per call and the throughput of every case."""
+    results = {}
+    for name, (func, items) in cases.items():
+        if name_filter and name_filter not in name:
+            continue
+        seconds = measure(func, repeat)
+        results[name] = {'seconds': seconds, 'items': items, 'items_per_second': items / seconds}
+        print(f'{name:<48}{seconds * 1e6:>14.2f} us{items / seconds:>18,.0f} /s', flush=True)
+    return results
+
+
+def measure_memory(factory):
+    """Bytes allocated by the objects that 'factory' returns in a list, without the list itself."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        objects = factory()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return size - sys.getsizeof(objects)
+
+
+def run_memory_cases(cases, name_filter=None):
+    """'cases' maps a name to (factory, items), where factory returns a list of 'items' objects.
+    Returns a dict with the allocated bytes and the bytes per object of every case."""
+    results = {}
+    for name, (factory, items) in cases.items():
+        if name_filter and name_filter not in name:
+            continue
+        size = measure_memory(factory)
+        results[name] = {'bytes': size, 'items': items, 'bytes_per_item': size / items}
+        print(f'{name:<48}{size / items:>14.1f} B per item', flush=True)
+    return results
+
+
+def save_results(path, results):
+    report = {'python': sys.version.split()[0], 'platform': platform.platform(), 'time': time.time(),
+              'results': results}
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2)
+
+
+def load_results(path):
+    with open(path) as file:
+        return json.load(file)['results']
+
+
+def _metric(result):
+    return 'seconds' if 'seconds' in result else 'bytes'
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Returns (name, baseline value, current value) for every case that got slower, or for memory cases bigger,
+    by more than 'tolerance'."""
+    regressions = []
+    for name, result in results.items():
+        metric = _metric(result)
+        if name not in baseline or metric not in baseline[name]:
+            continue
+        if result[metric] > baseline[name][metric] * (1 + tolerance):
+            regressions.append((name, baseline[name][metric], result[metric]))
+    return regressions
+
+
+def run_benchmarks(cases, baseline_path, argv=None, memory_cases=None):
+    """Command line front end of a benchmark script, returns the exit code (1 when something regressed).
+    'memory_cases' are measured with run_memory_cases() and stored in the same results."""
+    parser = argparse.ArgumentParser(description='Run the benchmarks and compare them with the baseline')
+    parser.add_argument('--filter', type=str, help='Only run the cases whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timing runs per case (best one counts)')
+    parser.add_argument('--output', type=str, help='Save the results as json to this file')
+    parser.add_argument('--baseline', type=str, default=baseline_path, help='Baseline json file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown, 0.25 means 25%%')
+    args = parser.parse_args(argv)
+
+    results = run_cases(cases, args.repeat, args.filter)
+    if memory_cases:
+        results.update(run_memory_cases(memory_cases, args.filter))
+    if args.output:
+        save_results(args.output, results)
+    if args.save_baseline:
+        save_results(args.baseline, results)
+        print(f'Baseline saved to {args.baseline}')
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}, run with --save-baseline to create one')
+        return 0
+
+    regressions = compare(results, load_results(args.baseline), args.tolerance)
+    for name, before, now in regressions:
+        if _metric(results[name]) == 'bytes':
+            print(f'REGRESSION {name}: {before:,} B -> {now:,} B ({now / before - 1:+.0%})')
+        else:
+            print(f'REGRESSION {name}: {before * 1e6:.2f} us -> {now * 1e6:.2f} us ({now / before - 1:+.0%})')
+    if not regressions:
+        print('No regressions against the baseline')
+    return 1 if regressions else 0
@@ -0,0 +1,87 @@
+import numbers
+import os
+import sys
+from decimal import Decimal
+from fractions import Fraction
+from OOP.bank_account import Account
+from OOP.bench_utils import run_benchmarks
+
+"""Microbenchmarks of the Account validation: validate_real_number() and validate_name() against the previous
+versions, which always went through the numbers.Real ABC and converted the name twice, for the common types and
+the ones that still take the ABC path; deposits; and creating ACCOUNTS accounts with the constructor against
+Account.load_trusted().
+Run it with the project's parent folder on the path:
+    python -m OOP.bench_validation [--save-baseline] [--filter real] [--output results.json]"""
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_validation.baseline.json')
+VALUES = 10000
+ACCOUNTS = 100000
+
+
+def abc_validate_real_number(value, min_value=None):
+    """validate_real_number() before the exact type checks."""
+    if not isinstance(value, numbers.Real):
+        raise ValueError('Value must be a real number')
+    if min_value is not None and value < min_value:
+        raise ValueError(f'Value must be at least {min_value}.')
+    return value
+
+
+def old_validate_name(value, field_title):
+    if value is None or len(str(value).strip()) == 0:
+        raise ValueError(f'{field_title} cannot be empty')
+    return str(value).strip()
+
+
+def validate_all(validate, values):
+    for value in values:
+        validate(value, 0.01)
+
+
+def reject_all(validate, values):
+    for value in values:
+        try:
+            validate(value, 0.01)
+        except ValueError:
+            pass
+
+
+def validate_names(validate, names):
+    for name in names:
+        validate(name, 'First name')
+
+
+def deposits(account, values):
+    for value in values:
+        account.deposit(value)
+
+
+def cases():
+    values = {
+        'int': list(range(1, VALUES + 1)),
+        'float': [i + 0.5 for i in range(VALUES)],
+        'fraction': [Fraction(i + 1, 2) for i in range(VALUES)],
+    }
+    result = {}
+    for kind, items in values.items():
+        result[f'real/{kind}_abc'] = (lambda items=items: validate_all(abc_validate_real_number, items), VALUES)
+        result[f'real/{kind}_fast'] = (lambda items=items: validate_all(Account.validate_real_number, items), VALUES)
+    decimals = [Decimal(i) for i in range(VALUES)]
+    result['real/decimal_rejected_abc'] = (lambda: reject_all(abc_validate_real_number, decimals), VALUES)
+    result['real/decimal_rejected_fast'] = (lambda: reject_all(Account.validate_real_number, decimals), VALUES)
+
+    names = [f'Eric{i}' for i in range(VALUES)]
+    result['name/old'] = (lambda: validate_names(old_validate_name, names), VALUES)
+    result['name/fast'] = (lambda: validate_names(Account.validate_name, names), VALUES)
+
+    account = Account('A100', 'Eric', 'Idle')
+    result['deposit/float'] = (lambda: deposits(account, values['float']), VALUES)
+
+    rows = [(f'A{i}', 'Eric', 'Idle', float(i % 5000)) for i in range(ACCOUNTS)]
+    result['load/constructor'] = (lambda: [Account(*row[:3], initial_balance=row[3]) for row in rows], ACCOUNTS)
+    result['load/trusted'] = (lambda: Account.load_trusted(rows), ACCOUNTS)
+    return result
+
+
+if __name__ == '__main__':
+    sys.exit(run_benchmarks(cases(), BASELINE))
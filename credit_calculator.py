@@ -1,82 +1,446 @@
 from math import log, ceil, pow, floor
-import argparse
+from functools import lru_cache
 
 '''The credit calculator helps us to calculate the differential payment, annuity payment, credit principal and total 
 periods amount. We can also see how much we overpay after paying the whole credit. 
-IMPORTANT: in this project you have to parse the input arguments in the command line'''
+IMPORTANT: in this project you have to parse the input arguments in the command line, see main().
+The module itself can be imported without side effects; argparse, csv, json, fractions and numpy are only imported
+by the functions that need them, which keeps both the import and a cold command line run fast.'''
 
 
-def differential_payment():
-    principal = args['principal']
-    n = args['periods']
-    credit_interest = args['interest']
-    i = (credit_interest / 10) / (12 * 10)
-    total = 0
+def _monthly_rate(credit_interest):
+    return (credit_interest / 10) / (12 * 10)
+
+
+def differential_schedule(principal, n, credit_interest, exact=False):
+    if exact:  # every month rounded up from its exact value, like differential_summary(exact=True)
+        i, p = _exact(credit_interest) / 1200, _exact(principal)
+        for m in range(1, n + 1):
+            yield ceil(p / n + i * (p - p * (m - 1) / n))
+        return
+    i = _monthly_rate(credit_interest)
     for m in range(1, n + 1):
-        result = ceil(principal / n + i * (principal - (principal * (m - 1)) / n))
+        yield ceil(principal / n + i * (principal - (principal * (m - 1)) / n))
+
+
+def differential_month_payment(principal, n, credit_interest, m):
+    if not 1 <= m <= n:
+        raise ValueError('Month must be between 1 and the number of periods')
+    i = _monthly_rate(credit_interest)
+    return ceil(principal / n + i * (principal - (principal * (m - 1)) / n))
+
+
+def _floor_sum(n, m, a, b):
+    # sum of floor((a * j + b) / m) for j in range(n), in O(log m) steps
+    total = 0
+    while True:
+        if a >= m:
+            total += n * (n - 1) // 2 * (a // m)
+            a %= m
+        if b >= m:
+            total += n * (b // m)
+            b %= m
+        y_max = a * n + b
+        if y_max < m:
+            return total
+        n, b, m, a = y_max // m, y_max % m, a, m
+
+
+def _first_in_range(a, m, low, high):
+    # smallest x >= 0 with low <= a * x % m <= high (0 <= low <= high < m), or None, in O(log m) steps
+    if low == 0:
+        return 0
+    a %= m
+    if a == 0:
+        return None
+    x = -(-low // a)
+    if a * x <= high:
+        return x
+    # a * x - m * y lands in [low, high] for the smallest y with m * y % a in [-high % a, -low % a]
+    y = _first_in_range(m % a, a, -high % a, -low % a)
+    return None if y is None else -(-(low + m * y) // a)
+
+
+def differential_summary(principal, n, credit_interest, exact=False):
+    """Returns (total paid, overpayment) of the differential schedule without walking every month.
+    Gives the same numbers as summing differential_schedule(), but costs about the same for any n, unless many
+    payments are (nearly) whole: the float schedule may round those either way, so they are evaluated one by one.
+    With exact=True every month is rounded up from its exact value instead of from the float one."""
+    from fractions import Fraction
+    # counting months backwards, month n - j pays exactly (a * j + b) / m
+    i, p = Fraction(str(credit_interest)) / 1200, Fraction(str(principal))
+    m = i.denominator * n * p.denominator
+    a = i.numerator * p.numerator
+    b = p.numerator * (i.numerator + i.denominator)
+    total = _floor_sum(n, m, a, b + m - 1)
+    if exact:
+        return total, total - principal
+
+    # the float payment is off by at most a few ulps, so only the months whose exact payment is within 'margin'
+    # (in units of 1 / m) of a whole number can round differently; they are the j with (a * j + c) % m <= width
+    margin = ceil(m * abs(p) * (1 + i) / 2 ** 46) + 1
+    width = 2 * margin
+    if width >= m:
+        return _schedule_summary(principal, n, credit_interest)
+    c = (b + margin) % m
+    near = _floor_sum(n, m, a, c + m) - _floor_sum(n, m, a, c + m - width - 1)
+    if near > n // 16:  # finding each one costs more than evaluating every month
+        return _schedule_summary(principal, n, credit_interest)
+    j = 0
+    while j < n:
+        start = (a * j + c) % m
+        step = 0 if start <= width else _first_in_range(a, m, m - start, m - start + width)
+        if step is None or j + step >= n:
+            break
+        j += step
+        total += differential_month_payment(principal, n, credit_interest, n - j) - (a * j + b + m - 1) // m
+        j += 1
+    return total, total - principal
+
+
+def _schedule_summary(principal, n, credit_interest):
+    total = sum(differential_schedule(principal, n, credit_interest))
+    return total, total - principal
+
+
+@lru_cache(maxsize=65536)
+def annuity_factor(credit_interest, n):
+    """Payment per period for a principal of 1. Memoized, as most books only use a handful of rates and terms."""
+    i = _monthly_rate(credit_interest)
+    return (i * pow(1 + i, n)) / (pow(1 + i, n) - 1)
+
+
+def calc_annuity_payment(principal, n, credit_interest):
+    result = ceil(principal * annuity_factor(credit_interest, n))
+    return result, result * n - principal
+
+
+def calc_credit_principal(monthly_payment, n, credit_interest):
+    result = floor(monthly_payment / annuity_factor(credit_interest, n))
+    return result, monthly_payment * n - result
+
+
+def calc_periods(principal, monthly_payment, credit_interest):
+    i = _monthly_rate(credit_interest)
+    n = ceil(log((monthly_payment / (monthly_payment - i * principal)), 1 + i))
+    return n, monthly_payment * n - principal
+
+
+def differential_payment(principal, n, credit_interest, summary=False, exact=False):
+    if summary:
+        print('Overpayment = {}'.format(differential_summary(principal, n, credit_interest, exact)[1]))
+        return
+    total = 0
+    for m, result in enumerate(differential_schedule(principal, n, credit_interest, exact), 1):
         print('Month {}: paid out {}'.format(m, result))
         total += result
     print('\nOverpayment = {}'.format(total - principal))
 
 
-def annuity_payment():
-    principal = args['principal']
-    n = args['periods']
-    credit_interest = args['interest']
-    i = (credit_interest / 10) / (12 * 10)
-    result = ceil(principal * ((i * pow(1 + i, n)) / (pow(1 + i, n) - 1)))
+def annuity_payment(principal, n, credit_interest, exact=False):
+    calc = exact_annuity_payment if exact else calc_annuity_payment
+    result, overpayment = calc(principal, n, credit_interest)
     print('Your annuity payment = {}!'.format(result))
-    print('Overpayment = {}'.format(result * n - principal))
+    print('Overpayment = {}'.format(overpayment))
 
 
-def credit_principal():
-    monthly_payment = args['payment']
-    n = args['periods']
-    credit_interest = args['interest']
-    i = (credit_interest / 10) / (12 * 10)
-    result = floor(monthly_payment / ((i * pow(1 + i, n)) / (pow(1 + i, n) - 1)))
+def credit_principal(monthly_payment, n, credit_interest, exact=False):
+    calc = exact_credit_principal if exact else calc_credit_principal
+    result, overpayment = calc(monthly_payment, n, credit_interest)
     print('Your credit principal = {}!'.format(result))
-    print('Overpayment = {}'.format(monthly_payment * n - result))
-
+    print('Overpayment = {}'.format(overpayment))
 
-def periods():
-    principal = args['principal']
-    monthly_payment = args['payment']
-    credit_interest = args['interest']
-    i = (credit_interest / 10) / (12 * 10)
 
-    n = ceil(log((monthly_payment / (monthly_payment - i * principal)), 1 + i))
+def periods(principal, monthly_payment, credit_interest, exact=False):
+    calc = exact_periods if exact else calc_periods
+    n, overpayment = calc(principal, monthly_payment, credit_interest)
     if n / 12 < 1:
         print('You need {} months to repay this credit!'.format(int(n % 12)))
     elif n % 12 == 0:
         print('You need {} years to repay this credit!'.format(int(n / 12)))
     else:
         print('You need {} years and {} months to repay this credit!'.format(int(n // 12), int(n % 12)))
-    print('Overpayment = {}'.format(monthly_payment * n - principal))
-
-
-parser = argparse.ArgumentParser(description='Credit calculator parameters')
-parser.add_argument('--type', type=str, help='Type of operation (diff or annuity)')
-parser.add_argument('--principal', type=int, help='Credit principal')
-parser.add_argument('--periods', type=int, help='Total periods (usually months)')
-parser.add_argument('--interest', type=float, help='Credit interest')
-parser.add_argument('--payment', type=int, help='Payment per period')
-args = vars(parser.parse_args())
-
-if any((args.values())) < 0 or all((args['type'] == 'diff', args['payment']) or len(args) < 4):
-    print('Incorrect parameters')
-    pass
-else:
-    if args['type'] == 'diff':
-        differential_payment()
-    elif args['type'] == 'annuity':
-        if all((args['principal'], args['periods'], args['interest'])):
-            annuity_payment()
-        elif all((args['payment'], args['periods'], args['interest'])):
-            credit_principal()
-        elif all((args['principal'], args['payment'], args['interest'])):
-            periods()
-        else:
-            print('Incorrect parameters')
+    print('Overpayment = {}'.format(overpayment))
+
+
+def _numpy():
+    # numpy is only needed by the batch API, so the single-loan CLI keeps working without it
+    import numpy as np
+    return np
+
+
+def batch_differential_payment(principal, periods, credit_interest):
+    """Vectorized differential_payment(): returns arrays of total paid and overpayment for every loan.
+    Each loan goes through differential_summary(), so the months are never materialized: the memory doesn't grow
+    with the terms and the numbers are the same as summing the single-loan schedule."""
+    np = _numpy()
+    principal, n, credit_interest = np.broadcast_arrays(np.asarray(principal), np.asarray(periods),
+                                                        np.asarray(credit_interest, dtype=float))
+    if np.any(n < 1):
+        raise ValueError('Periods must be positive')
+    total = np.fromiter((differential_summary(p, int(k), rate)[0]
+                         for p, k, rate in zip(principal.ravel().tolist(), n.ravel().tolist(),
+                                               credit_interest.ravel().tolist())),
+                        dtype=np.int64, count=principal.size).reshape(principal.shape)
+    return total, total - principal
+
+
+def _check_annuity(np, n, i):
+    # the scalar functions raise on these, without the check they would come out as garbage integers
+    if np.any(n < 1):
+        raise ValueError('Periods must be positive')
+    if np.any(i <= 0):
+        raise ValueError('Interest must be positive')
+
+
+def batch_annuity_payment(principal, periods, credit_interest):
+    """Vectorized annuity_payment(): returns arrays of annuity payments and overpayments."""
+    np = _numpy()
+    principal, n = np.asarray(principal), np.asarray(periods)
+    i = _monthly_rate(np.asarray(credit_interest, dtype=float))
+    _check_annuity(np, n, i)
+    factor = np.power(1 + i, n)
+    result = np.ceil(principal * ((i * factor) / (factor - 1))).astype(np.int64)
+    return result, result * n - principal
+
+
+def batch_credit_principal(monthly_payment, periods, credit_interest):
+    """Vectorized credit_principal(): returns arrays of credit principals and overpayments."""
+    np = _numpy()
+    monthly_payment, n = np.asarray(monthly_payment), np.asarray(periods)
+    i = _monthly_rate(np.asarray(credit_interest, dtype=float))
+    _check_annuity(np, n, i)
+    factor = np.power(1 + i, n)
+    result = np.floor(monthly_payment / ((i * factor) / (factor - 1))).astype(np.int64)
+    return result, monthly_payment * n - result
+
+
+def batch_periods(principal, monthly_payment, credit_interest):
+    """Vectorized periods(): returns arrays of period counts and overpayments."""
+    np = _numpy()
+    principal, monthly_payment = np.asarray(principal), np.asarray(monthly_payment)
+    i = _monthly_rate(np.asarray(credit_interest, dtype=float))
+    if np.any(i <= 0):
+        raise ValueError('Interest must be positive')
+    remaining = monthly_payment - i * principal
+    if np.any(remaining <= 0):
+        raise ValueError('The payment does not cover the interest')
+    n = np.ceil(np.log(monthly_payment / remaining) / np.log(1 + i)).astype(np.int64)
+    return n, monthly_payment * n - principal
+
+
+def _exact(value):
+    from fractions import Fraction
+    return Fraction(value) if isinstance(value, int) else Fraction(str(value))
+
+
+@lru_cache(maxsize=4096)
+def _exact_growth(credit_interest, n):
+    # (1 + i) ** n as a fraction, its numerator and denominator grow with n so it's worth keeping
+    return (1 + _exact(credit_interest) / 1200) ** n
+
+
+@lru_cache(maxsize=4096)
+def exact_annuity_factor(credit_interest, n):
+    """annuity_factor() as an exact fraction, the interest is taken by its decimal representation (7.8 is 78/10)."""
+    i, growth = _exact(credit_interest) / 1200, _exact_growth(credit_interest, n)
+    return i * growth / (growth - 1)
+
+
+def exact_annuity_payment(principal, n, credit_interest):
+    """calc_annuity_payment() without float rounding errors."""
+    factor = exact_annuity_factor(credit_interest, n)
+    result = -(-_exact(principal) * factor.numerator // factor.denominator)
+    return result, result * n - principal
+
+
+def exact_credit_principal(monthly_payment, n, credit_interest):
+    """calc_credit_principal() without float rounding errors."""
+    factor = exact_annuity_factor(credit_interest, n)
+    result = _exact(monthly_payment) * factor.denominator // factor.numerator
+    return result, monthly_payment * n - result
+
+
+def exact_periods(principal, monthly_payment, credit_interest):
+    """calc_periods() without float rounding errors: the smallest n for which n payments repay the credit."""
+    i = _exact(credit_interest) / 1200
+    remaining = _exact(monthly_payment) - i * _exact(principal)
+    if remaining <= 0:
+        raise ValueError('The payment does not cover the interest')
+
+    def repaid(n):
+        return _exact_growth(credit_interest, n) * remaining >= monthly_payment
+
+    # the float result is at most a step or two away, the exact check only fixes the last step
+    n = max(calc_periods(principal, monthly_payment, credit_interest)[0], 1)
+    while n > 1 and repaid(n - 1):
+        n -= 1
+    while not repaid(n):
+        n += 1
+    return n, monthly_payment * n - principal
+
+
+def annuity_factor_table(rates, periods):
+    """Matrix of annuity factors with one row per interest rate and one column per number of periods."""
+    np = _numpy()
+    return np.array([[annuity_factor(float(rate), int(n)) for n in periods] for rate in rates], dtype=float)
+
+
+def sweep_annuity_payment(principals, rates, periods):
+    """Annuity payment of every principal for every rate x periods combination of the grid.
+    The result has shape principals.shape + (len(rates), len(periods)). The factors are computed once per grid
+    point and then only multiplied by the principals."""
+    np = _numpy()
+    table = annuity_factor_table(rates, periods)
+    return np.ceil(np.asarray(principals)[..., None, None] * table).astype(np.int64)
+
+
+def sweep_credit_principal(monthly_payments, rates, periods):
+    """Credit principal for every monthly payment and every rate x periods combination of the grid,
+    shaped like sweep_annuity_payment()."""
+    np = _numpy()
+    table = annuity_factor_table(rates, periods)
+    return np.floor(np.asarray(monthly_payments)[..., None, None] / table).astype(np.int64)
+
+
+LOAN_FIELDS = {'principal': int, 'periods': int, 'interest': float, 'payment': int}
+BULK_FIELDS = ('type', 'principal', 'periods', 'interest', 'payment', 'overpayment', 'error')
+
+
+def calculate(loan, exact=False):
+    """Dispatches one loan (a dict with the command line parameters) the same way the CLI does and returns
+    a new dict with the missing value and the overpayment filled in.
+    With exact=True the calculation uses fractions instead of floats, see exact_annuity_payment()."""
+    loan = {key: loan.get(key) for key in ('type', *LOAN_FIELDS)}
+    principal, n, credit_interest, payment = (loan[key] for key in LOAN_FIELDS)
+    if any(value is not None and value < 0 for value in (principal, n, credit_interest, payment)):
+        raise ValueError('Incorrect parameters')
+
+    if loan['type'] == 'diff' and all((principal, n, credit_interest)) and not payment:
+        overpayment = differential_summary(principal, n, credit_interest, exact)[1]
+    elif loan['type'] == 'annuity' and all((principal, n, credit_interest)):
+        calc = exact_annuity_payment if exact else calc_annuity_payment
+        loan['payment'], overpayment = calc(principal, n, credit_interest)
+    elif loan['type'] == 'annuity' and all((payment, n, credit_interest)):
+        calc = exact_credit_principal if exact else calc_credit_principal
+        loan['principal'], overpayment = calc(payment, n, credit_interest)
+    elif loan['type'] == 'annuity' and all((principal, payment, credit_interest)):
+        calc = exact_periods if exact else calc_periods
+        loan['periods'], overpayment = calc(principal, payment, credit_interest)
+    else:
+        raise ValueError('Incorrect parameters')
+    loan['overpayment'] = overpayment
+    return loan
+
+
+def _load_record(record):
+    if isinstance(record, str):  # a JSON Lines row
+        import json
+        record = json.loads(record)
+    if not isinstance(record, dict):
+        raise ValueError('A loan must be an object with the loan parameters')
+    return record
+
+
+def _parse_loan(record):
+    loan = {'type': record.get('type') or None}
+    for key, convert in LOAN_FIELDS.items():
+        value = record.get(key)
+        # csv gives us strings, JSON already gives numbers
+        loan[key] = None if value in (None, '') else convert(value) if isinstance(value, str) else value
+    return loan
+
+
+def read_loans(stream, file_format='csv'):
+    """Lazily yields raw loan records from an open csv or jsonl stream."""
+    if file_format == 'jsonl':
+        return (line for line in stream if line.strip())
+    import csv
+    return csv.DictReader(stream)
+
+
+def bulk_calculate(records, exact=False):
+    """Lazily calculates every record, a bad row is reported in the 'error' field instead of stopping the run."""
+    for raw in records:
+        record = raw
+        try:
+            record = _load_record(raw)
+            yield calculate(_parse_loan(record), exact)
+        except (ValueError, TypeError, ZeroDivisionError, OverflowError) as ex:
+            # the row's fields when it could be read, otherwise the raw input
+            if isinstance(record, dict):
+                result = dict(record)
+            else:
+                result = {'input': raw.strip() if isinstance(raw, str) else raw}
+            result['error'] = str(ex)
+            yield result
+
+
+def write_results(results, stream, file_format='csv'):
+    """Writes the results row by row, so memory use doesn't depend on the size of the input."""
+    if file_format == 'jsonl':
+        import json
+        for result in results:
+            stream.write(json.dumps(result) + '\n')
     else:
+        import csv
+        writer = csv.DictWriter(stream, BULK_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def run_bulk(source, file_format=None, output=None, exact=False):
+    import sys
+    if file_format is None:
+        file_format = 'jsonl' if str(source).endswith(('.jsonl', '.json')) else 'csv'
+    in_stream = sys.stdin if source == '-' else open(source, newline='')
+    out_stream = sys.stdout if output in (None, '-') else open(output, 'w', newline='')
+    try:
+        write_results(bulk_calculate(read_loans(in_stream, file_format), exact), out_stream, file_format)
+    finally:
+        if in_stream is not sys.stdin:
+            in_stream.close()
+        if out_stream is not sys.stdout:
+            out_stream.close()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Credit calculator parameters')
+    parser.add_argument('--type', type=str, help='Type of operation (diff or annuity)')
+    parser.add_argument('--principal', type=int, help='Credit principal')
+    parser.add_argument('--periods', type=int, help='Total periods (usually months)')
+    parser.add_argument('--interest', type=float, help='Credit interest')
+    parser.add_argument('--payment', type=int, help='Payment per period')
+    parser.add_argument('--summary', action='store_true', help='Only print the overpayment of a diff credit')
+    parser.add_argument('--bulk', type=str, help='Csv or jsonl file with one loan per row (- for stdin)')
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help='Format of the bulk file (default: from extension)')
+    parser.add_argument('--output', type=str, help='Where to write the bulk results (default: stdout)')
+    parser.add_argument('--exact', action='store_true', help='Use exact fractions instead of floats')
+    args = vars(parser.parse_args(argv))
+    summary, bulk, file_format, output = args.pop('summary'), args.pop('bulk'), args.pop('format'), args.pop('output')
+    exact = args.pop('exact')
+
+    if bulk:
+        run_bulk(bulk, file_format, output, exact)
+    elif any((args.values())) < 0 or all((args['type'] == 'diff', args['payment']) or len(args) < 4):
         print('Incorrect parameters')
+    else:
+        principal, n, credit_interest, payment = args['principal'], args['periods'], args['interest'], args['payment']
+        if args['type'] == 'diff':
+            differential_payment(principal, n, credit_interest, summary, exact)
+        elif args['type'] == 'annuity':
+            if all((principal, n, credit_interest)):
+                annuity_payment(principal, n, credit_interest, exact)
+            elif all((payment, n, credit_interest)):
+                credit_principal(payment, n, credit_interest, exact)
+            elif all((principal, payment, credit_interest)):
+                periods(principal, payment, credit_interest, exact)
+            else:
+                print('Incorrect parameters')
+        else:
+            print('Incorrect parameters')
+
+
+if __name__ == '__main__':
+    main()
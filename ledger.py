@@ -0,0 +1,338 @@
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+"""Append-only ledger of Account transactions. Every transaction, including the opening of an account with its
+initial balance, is one tab separated line:
+    <confirmation code> <account number> <transaction> <amount> <resulting balance>
+Account numbers are stored as text (str() of the number), so they come back as str from replay() and recover():
+use str account numbers to get the same keys back.
+Records are collected in memory and written in groups (group commit), one write and at most one fsync per group.
+Snapshots store all balances as float64 in a compact binary file together with the ledger position they cover, so
+at startup recover() only replays the records written after the last snapshot. To record the transactions of all
+accounts:
+    Account.ledger = Ledger('transactions.ledger')"""
+
+LedgerRecord = namedtuple('LedgerRecord', 'confirmation_code account_number transaction amount balance')
+Snapshot = namedtuple('Snapshot', 'balances ledger_offset')
+
+_SNAPSHOT_HEADER = struct.Struct('<4sIQQ')  # magic, version, number of accounts, ledger offset
+_SNAPSHOT_MAGIC = b'BSNP'
+_SNAPSHOT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+class Ledger:
+    """
+    Appends transactions to the ledger file at 'path'. Records are buffered until 'batch_size' of them are waiting
+    or the oldest one waited 'max_delay' seconds, then written together. A background thread writes the records
+    that reached 'max_delay' when no further append comes along; with max_delay=None they wait for a full batch,
+    flush() or close().
+    'fsync' decides when the written data is forced to disk:
+        'always'   - every record is written and fsynced before append() returns, nothing is buffered
+        'batch'    - once per written group, a crash loses at most the buffered records
+        'interval' - at most once every 'fsync_interval' seconds, a crash can also lose the last writes
+        'never'    - left to the operating system
+    With 'snapshot_path' set, a snapshot of balances() ({account number: balance}) is taken whenever at least
+    'snapshot_every' records were written since the last one. It is taken on a background thread outside the ledger
+    lock, so balances() may take locks that the appending thread holds (e.g. AccountRegistry.balances); a failed
+    snapshot is logged and never fails the transaction that triggered it.
+    Call flush() or close() (or use the ledger as a context manager) so buffered records are not lost on exit.
+    Safe to share between threads.
+    """
+    FSYNC_POLICIES = ('always', 'batch', 'interval', 'never')
+
+    def __init__(self, path, batch_size=1000, fsync='batch', max_delay=0.1, fsync_interval=1.0,
+                 snapshot_path=None, balances=None, snapshot_every=1000000):
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f'fsync must be one of {", ".join(self.FSYNC_POLICIES)}.')
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError('Batch size must be a positive integer.')
+        if snapshot_path is not None and not callable(balances):
+            raise ValueError('Periodic snapshots need a balances function.')
+        if max_delay is not None and (not isinstance(max_delay, (int, float)) or max_delay < 0):
+            raise ValueError('Maximum delay must be a non-negative number of seconds or None.')
+        self._path = path
+        self._batch_size = 1 if fsync == 'always' else batch_size
+        self._fsync = fsync
+        self._max_delay = max_delay
+        self._fsync_interval = fsync_interval
+        self._pending = []
+        self._first_pending = 0.0
+        self._last_fsync = time.monotonic()
+        self._unsynced = False
+        self._snapshot_path = snapshot_path
+        self._balances = balances
+        self._snapshot_every = snapshot_every
+        self._since_snapshot = 0
+        self._snapshot_thread = None
+        self._flush_thread = None
+        self._lock = threading.Lock()
+        self._records_waiting = threading.Condition(self._lock)
+        _cut_torn_record(path)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def position(self):
+        """Size of the ledger file up to the last written record, buffered records are not included."""
+        with self._lock:
+            return self._file.tell()
+
+    @property
+    def pending(self):
+        """Number of records waiting to be written."""
+        return len(self._pending)
+
+    def append(self, confirmation_code, account_number, transaction, amount, balance):
+        line = f'{confirmation_code}\t{account_number}\t{transaction}\t{amount}\t{balance}\n'
+        with self._lock:
+            pending = self._pending
+            first = not pending
+            if first:
+                self._first_pending = time.monotonic()
+            pending.append(line)
+            if len(pending) >= self._batch_size or self._overdue():
+                self._write()
+            elif first:
+                self._buffered()
+
+    def append_many(self, confirmation_codes, account_numbers, transaction, amounts, balances):
+        """Appends one record per account, all with the same transaction type, e.g. a batch interest posting."""
+        lines = [f'{code}\t{account_number}\t{transaction}\t{amount}\t{balance}\n'
+                 for code, account_number, amount, balance in zip(confirmation_codes, account_numbers, amounts,
+                                                                   balances)]
+        with self._lock:
+            pending = self._pending
+            first = not pending
+            if first:
+                self._first_pending = time.monotonic()
+            pending.extend(lines)
+            if len(pending) >= self._batch_size or self._overdue():
+                self._write()
+            elif first:
+                self._buffered()
+
+    def _overdue(self):
+        return self._max_delay is not None and time.monotonic() - self._first_pending >= self._max_delay
+
+    def _buffered(self):
+        # called with the lock held after records were added to a group that was empty
+        if self._max_delay is None:
+            return
+        if self._flush_thread is None:
+            self._flush_thread = threading.Thread(target=self._flush_delayed, daemon=True)
+            self._flush_thread.start()
+        self._records_waiting.notify()
+
+    def _flush_delayed(self):
+        with self._lock:
+            while not self._file.closed:
+                delay = self._first_pending + self._max_delay - time.monotonic() if self._pending else None
+                if delay is None or delay > 0:
+                    self._records_waiting.wait(delay)
+                    continue
+                try:
+                    self._write()
+                except Exception:
+                    logger.exception('Writing the buffered records to %s failed', self._path)
+                    self._first_pending = time.monotonic()  # try again after another max_delay
+
+    def _write(self):
+        if self._pending:
+            self._file.write(''.join(self._pending))
+            self._since_snapshot += len(self._pending)
+            self._pending.clear()
+            self._file.flush()
+            self._unsynced = True
+        if self._fsync == 'always' or self._fsync == 'batch':
+            self._sync()
+        elif self._fsync == 'interval' and time.monotonic() - self._last_fsync >= self._fsync_interval:
+            self._sync()
+        if self._snapshot_path is not None and self._since_snapshot >= self._snapshot_every:
+            self._start_snapshot()
+
+    def _sync(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = False
+            self._last_fsync = time.monotonic()
+
+    def flush(self):
+        """Writes the buffered records and, unless fsync is 'never', forces them to disk."""
+        with self._lock:
+            self._write()
+            if self._fsync == 'interval':
+                self._sync()
+
+    def snapshot(self, path, balances):
+        """
+        Writes the buffered records, then a snapshot of 'balances' ({account number: balance}) that covers the ledger
+        up to this point. A transaction that changes a balance while the snapshot is taken is harmless: its record
+        comes after the snapshot's position and holds the resulting balance, so replaying it gives the same result.
+        """
+        with self._lock:
+            self._write()
+            self._snapshot(path, balances)
+
+    def _snapshot(self, path, balances):
+        if self._fsync != 'never':
+            self._sync()  # the snapshot must not point past what is on disk
+        write_snapshot(path, balances, self._file.tell())
+        self._since_snapshot = 0
+
+    def _start_snapshot(self):
+        if self._snapshot_thread is None or not self._snapshot_thread.is_alive():
+            self._since_snapshot = 0
+            self._snapshot_thread = threading.Thread(target=self._periodic_snapshot, daemon=True)
+            self._snapshot_thread.start()
+
+    def _periodic_snapshot(self):
+        try:
+            with self._lock:
+                if self._file.closed:
+                    return
+                self._write()
+                if self._fsync != 'never':
+                    self._sync()
+                ledger_offset = self._file.tell()
+            # balances read after the position are at least as new as the records before it; the records after it
+            # hold resulting balances, so replaying them on top of the snapshot is harmless
+            write_snapshot(self._snapshot_path, self._balances(), ledger_offset)
+        except Exception:
+            logger.exception('Periodic balance snapshot to %s failed', self._snapshot_path)
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            if self._snapshot_thread is not None:
+                self._snapshot_thread.join()
+            with self._lock:
+                self._file.close()
+                self._records_waiting.notify()
+            if self._flush_thread is not None:
+                self._flush_thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _cut_torn_record(path):
+    # a last record without its newline was cut off by a crash, new records must not be glued to it
+    try:
+        file = open(path, 'rb+')
+    except FileNotFoundError:
+        return
+    with file:
+        size = file.seek(0, os.SEEK_END)
+        tail_start = max(0, size - 4096)  # far longer than any record
+        file.seek(tail_start)
+        tail = file.read()
+        if tail and not tail.endswith(b'\n'):
+            file.truncate(tail_start + tail.rfind(b'\n') + 1)
+
+
+def read_records(path, number=float):
+    """Yields every complete record of a ledger file as a LedgerRecord, amounts converted with 'number'.
+    A last line without a newline was cut off by a crash and is skipped."""
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if not line.endswith('\n'):
+                break
+            code, account_number, transaction, amount, balance = line[:-1].split('\t')
+            yield LedgerRecord(code, account_number, transaction, number(amount), number(balance))
+
+
+def replay(path, number=float, start=0, balances=None):
+    """
+    Balances of all accounts in the ledger, as {account number: balance}. Every record holds the resulting balance,
+    so only the last record of each account matters: the lines are scanned in big blocks and only the final
+    balances are converted with 'number'. Replay can begin at byte offset 'start' (e.g. a snapshot's ledger_offset),
+    on top of the given 'balances'.
+    """
+    latest = {}
+    if os.path.exists(path):
+        with open(path, 'rb') as file:
+            file.seek(start)
+            rest = b''
+            while block := file.read(1 << 22):
+                block = rest + block
+                end = block.rfind(b'\n') + 1
+                rest = block[end:]  # incomplete until the next block, or cut off by a crash at the end
+                for line in block[:end].decode('utf-8').split('\n')[:-1]:
+                    _, account_number, _, _, balance = line.split('\t')
+                    latest[account_number] = balance
+    result = {} if balances is None else dict(balances)
+    result.update((account_number, number(balance)) for account_number, balance in latest.items())
+    return result
+
+
+def write_snapshot(path, balances, ledger_offset):
+    """
+    Stores {account number: balance} in a compact binary file: a 24 byte header, the balances as little-endian
+    float64 and then the account numbers as UTF-8 text separated by newlines. The balances start 8 byte aligned, so a
+    memory-mapped file can be read in place with memoryview.cast('d'). The snapshot is written to a temporary file
+    and renamed, so a crash never leaves a half-written one behind.
+    Only balances that a float64 holds exactly (floats, and ints or fractions of the same value) can be stored;
+    anything else, e.g. Fraction(1, 3) or Decimal('0.1'), raises a ValueError instead of being rounded.
+    """
+    values = array('d', map(float, balances.values()))
+    if any(value != balance for value, balance in zip(values, balances.values())):
+        raise ValueError('Snapshot balances must be exact float64 values.')
+    if sys.byteorder == 'big':
+        values.byteswap()
+    account_numbers = '\n'.join(map(str, balances)).encode('utf-8')
+    if values and account_numbers.count(b'\n') != len(values) - 1:
+        raise ValueError('Account numbers cannot contain newlines.')
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, _SNAPSHOT_VERSION, len(values), ledger_offset))
+        values.tofile(file)
+        file.write(account_numbers)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def read_snapshot(path):
+    """Reads a snapshot written by write_snapshot() as a Snapshot(balances, ledger_offset), balances as floats."""
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if len(data) < _SNAPSHOT_HEADER.size:
+            raise ValueError('Not a balance snapshot.')
+        magic, version, count, ledger_offset = _SNAPSHOT_HEADER.unpack_from(data)
+        if magic != _SNAPSHOT_MAGIC or version != _SNAPSHOT_VERSION:
+            raise ValueError('Not a balance snapshot.')
+        end = _SNAPSHOT_HEADER.size + 8 * count
+        values = array('d')
+        values.frombytes(data[_SNAPSHOT_HEADER.size:end])
+        account_numbers = data[end:].decode('utf-8').split('\n') if count else []
+    if len(values) != count or len(account_numbers) != count:
+        raise ValueError('Corrupt balance snapshot.')
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return Snapshot(dict(zip(account_numbers, values)), ledger_offset)
+
+
+def recover(ledger_path, snapshot_path=None, number=float):
+    """Balances at startup: the last snapshot, if there is one, plus the ledger records written after it. All balances
+    are converted with 'number'; the snapshot ones from their shortest text (repr), the same text the ledger holds
+    for a float balance, so e.g. number=Decimal gives Decimal('0.1') and not the float's binary expansion."""
+    if snapshot_path is not None and os.path.exists(snapshot_path):
+        balances, ledger_offset = read_snapshot(snapshot_path)
+        if number is not float:
+            balances = {account_number: number(repr(balance)) for account_number, balance in balances.items()}
+        return replay(ledger_path, number, ledger_offset, balances)
+    return replay(ledger_path, number)
@@ -0,0 +1,84 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from collections import Counter, namedtuple
+import itertools
+import os
+import time
+from OOP.credit_calculator import calculate
+
+"""Evaluates a whole portfolio of loans with the credit calculator formulas, spread over several processes.
+Loans are dicts with the same keys as the command line parameters of the credit calculator. They are sent to the
+workers in chunks, so the cost of moving data between processes is paid once per chunk and not once per loan."""
+
+PortfolioReport = namedtuple('PortfolioReport', 'loans errors total_overpayment terms seconds loans_per_second')
+
+
+def _evaluate_chunk(loans):
+    errors, total_overpayment, terms = 0, 0, Counter()
+    for loan in loans:
+        try:
+            result = calculate(loan)
+        except (ValueError, TypeError, ZeroDivisionError, OverflowError):
+            errors += 1
+            continue
+        total_overpayment += result['overpayment']
+        terms[result['periods']] += 1
+    return len(loans), errors, total_overpayment, terms
+
+
+def _chunks(loans, chunk_size):
+    loans = iter(loans)
+    while chunk := list(itertools.islice(loans, chunk_size)):
+        yield chunk
+
+
+def _evaluate_in_pool(chunks, workers):
+    # only a few chunks per worker are in flight, so the portfolio never has to fit in memory at once
+    with ProcessPoolExecutor(workers) as pool:
+        pending = set()
+        for chunk in chunks:
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from (future.result() for future in done)
+            pending.add(pool.submit(_evaluate_chunk, chunk))
+        yield from (future.result() for future in wait(pending).done)
+
+
+def evaluate_portfolio(loans, workers=None, chunk_size=10000):
+    """Calculates every loan of the iterable and returns the aggregated PortfolioReport.
+    'terms' is a Counter of the number of periods, loans that can't be calculated are only counted in 'errors'.
+    With workers=1 everything runs in the current process."""
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    chunks = _chunks(loans, chunk_size)
+    partials = map(_evaluate_chunk, chunks) if workers == 1 else _evaluate_in_pool(chunks, workers)
+
+    count, errors, total_overpayment, terms = 0, 0, 0, Counter()
+    for chunk_count, chunk_errors, chunk_overpayment, chunk_terms in partials:
+        count += chunk_count
+        errors += chunk_errors
+        total_overpayment += chunk_overpayment
+        terms.update(chunk_terms)
+
+    seconds = time.perf_counter() - start
+    return PortfolioReport(count, errors, total_overpayment, terms, seconds, count / seconds if seconds else 0.0)
+
+
+def random_portfolio(size, seed=0):
+    import random
+    rng = random.Random(seed)
+    for _ in range(size):
+        principal, interest = rng.randint(10000, 5000000), rng.randint(10, 300) / 10
+        if rng.random() < 0.5:
+            yield {'type': 'annuity', 'principal': principal, 'periods': rng.randint(12, 480), 'interest': interest}
+        else:
+            payment = int(principal * interest / 1200) + rng.randint(100, 50000)
+            yield {'type': 'annuity', 'principal': principal, 'payment': payment, 'interest': interest}
+
+
+if __name__ == '__main__':
+    size = 500000
+    for workers in sorted({1, 2, os.cpu_count() or 1}):
+        report = evaluate_portfolio(random_portfolio(size), workers)
+        print(f'{workers:>3} workers: {report.loans} loans in {report.seconds:.2f} s, '
+              f'{report.loans_per_second:,.0f} loans/s, overpayment {report.total_overpayment:,}, '
+              f'{report.errors} errors, most common terms {report.terms.most_common(3)}')
@@ -0,0 +1,382 @@
+from functools import lru_cache
+from OOP.modular_arithmetic import Mod, ModArray, _numpy
+
+"""Polynomials with coefficients in Z/nZ, built on ModArray. The coefficients are kept in one NumPy array, lowest
+degree first. Multiplication picks the cheapest method: the schoolbook one for short polynomials, the number-theoretic
+transform (NTT) when the modulus is a prime below 2 ** 31 of the form c * 2 ** k + 1 with 2 ** k large enough
+(e.g. 998244353), three NTTs joined by the Chinese remainder theorem when the exact product coefficients fit below
+the product of NTT_PRIMES (moduli up to about 2 ** 35), and Karatsuba otherwise. Division uses Newton iteration,
+so it costs a few multiplications."""
+
+SCHOOLBOOK_LIMIT = 32  # below this many coefficients the schoolbook product is the fastest
+LONG_DIVISION_LIMIT = 64  # quotients shorter than this are computed by long division
+NTT_MAX_MODULUS = 2 ** 31  # the product of two residues must fit in int64
+NTT_PRIMES = (998244353, 167772161, 469762049)  # for other moduli the product is computed modulo all three
+
+
+def _is_prime(n):
+    # deterministic Miller-Rabin for n < 3.3 * 10 ** 24
+    if n < 2:
+        return False
+    bases = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+    if n in bases:
+        return True
+    if any(n % base == 0 for base in bases):
+        return False
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d, s = d // 2, s + 1
+    for base in bases:
+        x = pow(base, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _prime_factors(n):
+    factors, p = set(), 2
+    while p * p <= n:
+        while n % p == 0:
+            factors.add(p)
+            n //= p
+        p += 1
+    if n > 1:
+        factors.add(n)
+    return factors
+
+
+@lru_cache(maxsize=64)
+def _ntt_root(modulus, size):
+    """A primitive 'size'-th root of unity modulo 'modulus' (size a power of two), None if there is no NTT for it."""
+    if modulus >= NTT_MAX_MODULUS or (modulus - 1) % size or not _is_prime(modulus):
+        return None
+    factors = _prime_factors(modulus - 1)
+    generator = next(g for g in range(2, modulus)
+                     if all(pow(g, (modulus - 1) // q, modulus) != 1 for q in factors))
+    return pow(generator, (modulus - 1) // size, modulus)
+
+
+@lru_cache(maxsize=16)
+def _bit_reversal(size):
+    np = _numpy()
+    bits = size.bit_length() - 1
+    index, reversed_index = np.arange(size), np.zeros(size, dtype=np.int64)
+    for bit in range(bits):
+        reversed_index |= ((index >> bit) & 1) << (bits - 1 - bit)
+    return reversed_index
+
+
+def _powers(root, count, modulus):
+    # root ** j for j < count, doubling the known part each step
+    np = _numpy()
+    powers = np.ones(1, dtype=np.int64)
+    while len(powers) < count:
+        powers = np.concatenate((powers, powers * pow(root, len(powers), modulus) % modulus))
+    return powers[:count]
+
+
+def _ntt(values, root, modulus):
+    """Iterative Cooley-Tukey transform, every butterfly stage is one vectorized step."""
+    np = _numpy()
+    size = len(values)
+    values = values[_bit_reversal(size)]
+    twiddles = _powers(root, size // 2, modulus)
+    length = 2
+    while length <= size:
+        half = length // 2
+        blocks = values.reshape(-1, length)
+        u, v = blocks[:, :half], blocks[:, half:] * twiddles[::size // length] % modulus
+        values = np.concatenate(((u + v) % modulus, (u - v) % modulus), axis=1).ravel()
+        length *= 2
+    return values
+
+
+def _ntt_multiply(a, b, root, size, modulus):
+    np = _numpy()
+    fa = _ntt(np.concatenate((a, np.zeros(size - len(a), dtype=np.int64))), root, modulus)
+    fb = _ntt(np.concatenate((b, np.zeros(size - len(b), dtype=np.int64))), root, modulus)
+    product = _ntt(fa * fb % modulus, pow(root, -1, modulus), modulus)
+    return product[:len(a) + len(b) - 1] * pow(size, -1, modulus) % modulus
+
+
+def _crt_multiply(a, b, size, modulus):
+    """Product computed modulo each of NTT_PRIMES and joined with Garner's algorithm, everything stays in int64."""
+    p1, p2, p3 = NTT_PRIMES
+    c1, c2, c3 = (_ntt_multiply(a % p, b % p, _ntt_root(p, size), size, p) for p in NTT_PRIMES)
+    t2 = (c2 - c1) % p2 * pow(p1, -1, p2) % p2
+    t3 = ((c3 - c1) % p3 * pow(p1, -1, p3) % p3 - t2) % p3 * pow(p2, -1, p3) % p3
+    # the exact coefficient is c1 + p1 * t2 + p1 * p2 * t3
+    result = (ModArray(c1, modulus) + ModArray(t2, modulus) * (p1 % modulus) +
+              ModArray(t3, modulus) * (p1 * p2 % modulus))
+    return result.values
+
+
+def _mul(a, b, modulus):
+    # elementwise product, ModArray takes care of not overflowing int64
+    return (ModArray(a, modulus) * ModArray(b, modulus)).values
+
+
+def _schoolbook(a, b, modulus):
+    np = _numpy()
+    if len(a) > len(b):
+        a, b = b, a
+    result = np.zeros(len(a) + len(b) - 1, dtype=b.dtype)
+    for i, coefficient in enumerate(a.tolist()):
+        if coefficient:
+            result[i:i + len(b)] = (result[i:i + len(b)] + _mul(b, coefficient, modulus)) % modulus
+    return result
+
+
+def _karatsuba(a, b, modulus):
+    np = _numpy()
+    if min(len(a), len(b)) <= SCHOOLBOOK_LIMIT:
+        return _schoolbook(a, b, modulus)
+    k = max(len(a), len(b)) // 2
+    a0, a1, b0, b1 = a[:k], a[k:], b[:k], b[k:]
+    if not len(a1) or not len(b1):  # one of them is much shorter, split only the longer one
+        low, high = (a0, a1) if len(a1) else (b0, b1)
+        other = b if len(a1) else a
+        result = np.zeros(len(a) + len(b) - 1, dtype=a.dtype)
+        low_product, high_product = _karatsuba(low, other, modulus), _karatsuba(high, other, modulus)
+        result[:len(low_product)] = low_product
+        result[k:k + len(high_product)] = (result[k:k + len(high_product)] + high_product) % modulus
+        return result
+
+    z0, z2 = _karatsuba(a0, b0, modulus), _karatsuba(a1, b1, modulus)
+    z1 = _karatsuba(_add(a0, a1, modulus), _add(b0, b1, modulus), modulus)
+    z1 = _sub(_sub(z1, z0, modulus), z2, modulus)
+    result = np.zeros(len(a) + len(b) - 1, dtype=a.dtype)
+    result[:len(z0)] = z0
+    result[2 * k:2 * k + len(z2)] = z2
+    z1 = z1[:len(result) - k]
+    result[k:k + len(z1)] = (result[k:k + len(z1)] + z1) % modulus
+    return result
+
+
+def _add(a, b, modulus):
+    np = _numpy()
+    if len(a) < len(b):
+        a, b = b, a
+    result = np.array(a)
+    result[:len(b)] = (result[:len(b)] + b) % modulus
+    return result
+
+
+def _sub(a, b, modulus):
+    np = _numpy()
+    negated = (-np.asarray(b)) % modulus
+    return _add(a, negated, modulus)
+
+
+def _multiply(a, b, modulus):
+    np = _numpy()
+    if not len(a) or not len(b):
+        return a[:0]
+    if min(len(a), len(b)) <= SCHOOLBOOK_LIMIT:
+        return _schoolbook(a, b, modulus)
+    size = 1 << (len(a) + len(b) - 2).bit_length()
+    root = _ntt_root(modulus, size)
+    if root is not None:
+        return _ntt_multiply(a.astype(np.int64), b.astype(np.int64), root, size, modulus)
+    p1, p2, p3 = NTT_PRIMES
+    if min(len(a), len(b)) * (modulus - 1) ** 2 < p1 * p2 * p3 and size <= 1 << 23:
+        return _crt_multiply(a.astype(np.int64), b.astype(np.int64), size, modulus)
+    return _karatsuba(a, b, modulus)
+
+
+class ModPoly:
+    """
+    A polynomial with coefficients modulo 'modulus', given lowest degree first: ModPoly([1, 0, 3], 7) is 1 + 3x^2.
+    Supports +, -, * and ** with other polynomials of the same modulus and with integers or Mod instances,
+    divmod(), // and %, evaluation at one point (p(x)) or at many points at once (evaluate()).
+    Instances are immutable.
+    """
+    __slots__ = ('_coefficients', '_modulus')
+    _combines_with_mod = True  # Mod defers mixed operations to this class
+
+    def __init__(self, coefficients, modulus: int):
+        coefficients = ModArray(coefficients, modulus).values
+        self._coefficients = _trim(coefficients)
+        self._modulus = modulus
+
+    @classmethod
+    def _from_reduced(cls, coefficients, modulus):
+        instance = cls.__new__(cls)
+        instance._coefficients = _trim(coefficients)
+        instance._modulus = modulus
+        return instance
+
+    @property
+    def modulus(self):
+        return self._modulus
+
+    @property
+    def coefficients(self):
+        return ModArray(self._coefficients, self._modulus)
+
+    @property
+    def degree(self):
+        """Degree of the polynomial, -1 for the zero polynomial."""
+        return len(self._coefficients) - 1
+
+    def __len__(self):
+        return len(self._coefficients)
+
+    def __getitem__(self, index):
+        if not isinstance(index, int):
+            raise TypeError('Index must be an integer.')
+        value = int(self._coefficients[index]) if 0 <= index < len(self._coefficients) else 0
+        return Mod(value, self._modulus)
+
+    def __repr__(self):
+        return f'ModPoly({self._coefficients.tolist()}, {self._modulus})'
+
+    def __eq__(self, other):
+        if isinstance(other, (int, Mod)):
+            other = self._get_poly(other)
+        if not isinstance(other, ModPoly):
+            return NotImplemented
+        return (self._modulus == other._modulus and len(self) == len(other) and
+                bool((self._coefficients == other._coefficients).all()))
+
+    def __hash__(self):
+        return hash((tuple(self._coefficients.tolist()), self._modulus))
+
+    def _get_poly(self, other):
+        if isinstance(other, ModPoly):
+            if other._modulus != self._modulus:
+                raise TypeError('Incompatible types')
+            return other
+        if isinstance(other, Mod):
+            if other.modulus != self._modulus:
+                raise TypeError('Incompatible types')
+            return ModPoly([other.value], self._modulus)
+        if isinstance(other, int):
+            return ModPoly([other], self._modulus)
+        raise TypeError('Incompatible types')
+
+    def _new(self, coefficients):
+        return self._from_reduced(coefficients, self._modulus)
+
+    def __neg__(self):
+        return self._new((-self._coefficients) % self._modulus)
+
+    def __add__(self, other):
+        return self._new(_add(self._coefficients, self._get_poly(other)._coefficients, self._modulus))
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        return self._new(_sub(self._coefficients, self._get_poly(other)._coefficients, self._modulus))
+
+    def __rsub__(self, other):
+        return self._get_poly(other).__sub__(self)
+
+    def __mul__(self, other):
+        return self._new(_multiply(self._coefficients, self._get_poly(other)._coefficients, self._modulus))
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __pow__(self, exponent):
+        if not isinstance(exponent, int) or exponent < 0:
+            raise ValueError('Exponent must be a non-negative integer.')
+        result, base = ModPoly([1], self._modulus), self
+        while exponent:
+            if exponent & 1:
+                result = result * base
+            exponent >>= 1
+            if exponent:
+                base = base * base
+        return result
+
+    def __divmod__(self, other):
+        other = self._get_poly(other)
+        if not len(other):
+            raise ZeroDivisionError('Division by the zero polynomial.')
+        if len(self) < len(other):
+            return ModPoly([], self._modulus), self
+        if len(self) - len(other) + 1 <= LONG_DIVISION_LIMIT:
+            quotient, remainder = self._long_division(other)
+        else:
+            quotient = self._newton_division(other)
+            remainder = _sub(self._coefficients, _multiply(other._coefficients, quotient, self._modulus),
+                             self._modulus)[:len(other) - 1]
+        return self._new(quotient), self._new(remainder)
+
+    def __floordiv__(self, other):
+        return divmod(self, other)[0]
+
+    def __mod__(self, other):
+        return divmod(self, other)[1]
+
+    def _lead_inverse(self):
+        try:
+            return pow(int(self._coefficients[-1]), -1, self._modulus)
+        except ValueError:
+            raise ValueError('The leading coefficient of the divisor has no inverse.') from None
+
+    def _long_division(self, other):
+        np = _numpy()
+        m, divisor = self._modulus, other._coefficients
+        lead_inverse, degree = other._lead_inverse(), len(divisor) - 1
+        remainder = np.array(self._coefficients)
+        quotient = np.zeros(len(remainder) - degree, dtype=remainder.dtype)
+        for i in range(len(quotient) - 1, -1, -1):
+            coefficient = int(remainder[i + degree]) * lead_inverse % m
+            quotient[i] = coefficient
+            if coefficient:
+                remainder[i:i + degree + 1] = (remainder[i:i + degree + 1] - _mul(divisor, coefficient, m)) % m
+        return quotient, remainder[:degree]
+
+    def _newton_division(self, other):
+        # the quotient reversed is reversed(self) / reversed(other) as a power series, up to its length
+        length = len(self) - len(other) + 1
+        inverse = _series_inverse(other._coefficients[::-1], length, other._lead_inverse(), self._modulus)
+        return _multiply(self._coefficients[::-1][:length], inverse, self._modulus)[:length][::-1]
+
+    def __call__(self, x):
+        if isinstance(x, Mod):
+            x = self._get_poly(x)[0].value
+        elif not isinstance(x, int):
+            raise TypeError('Incompatible types')
+        result = 0
+        for coefficient in reversed(self._coefficients.tolist()):
+            result = (result * x + coefficient) % self._modulus
+        return Mod(result, self._modulus)
+
+    def evaluate(self, points):
+        """Values at many points at once (Horner's scheme on all of them together), as a ModArray."""
+        np = _numpy()
+        if not isinstance(points, ModArray):
+            points = ModArray(points, self._modulus)
+        elif points.modulus != self._modulus:
+            raise TypeError('Incompatible types')
+        result = ModArray(np.zeros(points.shape, dtype=np.int64), self._modulus)
+        for coefficient in reversed(self._coefficients.tolist()):
+            result = result * points + coefficient
+        return result
+
+
+def _trim(coefficients):
+    nonzero = _numpy().flatnonzero(coefficients)
+    return coefficients[:nonzero[-1] + 1] if nonzero.size else coefficients[:0]
+
+
+def _series_inverse(series, length, first_inverse, modulus):
+    """g with series * g = 1 modulo x ** length, doubling the number of correct terms in every Newton step."""
+    np = _numpy()
+    inverse, size = np.array([first_inverse], dtype=series.dtype), 1
+    while size < length:
+        size *= 2
+        error = (-_multiply(series[:size], inverse, modulus)[:size]) % modulus
+        error[0] = (error[0] + 2) % modulus
+        inverse = _multiply(inverse, error, modulus)[:size]
+    return inverse[:length]
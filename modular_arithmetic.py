@@ -1,4 +1,46 @@
-from functools import total_ordering
+from functools import total_ordering, lru_cache
+from collections import OrderedDict
+from math import gcd
+import operator
+import threading
+
+
+# moduli up to this size share one instance per residue, see _new_mod()
+SMALL_MODULUS_LIMIT = 65536
+# residues cached over all moduli (4 tables of the largest size), the oldest tables are dropped to stay below it
+_INTERNED_SLOTS_LIMIT = 4 * SMALL_MODULUS_LIMIT
+_interned = {}
+_interned_slots = 0
+_interned_lock = threading.Lock()
+
+
+def _interned_table(modulus):
+    global _interned_slots
+    with _interned_lock:  # other threads may be adding or dropping tables at the same time
+        table = _interned.get(modulus)
+        if table is None:
+            while _interned and _interned_slots + modulus > _INTERNED_SLOTS_LIMIT:
+                _interned_slots -= len(_interned.pop(next(iter(_interned))))
+            table = _interned[modulus] = [None] * modulus
+            _interned_slots += modulus
+        return table
+
+
+def _new_mod(cls, value, modulus):
+    # unchecked constructor used by the Mod operators, 'value' must already be reduced
+    if modulus <= SMALL_MODULUS_LIMIT and cls is Mod:
+        table = _interned.get(modulus)
+        if table is None:
+            table = _interned_table(modulus)
+        instance = table[value]
+        if instance is not None:
+            return instance
+        instance = table[value] = object.__new__(cls)
+    else:
+        instance = object.__new__(cls)
+    instance._value = value
+    instance._modulus = modulus
+    return instance
 
 
 @total_ordering  # helps with defining comparisons, only one is then required, i.e. __lt__
@@ -9,106 +51,521 @@ class Mod:
     The modulus must be a positive number.
     We can also perform some basic mathematical operations on two instances or an instance with an integer.
     Comparison is also available.
+    The value is stored already reduced and the class uses __slots__, so an instance is small and comparisons
+    and hashing don't have to reduce anything.
+    Instances are immutable (x += 1 gives a new instance), which lets the operators return one shared, interned
+    instance per residue for small moduli (up to SMALL_MODULUS_LIMIT) instead of building a new object every time.
+    At most 4 * SMALL_MODULUS_LIMIT residues are kept over all moduli, the oldest tables are dropped first.
     """
+    __slots__ = ('_value', '_modulus')
+
     def __init__(self, value: int, modulus: int):
         if isinstance(value, int) and isinstance(modulus, int):
-            self._value = value
             if modulus > 0:
                 self._modulus = modulus
             else:
                 raise ValueError('Modulus must be a positive integer.')
+            self._value = value % modulus  # stored reduced, so the number never grows past the modulus
         else:
             raise TypeError('Unsupported type.')
 
     @property
     def value(self):
-        return self._value % self.modulus
+        return self._value
 
     @property
     def modulus(self):
         return self._modulus
 
     def __repr__(self):
-        return f'Mod({self.value}, {self.modulus})'
+        return f'Mod({self._value}, {self._modulus})'
 
     def __eq__(self, other):
         try:
             other_value = self._get_value(other)
-            return self.value == other_value
         except TypeError:
             return False
+        if other_value is None:
+            return NotImplemented  # e.g. ModArray compares elementwise
+        return self._value == other_value
 
     def __hash__(self):
-        return hash((self.value, self.modulus))
+        return hash((self._value, self._modulus))
 
     def __int__(self):
-        return self.value
+        return self._value
 
     def __neg__(self):
-        return self.__class__(-self.value, self.modulus)
+        return _new_mod(self.__class__, -self._value % self._modulus, self._modulus)
 
     def __add__(self, other):
         other_value = self._get_value(other)
-        return self.__class__(self._value + other_value, self.modulus)
+        if other_value is None:
+            return NotImplemented
+        return _new_mod(self.__class__, (self._value + other_value) % self._modulus, self._modulus)
 
     def __radd__(self, other):
         return self.__add__(other)
 
-    def __iadd__(self, other):
-        other_value = self._get_value(other)
-        self._value += other_value
-        return self
-
     def __sub__(self, other):
         other_value = self._get_value(other)
-        return self.__class__(self._value - other_value, self.modulus)
+        if other_value is None:
+            return NotImplemented
+        return _new_mod(self.__class__, (self._value - other_value) % self._modulus, self._modulus)
 
     def __rsub__(self, other):
         other_value = self._get_value(other)
-        return self.__class__(other_value - self._value, self.modulus)
-
-    def __isub__(self, other):
-        other_value = self._get_value(other)
-        self._value -= other_value
-        return self
+        return _new_mod(self.__class__, (other_value - self._value) % self._modulus, self._modulus)
 
     def __mul__(self, other):
         other_value = self._get_value(other)
-        return self.__class__(self._value * other_value, self.modulus)
+        if other_value is None:
+            return NotImplemented
+        return _new_mod(self.__class__, self._value * other_value % self._modulus, self._modulus)
 
     def __rmul__(self, other):
         return self.__mul__(other)
 
-    def __imul__(self, other):
-        other_value = self._get_value(other)
-        self._value *= other_value
-        return self
-
     def __pow__(self, other, modulo=None):
-        other_value = self._get_value(other)
-        return self.__class__(self._value ** (other_value % self.modulus), self.modulus)  # power % self.modulus to
-        # prevent calculations of huge numbers
+        # three-argument pow does square-and-multiply, so no huge intermediate numbers are built,
+        # and a negative exponent uses the modular inverse (ValueError if there is none)
+        exponent = self._get_exponent(other)
+        if exponent is None:
+            return NotImplemented
+        if modulo is None:
+            return _new_mod(self.__class__, pow(self._value, exponent, self._modulus), self._modulus)
+        if not isinstance(modulo, int) or modulo <= 0 or self._modulus % modulo:
+            raise ValueError('Modulo must be a positive divisor of the modulus.')
+        return _new_mod(self.__class__, pow(self._value, exponent, modulo), modulo)
 
     def __rpow__(self, other):
-        return self.__pow__(other)
+        other_value = self._get_value(other)
+        return _new_mod(self.__class__, pow(other_value, self._value, self._modulus), self._modulus)
 
-    def __ipow__(self, other):
+    def __truediv__(self, other):
         other_value = self._get_value(other)
-        self._value **= other_value
-        return self
+        if other_value is None:
+            return NotImplemented
+        inverse = mod_context(self._modulus).inverse_value(other_value)
+        return _new_mod(self.__class__, self._value * inverse % self._modulus, self._modulus)
+
+    def __rtruediv__(self, other):
+        other_value = self._get_value(other)
+        inverse = mod_context(self._modulus).inverse_value(self._value)
+        return _new_mod(self.__class__, other_value * inverse % self._modulus, self._modulus)
+
+    def inverse(self):
+        """The Mod that gives 1 when multiplied by this one, ValueError if the value and the modulus aren't coprime."""
+        return _new_mod(self.__class__, mod_context(self._modulus).inverse_value(self._value), self._modulus)
 
     def __lt__(self, other):
         other_value = self._get_value(other)
-        return self.value < other_value % self.modulus
+        if other_value is None:
+            return NotImplemented
+        return self._value < other_value
 
     def _get_value(self, other):
+        # the exact type checks come first, they are cheaper than isinstance for the common cases;
+        # None means the other operand is a container of residues (ModArray, ModPoly), which handles mixed
+        # operations itself
+        other_type = type(other)
+        if other_type is int:
+            return other % self._modulus
+        if other_type is self.__class__ or isinstance(other, self.__class__):
+            if self._modulus == other._modulus:
+                return other._value
+        elif isinstance(other, int):
+            return other % self._modulus
+        elif getattr(other_type, '_combines_with_mod', False):
+            return None
+        raise TypeError('Incompatible types')
+
+    def _get_exponent(self, other):
+        # an integer exponent is used as it is, reducing it by the modulus would change the result
         if isinstance(other, int):
-            return other % self.modulus
-        elif isinstance(other, self.__class__) and self.modulus == other.modulus:
-            return other.value
+            return other
+        return self._get_value(other)
+
+
+class ModContext:
+    """
+    Per-modulus helpers: the cached inverses used by Mod division, batch_inverse() and product(). Get one with
+    mod_context(modulus), contexts are cached per modulus.
+    product(), inverse() and batch_inverse() work on Mod instances or integers and return Mod instances. product()
+    works on plain integers internally, so a long chain of multiplications doesn't build a Mod object at every step.
+    mul() and pow() are conveniences that accept integers as well; they cost the same as the * and ** operators and
+    are not a faster path.
+    product() uses Montgomery reduction for odd moduli of 4096 bits and more, where it is a few percent faster than
+    the builtin % and the gap grows with the size; below that the builtin % wins (see bench_mod_context.py).
+    """
+    __slots__ = ('_modulus', '_bits', '_mask', '_n_prime', '_inverses', '_inverses_lock')
+
+    _MONTGOMERY_MIN_BITS = 4096  # below this a plain % is faster in CPython
+    _INVERSE_CACHE_SIZE = 1024
+
+    def __init__(self, modulus: int):
+        if not isinstance(modulus, int):
+            raise TypeError('Unsupported type.')
+        if modulus <= 0:
+            raise ValueError('Modulus must be a positive integer.')
+        self._modulus = modulus
+        self._inverses = OrderedDict()
+        self._inverses_lock = threading.Lock()  # contexts are shared through mod_context(), also between threads
+        self._bits = modulus.bit_length()
+        if modulus % 2:
+            r = 1 << self._bits
+            self._mask = r - 1
+            self._n_prime = -pow(modulus, -1, r) % r
+        else:
+            self._mask = self._n_prime = None
+
+    @property
+    def modulus(self):
+        return self._modulus
+
+    def _get_value(self, other):
+        if isinstance(other, int):
+            return other % self._modulus
+        elif isinstance(other, Mod) and other._modulus == self._modulus:
+            return other._value
         else:
             raise TypeError('Incompatible types')
 
+    def inverse_value(self, value):
+        """Modular inverse of a reduced integer as an integer. The last inverses are kept in a small LRU cache,
+        guarded by a lock; the inverse itself is computed outside of it."""
+        inverses = self._inverses
+        with self._inverses_lock:
+            inverse = inverses.get(value)
+            if inverse is not None:
+                inverses.move_to_end(value)
+                return inverse
+        try:
+            inverse = pow(value, -1, self._modulus)  # the builtin runs the extended Euclidean algorithm in C
+        except ValueError:
+            raise ValueError(f'{value} has no inverse modulo {self._modulus}.') from None
+        with self._inverses_lock:
+            inverses[value] = inverse
+            inverses.move_to_end(value)
+            if len(inverses) > self._INVERSE_CACHE_SIZE:
+                inverses.popitem(last=False)
+        return inverse
+
+    def inverse(self, value):
+        return _new_mod(Mod, self.inverse_value(self._get_value(value)), self._modulus)
+
+    def batch_inverse(self, values):
+        """Inverses of all values with a single modular inversion (Montgomery's trick), as a list of Mod."""
+        modulus = self._modulus
+        values = [self._get_value(value) for value in values]
+        prefixes, running = [], 1
+        for value in values:
+            running = running * value % modulus
+            prefixes.append(running)
+        if not values:
+            return []
+        try:
+            inverse = pow(running, -1, modulus)
+        except ValueError:
+            raise ValueError(f'Not all values have an inverse modulo {modulus}.') from None
+
+        inverses = [None] * len(values)
+        for i in range(len(values) - 1, 0, -1):
+            inverses[i] = _new_mod(Mod, inverse * prefixes[i - 1] % modulus, modulus)
+            inverse = inverse * values[i] % modulus
+        inverses[0] = _new_mod(Mod, inverse, modulus)
+        return inverses
+
+    def mul(self, a, b):
+        return _new_mod(Mod, self._get_value(a) * self._get_value(b) % self._modulus, self._modulus)
+
+    def pow(self, a, exponent):
+        return _new_mod(Mod, pow(self._get_value(a), exponent, self._modulus), self._modulus)
+
+    def product(self, values):
+        """Product of an iterable of Mod instances or integers."""
+        modulus, result = self._modulus, 1
+        if self._n_prime is None or self._bits < self._MONTGOMERY_MIN_BITS:
+            for value in values:
+                result = result * self._get_value(value) % modulus
+            return _new_mod(Mod, result, modulus)
+
+        # every Montgomery step multiplies by R ** -1 as well, so the values don't need to be converted first,
+        # the R ** -count collected on the way is removed once at the end
+        bits, mask, n_prime, count = self._bits, self._mask, self._n_prime, 0
+        for value in values:
+            t = result * self._get_value(value)
+            result = (t + ((t & mask) * n_prime & mask) * modulus) >> bits
+            if result >= modulus:
+                result -= modulus
+            count += 1
+        return _new_mod(Mod, result * pow(1 << bits, count, modulus) % modulus, modulus)
+
+
+@lru_cache(maxsize=128)
+def mod_context(modulus):
+    return ModContext(modulus)
+
+
+def batch_inverse(values):
+    """Inverses of Mod instances that share one modulus, see ModContext.batch_inverse()."""
+    values = list(values)
+    if not values:
+        return []
+    if not isinstance(values[0], Mod):
+        raise TypeError('Incompatible types')
+    return mod_context(values[0].modulus).batch_inverse(values)
+
+
+def crt(values):
+    """Chinese Remainder Theorem: combines Mod instances with pairwise coprime moduli into the one Mod modulo
+    the product of the moduli that is congruent to every one of them."""
+    result, modulus = 0, 1
+    for value in values:
+        if not isinstance(value, Mod):
+            raise TypeError('Incompatible types')
+        if gcd(modulus, value.modulus) != 1:
+            raise ValueError('Moduli must be pairwise coprime.')
+        # lift the result so it also matches this value, without changing it modulo the previous moduli
+        step = (value.value - result) * pow(modulus, -1, value.modulus) % value.modulus
+        result += modulus * step
+        modulus *= value.modulus
+    return Mod(result, modulus)
+
+
+def _numpy():
+    # numpy is only needed by ModArray, Mod itself works without it
+    import numpy as np
+    return np
+
+
+class ModArray:
+    """
+    A container of many residues that share one modulus, stored in a NumPy array: int64 while the modulus is at most
+    2 ** 62, Python integers in an object array for bigger moduli.
+    Arithmetic (+, -, *, **) works elementwise with another ModArray, a Mod, an integer or an array of integers,
+    broadcasting like NumPy does. Comparisons return boolean arrays, sum() and prod() return a Mod.
+    """
+    __slots__ = ('_values', '_modulus')
+    _combines_with_mod = True  # Mod defers mixed operations to this class
+
+    _INT64_MAX_MODULUS = 2 ** 62  # the sum of two residues still fits in int64
+    _DIRECT_MUL_MAX_MODULUS = 3037000500  # (modulus - 1) ** 2 still fits in int64
+
+    def __init__(self, values, modulus: int):
+        if not isinstance(modulus, int):
+            raise TypeError('Unsupported type.')
+        if modulus <= 0:
+            raise ValueError('Modulus must be a positive integer.')
+        self._modulus = modulus
+        self._values = self._reduce(values)
+
+    @classmethod
+    def _from_reduced(cls, values, modulus):
+        # internal constructor for values that are already reduced and stored in the right dtype
+        instance = cls.__new__(cls)
+        instance._values = values
+        instance._modulus = modulus
+        return instance
+
+    @property
+    def modulus(self):
+        return self._modulus
+
+    @property
+    def values(self):
+        values = self._values.view()
+        values.flags.writeable = False
+        return values
+
+    @property
+    def shape(self):
+        return self._values.shape
+
+    @property
+    def _is_int64(self):
+        return self._modulus <= self._INT64_MAX_MODULUS
+
+    def _reduce(self, values):
+        np = _numpy()
+        if not isinstance(values, np.ndarray):
+            inferred = np.asarray(values)
+            # integers past int64 make NumPy infer float64 ([2 ** 63, 5]), keep them exact as Python integers
+            values = np.array(values, dtype=object) if inferred.dtype.kind == 'f' else inferred
+        if values.size == 0:
+            values = values.astype(np.int64)
+        if values.dtype.kind == 'O':
+            if not all(isinstance(value, int) for value in values.flat):
+                raise TypeError('Unsupported type.')
+        elif values.dtype.kind not in 'iu':
+            raise TypeError('Unsupported type.')
+
+        if not self._is_int64:
+            return np.mod(values.astype(object), self._modulus)
+        if values.dtype.kind == 'O' or values.dtype == np.uint64:
+            return np.mod(values.astype(object), self._modulus).astype(np.int64)
+        return np.mod(values.astype(np.int64, copy=False), self._modulus)
+
+    def _get_values(self, other):
+        if isinstance(other, ModArray):
+            if other._modulus != self._modulus:
+                raise TypeError('Incompatible types')
+            return other._values
+        if isinstance(other, Mod):
+            if other.modulus != self._modulus:
+                raise TypeError('Incompatible types')
+            return other.value
+        if isinstance(other, int):
+            return other % self._modulus
+        return self._reduce(other)
+
+    def _new(self, values):
+        return self._from_reduced(values, self._modulus)
+
+    def _mulmod(self, a, b):
+        np = _numpy()
+        m = self._modulus
+        if not self._is_int64 or m <= self._DIRECT_MUL_MAX_MODULUS:
+            return np.mod(np.multiply(a, b), m)
+        # a * b would overflow int64: go through b in chunks of k bits (Horner scheme), with k chosen so that
+        # every intermediate result stays below (m - 1) * 2 ** k < 2 ** 63
+        bits = (m - 1).bit_length()
+        k = 63 - bits
+        if k < 5:
+            # with so few bits per step Python integers are faster
+            product = np.multiply(np.asarray(a).astype(object), np.asarray(b).astype(object))
+            return np.mod(product, m).astype(np.int64)
+        a, b = np.broadcast_arrays(np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64))
+        result = np.zeros(a.shape, dtype=np.int64)
+        mask = (1 << k) - 1
+        for shift in range((bits - 1) // k * k, -1, -k):
+            result = np.mod(result << k, m)
+            result += np.mod(a * ((b >> shift) & mask), m)
+            result = np.where(result >= m, result - m, result)
+        return result
+
+    def _powmod(self, base, exponent):
+        np = _numpy()
+        m = self._modulus
+        exponent = np.asarray(exponent)
+        if exponent.dtype.kind not in 'iuO':
+            raise TypeError('Unsupported type.')
+        if (not self._is_int64 or exponent.dtype.kind == 'O' or np.any(exponent < 0) or
+                (exponent.dtype.kind == 'u' and np.any(exponent > np.iinfo(np.int64).max))):
+            # big moduli, huge or negative exponents: builtin pow on every element (negative ones need an inverse),
+            # unsigned exponents above the int64 range would turn negative in the int64 loop
+            result = np.frompyfunc(pow, 3, 1)(np.asarray(base, dtype=object), exponent.astype(object), m)
+            return result if not self._is_int64 else result.astype(np.int64)
+        # square-and-multiply on all elements at once
+        base, exponent = np.broadcast_arrays(np.asarray(base, dtype=np.int64), exponent.astype(np.int64))
+        result = np.full(base.shape, 1 % m, dtype=np.int64)
+        while np.any(exponent):
+            result = np.where(exponent & 1, self._mulmod(result, base), result)
+            exponent = exponent >> 1
+            base = self._mulmod(base, base)
+        return result
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def __getitem__(self, index):
+        values = self._values[index]
+        if _numpy().ndim(values) == 0:
+            return Mod(int(values), self._modulus)
+        return self._new(values)
+
+    def __repr__(self):
+        return f'ModArray({self._values.tolist()}, {self._modulus})'
+
+    def tolist(self):
+        return self._values.tolist()
+
+    def __neg__(self):
+        return self._new(_numpy().mod(-self._values, self._modulus))
+
+    def __add__(self, other):
+        np = _numpy()
+        result = np.add(self._values, self._get_values(other))
+        return self._new(np.where(result >= self._modulus, result - self._modulus, result))
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        np = _numpy()
+        result = np.subtract(self._values, self._get_values(other))
+        return self._new(np.where(result < 0, result + self._modulus, result))
+
+    def __rsub__(self, other):
+        return (-self).__add__(other)
+
+    def __mul__(self, other):
+        return self._new(self._mulmod(self._values, self._get_values(other)))
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __pow__(self, other):
+        if isinstance(other, (Mod, ModArray)):
+            other = self._get_values(other)
+        return self._new(self._powmod(self._values, other))
+
+    def __rpow__(self, other):
+        return self._new(self._powmod(self._get_values(other), self._values))
+
+    def _compare(self, other, op):
+        return op(self._values, self._get_values(other))
+
+    def __eq__(self, other):
+        try:
+            return self._compare(other, operator.eq)
+        except TypeError:
+            return NotImplemented
+
+    def __ne__(self, other):
+        try:
+            return self._compare(other, operator.ne)
+        except TypeError:
+            return NotImplemented
+
+    def __lt__(self, other):
+        return self._compare(other, operator.lt)
+
+    def __le__(self, other):
+        return self._compare(other, operator.le)
+
+    def __gt__(self, other):
+        return self._compare(other, operator.gt)
+
+    def __ge__(self, other):
+        return self._compare(other, operator.ge)
+
+    __hash__ = None
+
+    def sum(self):
+        values = self._values.ravel()
+        if not self._is_int64:
+            return Mod(int(values.sum()) if values.size else 0, self._modulus)
+        # add up in chunks small enough not to overflow int64
+        chunk = max(1, (2 ** 63 - 1) // self._modulus)
+        total = sum(int(values[start:start + chunk].sum()) for start in range(0, values.size, chunk))
+        return Mod(total, self._modulus)
+
+    def prod(self):
+        np = _numpy()
+        values = self._values.ravel()
+        if values.size == 0:
+            return Mod(1, self._modulus)
+        # multiply neighbouring pairs until one value is left, log2(n) vectorized steps
+        while values.size > 1:
+            if values.size % 2:
+                values = np.append(values, np.array([1], dtype=values.dtype))
+            values = self._mulmod(values[0::2], values[1::2])
+        return Mod(int(values[0]), self._modulus)
+
 
 if __name__ == '__main__':
     x = Mod(8, 3)
@@ -117,7 +574,7 @@ if __name__ == '__main__':
     print(hash(x))
     print(x)
     print(int(x))
-    print(x.__dict__)
+    print(x.__slots__)
     print(x + 5 == x + Mod(5, 3))
     print(5 + x, x + 5)
     x += 7
@@ -0,0 +1,115 @@
+from OOP.account_service import AccountService
+from OOP.bank_account import Account, AccountRegistry
+from unittest import mock
+import asyncio
+import unittest
+
+"""Basic tests performed on the AccountService class in the account_service file."""
+
+
+class TestAccountService(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.registry = AccountRegistry()
+        for number in ('A1', 'A2'):
+            self.registry.add(Account(number, 'Eric', 'Idle'))
+        self.service = AccountService(self.registry)
+
+    def test_create_service(self):
+        with self.assertRaises(ValueError):
+            AccountService(self.registry, max_batch=0)
+        self.assertIs(self.registry, self.service.registry)
+        self.assertIsInstance(AccountService().registry, AccountRegistry)
+
+    async def test_deposit_and_withdraw(self):
+        code = await self.service.deposit('A1', 100)
+        self.assertEqual('D-A1-', code[:5])
+        self.assertEqual('W-A1-', (await self.service.withdraw('A1', 40))[:5])
+        self.assertEqual('X-A1-', (await self.service.withdraw('A1', 100))[:5])
+        self.assertEqual(60, self.registry['A1'].balance)
+        self.assertEqual(0, self.service.pending)
+
+    async def test_transactions_applied_in_order(self):
+        codes = await asyncio.gather(self.service.deposit('A1', 100), self.service.withdraw('A1', 150),
+                                     self.service.deposit('A1', 100), self.service.withdraw('A1', 150))
+        self.assertEqual(['D', 'X', 'D', 'W'], [code[0] for code in codes])
+        self.assertEqual(50, self.registry['A1'].balance)
+
+    async def test_batches_per_account(self):
+        futures = [self.service.submit('A1', 'deposit', 1) for _ in range(10)]
+        futures += [self.service.submit('A2', 'deposit', 1) for _ in range(5)]
+        self.assertEqual(15, self.service.pending)
+        await asyncio.gather(*futures)
+        self.assertEqual(2, self.service._batches)
+        self.assertEqual((10, 5), (self.registry['A1'].balance, self.registry['A2'].balance))
+
+    async def test_max_batch(self):
+        service = AccountService(self.registry, max_batch=3)
+        futures = [service.submit('A1', 'deposit', 1) for _ in range(10)]
+        other = service.submit('A2', 'deposit', 1)
+        await other
+        # A2 doesn't wait for all of A1's transactions
+        self.assertLess(self.registry['A1'].balance, 10)
+        await asyncio.gather(*futures)
+        self.assertEqual(5, service._batches)
+        self.assertEqual(10, self.registry['A1'].balance)
+
+    async def test_errors(self):
+        with self.assertRaises(ValueError):
+            self.service.submit('A1', 'interest', 1)
+        unknown = self.service.submit('A3', 'deposit', 10)
+        invalid = self.service.submit('A1', 'deposit', -10)
+        valid = self.service.submit('A1', 'deposit', 10)
+        with self.assertRaises(KeyError):
+            await unknown
+        with self.assertRaises(ValueError):
+            await invalid
+        self.assertEqual('D', (await valid)[0])
+        self.assertEqual(10, self.registry['A1'].balance)
+
+    async def test_ledger_error(self):
+        ledger = mock.Mock()
+        ledger.append.side_effect = [OSError('No space left on device'), None, None]
+        with mock.patch.object(Account, 'ledger', ledger):
+            failed = self.service.submit('A1', 'deposit', 10)
+            later = self.service.submit('A1', 'deposit', 5)
+            with self.assertRaises(OSError):
+                await failed
+            self.assertEqual('D', (await later)[0])
+            self.assertEqual('D', (await self.service.deposit('A1', 1))[0])
+        # the failed deposit isn't applied
+        self.assertEqual(6, self.registry['A1'].balance)
+        await asyncio.wait_for(self.service.close(), 1)
+
+    async def test_cancelled_transaction_skipped(self):
+        cancelled = self.service.submit('A1', 'deposit', 10)
+        cancelled.cancel()
+        await self.service.deposit('A1', 5)
+        self.assertEqual(5, self.registry['A1'].balance)
+
+    async def test_close(self):
+        futures = [self.service.submit('A1', 'deposit', 1) for _ in range(5)]
+        await self.service.close()
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertEqual(5, self.registry['A1'].balance)
+        with self.assertRaises(RuntimeError):
+            self.service.submit('A1', 'deposit', 1)
+        async with AccountService(self.registry) as service:
+            service.submit('A2', 'deposit', 1)
+        self.assertEqual(1, self.registry['A2'].balance)
+
+    async def test_overlapping_close(self):
+        # one transaction per drain, so both close() calls start while transactions are still queued
+        service = AccountService(self.registry, max_batch=1)
+        futures = [service.submit('A1', 'deposit', 1) for _ in range(5)]
+        await asyncio.wait_for(asyncio.gather(service.close(), service.close()), 1)
+        self.assertTrue(all(future.done() for future in futures))
+        await asyncio.wait_for(service.close(), 1)
+
+
+def run_tests(test_class):
+    suite = unittest.TestLoader().loadTestsFromTestCase(test_class)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
+
+
+run_tests(TestAccountService)
@@ -1,5 +1,16 @@
-from OOP.bank_account import Timezone, Account
+from OOP.bank_account import Timezone, Account, ConfirmationCodeGenerator, Confirmation, AccountRegistry, \
+    InterestBatch, post_interest
+from OOP.ledger import Ledger, read_snapshot, recover
 from datetime import datetime, timedelta
+from decimal import Decimal
+from fractions import Fraction
+from unittest import mock
+import io
+import os
+import pickle
+import tempfile
+import threading
+import time
 import unittest
 
 """Basic tests performed on the classes in bank_account file."""
@@ -28,6 +39,40 @@ class TestAccount(unittest.TestCase):
         for test_tz in test_timezones:
             self.assertNotEqual(tz1, test_tz)
 
+    def test_timezone_hash(self):
+        self.assertEqual(hash(Timezone('ABC', -1, -30)), hash(Timezone(' ABC ', -1, -30)))
+        self.assertEqual(1, len({Timezone('ABC', -1, -30), Timezone('ABC', -1, -30)}))
+        self.assertEqual(2, len({Timezone('ABC', -1, -30), Timezone('ABC', -1, 0)}))
+
+    def test_interned_timezone(self):
+        tz = Timezone.get('ABC', -1, -30)
+        self.assertIs(tz, Timezone.get('ABC', -1, -30))
+        self.assertIs(tz, Timezone.get(' ABC', -1, -30))
+        self.assertEqual(Timezone('ABC', -1, -30), tz)
+        self.assertIsNot(tz, Timezone.get('ABC', -1, 0))
+        self.assertIs(Timezone.get(['X'], 1), Timezone.get("['X']", 1))
+        for arguments in (('', 1), ('ABC', 1.5), ('ABC', 1, 60), ('ABC', 15)):
+            with self.assertRaises(ValueError):
+                Timezone.get(*arguments)
+        # equal to cached arguments, but not valid ones
+        for arguments in (('UTC', 0.0, 0.0), ('ABC', -1.0, -30)):
+            with self.assertRaises(ValueError):
+                Timezone.get(*arguments)
+        self.assertEqual(('1', 'True'), (Timezone.get(1, 0).name, Timezone.get(True, 0).name))
+
+    def test_slots(self):
+        a = Account(self.account_number, self.first_name, self.last_name, initial_balance=self.balance)
+        for obj in (a, self.tz):
+            self.assertFalse(hasattr(obj, '__dict__'))
+            with self.assertRaises(AttributeError):
+                obj.other = 1
+        # accounts without a zone of their own share the UTC instance
+        self.assertIs(a.timezone, Account('B1', 'FIRST', 'LAST').timezone)
+        self.assertIs(a.timezone, Timezone.get('UTC', 0))
+        copy = pickle.loads(pickle.dumps(a))
+        self.assertEqual((a.account_number, a.full_name, a.balance, a.timezone),
+                         (copy.account_number, copy.full_name, copy.balance, copy.timezone))
+
     def test_create_account(self):
 
         a = Account(self.account_number, self.first_name, self.last_name, self.tz, self.balance)
@@ -49,6 +94,35 @@ class TestAccount(unittest.TestCase):
         with self.assertRaises(ValueError):
             a = Account(self.account_number, self.first_name, self.last_name, initial_balance=self.balance)
 
+    def test_validate_real_number(self):
+        class Amount(float):
+            pass
+
+        for value in (10, 10.5, True, Fraction(21, 2), Amount(10.5)):
+            self.assertIs(value, Account.validate_real_number(value, 0))
+        for value in ('10', None, Decimal('10.5'), 1j):
+            with self.assertRaises(ValueError):
+                Account.validate_real_number(value)
+        with self.assertRaises(ValueError):
+            Account.validate_real_number(0.001, 0.01)
+
+    def test_validate_name(self):
+        self.assertEqual('Eric', Account.validate_name('  Eric ', 'Name'))
+        self.assertEqual('42', Account.validate_name(42, 'Name'))
+        for value in ('', '   ', None):
+            with self.assertRaises(ValueError):
+                Account.validate_name(value, 'Name')
+
+    def test_load_trusted(self):
+        accounts = Account.load_trusted([('A1', 'Eric', 'Idle', 10.0), ('A2', 'John', 'Cleese', 0)])
+        self.assertEqual(['A1', 'A2'], [a.account_number for a in accounts])
+        self.assertEqual('John Cleese', accounts[1].full_name)
+        self.assertEqual(Timezone('UTC', 0), accounts[0].timezone)
+        self.assertEqual(10.0, accounts[0].balance)
+        self.assertTrue(accounts[0].deposit(5).startswith('D-'))
+        self.assertEqual(15.0, accounts[0].balance)
+        self.assertEqual(self.tz, Account.load_trusted([('A3', 'Eric', 'Idle', 1)], self.tz)[0].timezone)
+
     def test_account_withdraw_ok(self):
         withdrawal_amount = 20
         a = Account(self.account_number, self.first_name, self.last_name, initial_balance=self.balance)
@@ -63,6 +137,348 @@ class TestAccount(unittest.TestCase):
         self.assertTrue(conf_code.startswith('X-'))
         self.assertEqual(self.balance, a.balance)
 
+    def test_balance_unchanged_when_ledger_fails(self):
+        a = Account(self.account_number, self.first_name, self.last_name, initial_balance=self.balance)
+        ledger = mock.Mock()
+        ledger.append.side_effect = OSError('No space left on device')
+        with mock.patch.object(Account, 'ledger', ledger):
+            for transaction in (lambda: a.deposit(10), lambda: a.withdraw(10), a.pay_interest):
+                with self.assertRaises(OSError):
+                    transaction()
+                self.assertEqual(self.balance, a.balance)
+        # the record carries the balance the account would have had
+        self.assertEqual(self.balance + 10, ledger.append.call_args_list[0].args[4])
+
+
+class TestConfirmationCodeGenerator(unittest.TestCase):
+    def test_code_format(self):
+        generator = ConfirmationCodeGenerator(start=5)
+        with mock.patch('OOP.bank_account.time.time', return_value=1700000000.7):
+            self.assertEqual('D-A100-20231114221320-5', generator('D', 'A100'))
+            self.assertEqual('W-A100-20231114221320-6', generator('W', 'A100'))
+
+    def test_prefix(self):
+        generator = ConfirmationCodeGenerator(prefix='w3.')
+        self.assertEqual('w3.', generator.prefix)
+        self.assertTrue(generator('D', 'A100').endswith('-w3.100'))
+        with self.assertRaises(ValueError):
+            ConfirmationCodeGenerator(prefix='w-3')
+        for prefix in ('1', 'w3'):
+            with self.assertRaises(ValueError):
+                ConfirmationCodeGenerator(prefix=prefix)
+
+    def test_timestamp_cached_and_monotonic(self):
+        generator = ConfirmationCodeGenerator()
+        with mock.patch('OOP.bank_account.time.time', return_value=1700000000.2):
+            first = generator.timestamp()
+        with mock.patch('OOP.bank_account.time.strftime') as strftime, \
+                mock.patch('OOP.bank_account.time.time', return_value=1700000000.9):
+            self.assertEqual(first, generator.timestamp())
+            strftime.assert_not_called()
+        # a clock stepping back must not make codes go back in time
+        with mock.patch('OOP.bank_account.time.time', return_value=1699999990.0):
+            self.assertEqual(first, generator.timestamp())
+        with mock.patch('OOP.bank_account.time.time', return_value=1700000001.0):
+            self.assertEqual('20231114221321', generator.timestamp())
+
+    def test_timestamp_not_replaced_by_older(self):
+        generator, strftime = ConfirmationCodeGenerator(), time.strftime
+        times = {'older': 1700000001.0, 'newer': 1700000002.0}
+        formatting, release = threading.Event(), threading.Event()
+
+        def slow_strftime(format, t):
+            if threading.current_thread().name == 'older':
+                formatting.set()
+                release.wait(5)
+            return strftime(format, t)
+
+        with mock.patch('OOP.bank_account.time.time', side_effect=lambda: times[threading.current_thread().name]), \
+                mock.patch('OOP.bank_account.time.strftime', side_effect=slow_strftime):
+            older = threading.Thread(target=generator.timestamp, name='older')
+            newer = threading.Thread(target=generator.timestamp, name='newer')
+            older.start()
+            formatting.wait(5)
+            # the newer second is read while the older one is still being formatted
+            newer.start()
+            newer.join(0.1)
+            release.set()
+            older.join()
+            newer.join()
+        self.assertEqual((1700000002, '20231114221322'), generator._stamp)
+
+    def test_threads_get_unique_codes(self):
+        generator, codes = ConfirmationCodeGenerator(), []
+
+        def worker():
+            codes.extend(generator('D', 'A100') for _ in range(5000))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(40000, len(set(codes)))
+
+    def test_account_uses_generator(self):
+        a = Account('A100', 'FIRST', 'LAST', initial_balance=100)
+        with mock.patch.object(Account, 'code_generator', ConfirmationCodeGenerator(prefix='p7.')):
+            conf_code = a.deposit(10)
+        self.assertTrue(conf_code.startswith('D-A100-'))
+        self.assertTrue(conf_code.endswith('-p7.100'))
+
+
+class TestConfirmationCodeParser(unittest.TestCase):
+    def setUp(self) -> None:
+        self.codes = ['D-A100-20231114221320-100', 'W-A100-20231114221320-101', 'X-B7-20231231235959-w2.5']
+        self.tz = Timezone('TZ', 1, 30)
+
+    def test_parse_confirmation_code(self):
+        self.assertEqual(Confirmation('A100', 'D', '100', '2023-11-14T22:13:20', '2023-11-14 22:13:20 (UTC)'),
+                         Account.parse_confirmation_code(self.codes[0]))
+        self.assertEqual(Confirmation('B7', 'X', 'w2.5', '2023-12-31T23:59:59', '2024-01-01 01:29:59 (TZ)'),
+                         Account.parse_confirmation_code(self.codes[2], self.tz))
+
+    def test_parse_invalid(self):
+        for code in ('D-A100-20231114221320', 'D-A100-2023111422132-1', 'D-A100-20231314221320-1',
+                     'D-A100-2023111422132x-1', 'D-A100-２0231114221320-1'):
+            with self.assertRaises(ValueError):
+                Account.parse_confirmation_code(code)
+        with self.assertRaises(ValueError):
+            Account.parse_confirmation_code(self.codes[0], 'UTC')
+
+    def test_parse_generated_code(self):
+        a = Account('A100', 'FIRST', 'LAST', initial_balance=100)
+        conf_code = a.withdraw(10)
+        parsed = Account.parse_confirmation_code(conf_code)
+        self.assertEqual(('A100', 'W'), (parsed.account_number, parsed.transaction_code))
+        self.assertEqual(conf_code.split('-')[2], datetime.fromisoformat(parsed.time_utc).strftime('%Y%m%d%H%M%S'))
+
+    def test_parse_many(self):
+        log = io.StringIO('\n'.join(self.codes[:2] + ['', '  '] + self.codes[2:]) + '\n')
+        parsed = Account.parse_confirmation_codes(log, self.tz)
+        self.assertNotIsInstance(parsed, list)
+        self.assertEqual([Account.parse_confirmation_code(code, self.tz) for code in self.codes], list(parsed))
+        with self.assertRaises(ValueError):
+            list(Account.parse_confirmation_codes(['D-A100-20231114221320-1', 'bad']))
+
+    def test_parse_columnar(self):
+        columns = Account.parse_confirmation_codes_columnar(self.codes)
+        self.assertEqual(['A100', 'A100', 'B7'], columns.account_number)
+        self.assertEqual(['D', 'W', 'X'], columns.transaction_code)
+        self.assertEqual(['100', '101', 'w2.5'], columns.transaction_id)
+        self.assertEqual(['2023-11-14T22:13:20'] * 2 + ['2023-12-31T23:59:59'], columns.time_utc)
+        self.assertEqual(Confirmation([], [], [], [], []), Account.parse_confirmation_codes_columnar([]))
+
+
+class TestAccountRegistry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = AccountRegistry(shards=8)
+        for number in range(20):
+            self.registry.add(Account(f'A{number}', 'FIRST', 'LAST', initial_balance=100))
+
+    def test_lookup(self):
+        self.assertEqual(20, len(self.registry))
+        self.assertIn('A7', self.registry)
+        self.assertNotIn('B7', self.registry)
+        self.assertEqual('A7', self.registry['A7'].account_number)
+        self.assertIsNone(self.registry.get('B7'))
+        self.assertEqual({f'A{number}' for number in range(20)}, {a.account_number for a in self.registry})
+        with self.assertRaises(KeyError):
+            self.registry['B7']
+        with self.assertRaises(ValueError):
+            self.registry.add(Account('A7', 'OTHER', 'LAST'))
+        with self.assertRaises(ValueError):
+            AccountRegistry(shards=0)
+        self.assertEqual('A7', self.registry.remove('A7').account_number)
+        self.assertEqual(19, len(self.registry))
+
+    def test_deposit_withdraw(self):
+        self.assertTrue(self.registry.deposit('A1', 50).startswith('D-A1-'))
+        self.assertTrue(self.registry.withdraw('A1', 30).startswith('W-A1-'))
+        self.assertTrue(self.registry.withdraw('A1', 1000).startswith('X-A1-'))
+        self.assertEqual(120, self.registry['A1'].balance)
+        with self.assertRaises(KeyError):
+            self.registry.deposit('B1', 10)
+
+    def test_transfer(self):
+        withdraw_code, deposit_code = self.registry.transfer('A1', 'A2', 60)
+        self.assertTrue(withdraw_code.startswith('W-A1-'))
+        self.assertTrue(deposit_code.startswith('D-A2-'))
+        self.assertEqual((40, 160), (self.registry['A1'].balance, self.registry['A2'].balance))
+
+        withdraw_code, deposit_code = self.registry.transfer('A1', 'A2', 60)
+        self.assertTrue(withdraw_code.startswith('X-A1-'))
+        self.assertIsNone(deposit_code)
+        self.assertEqual((40, 160), (self.registry['A1'].balance, self.registry['A2'].balance))
+
+        with self.assertRaises(ValueError):
+            self.registry.transfer('A1', 'A1', 10)
+        with self.assertRaises(ValueError):
+            self.registry.transfer('A1', 'A2', -10)
+        with self.assertRaises(KeyError):
+            self.registry.transfer('A1', 'B2', 10)
+        self.assertEqual(40, self.registry['A1'].balance)
+
+    def test_transfer_ledger_fails(self):
+        ledger = mock.Mock()
+        ledger.append.side_effect = OSError('No space left on device')
+        with mock.patch.object(Account, 'ledger', ledger):
+            with self.assertRaises(OSError):
+                self.registry.transfer('A1', 'A2', 60)
+        self.assertEqual((100, 100), (self.registry['A1'].balance, self.registry['A2'].balance))
+
+        # the withdrawal is recorded but the deposit isn't: the withdrawal is reversed
+        ledger.append.side_effect = [None, OSError('No space left on device'), None]
+        with mock.patch.object(Account, 'ledger', ledger):
+            with self.assertRaises(OSError):
+                self.registry.transfer('A1', 'A2', 60)
+        self.assertEqual((100, 100), (self.registry['A1'].balance, self.registry['A2'].balance))
+        calls = ledger.append.call_args_list[1:]
+        self.assertEqual([('A1', 'withdraw'), ('A2', 'deposit'), ('A1', 'deposit')],
+                         [call.args[1:3] for call in calls])
+
+    def test_concurrent_transfers(self):
+        # opposite transfers between the same accounts would deadlock without ordered locking
+        errors = []
+
+        def worker(seed):
+            try:
+                for i in range(2000):
+                    a, b = f'A{(seed + i) % 20}', f'A{(seed * 7 + i * 3 + 1) % 20}'
+                    if a != b:
+                        self.registry.transfer(a, b, 1 + i % 5)
+                        self.registry.transfer(b, a, 1 + i % 3)
+            except Exception as ex:
+                errors.append(ex)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=60)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual([], errors)
+        balances = self.registry.balances()
+        self.assertEqual(2000, sum(balances.values()))
+        self.assertTrue(all(balance >= 0 for balance in balances.values()))
+
+    def test_periodic_snapshots(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path, snapshot_path = os.path.join(directory, 'ledger'), os.path.join(directory, 'snapshot')
+            ledger = Ledger(path, batch_size=1, fsync='never', snapshot_path=snapshot_path,
+                            balances=self.registry.balances, snapshot_every=5)
+
+            def worker(offset):
+                for i in range(50):
+                    self.registry.deposit(f'A{(i + offset) % 20}', 1)
+
+            with mock.patch.object(Account, 'ledger', ledger):
+                threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join(10)
+                self.assertFalse(any(thread.is_alive() for thread in threads), 'deposits deadlocked')
+                ledger.close()
+            self.assertGreater(read_snapshot(snapshot_path).ledger_offset, 0)
+            self.assertEqual(self.registry.balances(), recover(path, snapshot_path))
+
+
+class TestInterestBatch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.balances = [0, 100, 1234.56, 1e9, 0.07]
+
+    def accounts(self):
+        return [Account(f'A{i}', 'FIRST', 'LAST', initial_balance=b) for i, b in enumerate(self.balances)]
+
+    def test_same_as_pay_interest(self):
+        one_by_one, batch = self.accounts(), self.accounts()
+        for account in one_by_one:
+            account.pay_interest()
+        posting = post_interest(batch)
+        self.assertEqual([a.balance for a in one_by_one], [a.balance for a in batch])
+        self.assertEqual([a.balance for a in batch], posting.balances.tolist())
+        self.assertEqual(['A0', 'A1', 'A2', 'A3', 'A4'], posting.account_numbers)
+        self.assertEqual(0.5, posting.interest[1])
+
+    def test_rates(self):
+        accounts = self.accounts()
+        batch = InterestBatch(accounts)
+        posting = batch.post([0, 1, 2, 3, 4])
+        self.assertEqual([0, 101, 1234.56 * 1.02], posting.balances.tolist()[:3])
+        self.assertEqual(100, accounts[1].balance)
+        batch.write_back()
+        self.assertEqual(101, accounts[1].balance)
+        self.assertEqual([0, 1.01], post_interest(accounts[:2], 1).interest.tolist())
+        self.assertEqual(102.01, accounts[1].balance)
+        with self.assertRaises(ValueError):
+            InterestBatch(accounts).post([1, 2])
+        with self.assertRaises(ValueError):
+            InterestBatch(accounts).post(-1)
+
+    def test_confirmation_codes(self):
+        with mock.patch.object(Account, 'code_generator', ConfirmationCodeGenerator(prefix='b.', start=7)):
+            posting = post_interest(self.accounts())
+        self.assertEqual(5, len(set(posting.confirmation_codes)))
+        self.assertTrue(posting.confirmation_codes[0].startswith('I-A0-'))
+        self.assertTrue(posting.confirmation_codes[4].endswith('-b.11'))
+        parsed = Account.parse_confirmation_code(posting.confirmation_codes[2])
+        self.assertEqual(('A2', 'I', 'b.9'), (parsed.account_number, parsed.transaction_code, parsed.transaction_id))
+
+    def test_registry_and_ledger(self):
+        registry = AccountRegistry()
+        for account in self.accounts():
+            registry.add(account)
+        ledger = mock.Mock()
+        with mock.patch.object(Account, 'ledger', ledger):
+            posting = post_interest(registry)
+        self.assertEqual(dict(zip(posting.account_numbers, posting.balances.tolist())), registry.balances())
+        codes, numbers, transaction, amounts, balances = ledger.append_many.call_args.args
+        self.assertEqual((posting.confirmation_codes, posting.account_numbers, 'interest'), (codes, numbers, transaction))
+        self.assertEqual(posting.balances.tolist(), balances)
+
+    def test_ledger_only_after_write_back(self):
+        accounts = self.accounts()
+        ledger = mock.Mock()
+        with mock.patch.object(Account, 'ledger', ledger):
+            batch = InterestBatch(accounts)
+            batch.post(1)
+            posting = batch.post(2)  # replaces the first posting
+            ledger.append_many.assert_not_called()
+            self.assertEqual(100, accounts[1].balance)
+            batch.write_back()
+        self.assertEqual(102, accounts[1].balance)
+        ledger.append_many.assert_called_once()
+        self.assertEqual(posting.confirmation_codes, ledger.append_many.call_args.args[0])
+        self.assertEqual([0, 102], ledger.append_many.call_args.args[4][:2])
+
+    def test_changed_balance_not_overwritten(self):
+        registry = AccountRegistry()
+        for account in self.accounts():
+            registry.add(account)
+        batch = InterestBatch(registry)
+        batch.post()
+        registry.deposit('A1', 50)
+        with self.assertRaises(ValueError):
+            batch.write_back()
+        self.assertEqual(150, registry['A1'].balance)
+        self.assertEqual(1234.56, registry['A2'].balance)
+        post_interest(registry)
+        self.assertEqual(150.75, registry['A1'].balance)
+
+    def test_registry_locked_while_posting(self):
+        registry = AccountRegistry(shards=4)
+        for account in self.accounts():
+            registry.add(account)
+        with registry.locked():
+            thread = threading.Thread(target=post_interest, args=(registry,))
+            thread.start()
+            thread.join(0.1)
+            self.assertTrue(thread.is_alive())
+            self.assertEqual(100, registry['A1'].balance)
+        thread.join()
+        self.assertEqual(100.5, registry['A1'].balance)
+
 
 def run_tests(test_class):
     suite = unittest.TestLoader().loadTestsFromTestCase(test_class)
@@ -71,3 +487,7 @@ def run_tests(test_class):
 
 
 run_tests(TestAccount)
+run_tests(TestConfirmationCodeGenerator)
+run_tests(TestConfirmationCodeParser)
+run_tests(TestAccountRegistry)
+run_tests(TestInterestBatch)
@@ -0,0 +1,259 @@
+from OOP.credit_calculator import batch_differential_payment, batch_annuity_payment, batch_credit_principal, \
+    batch_periods, calculate, read_loans, bulk_calculate, write_results, differential_schedule, \
+    differential_month_payment, differential_summary, main, annuity_factor, sweep_annuity_payment, \
+    sweep_credit_principal, calc_annuity_payment, calc_credit_principal, calc_periods, exact_annuity_payment, \
+    exact_credit_principal, exact_periods
+from fractions import Fraction
+from contextlib import redirect_stdout
+import io
+import itertools
+import random
+import unittest
+
+"""Basic tests performed on the schedule, batch and bulk functions in the credit_calculator file."""
+
+
+class TestDifferentialSchedule(unittest.TestCase):
+    def test_summary_matches_schedule(self):
+        for principal, n, interest in ((500000, 8, 7.8), (1000000, 360, 23.5), (3200000, 240, 9.6),
+                                       (1200000, 12, 12), (1234567, 3650, 7.3), (1000, 1, 10)):
+            total = sum(differential_schedule(principal, n, interest))
+            self.assertEqual((total, total - principal), differential_summary(principal, n, interest))
+
+    def test_summary_matches_schedule_random(self):
+        rng = random.Random(3)
+        cases = [(288716056343, 533, 29.9448), (948754678922, 342, 28.001)]
+        for _ in range(500):
+            principal = rng.choice((rng.randint(1, 10 ** 6), rng.randint(1, 10 ** 12), rng.randint(1, 10 ** 15)))
+            interest = rng.choice((rng.randint(1, 40), round(rng.uniform(0.1, 40), rng.randint(1, 4))))
+            cases.append((principal, rng.randint(1, 600), interest))
+        for principal, n, interest in cases:
+            total = sum(differential_schedule(principal, n, interest))
+            self.assertEqual((total, total - principal), differential_summary(principal, n, interest))
+
+    def test_summary_whole_payments(self):
+        # every payment is whole, each one is rounded the way the float schedule does
+        total = sum(differential_schedule(10 ** 9, 10 ** 5, 12))
+        self.assertEqual((total, total - 10 ** 9), differential_summary(10 ** 9, 10 ** 5, 12))
+
+    def test_month_payment(self):
+        schedule = list(differential_schedule(500000, 8, 7.8))
+        for m, payment in enumerate(schedule, 1):
+            self.assertEqual(payment, differential_month_payment(500000, 8, 7.8, m))
+        with self.assertRaises(ValueError):
+            differential_month_payment(500000, 8, 7.8, 9)
+
+    def test_exact_schedule(self):
+        for principal, n, interest in ((500000, 8, 7.8), (161658, 49, 25), (1234567, 365, 7.3)):
+            total = sum(differential_schedule(principal, n, interest, exact=True))
+            self.assertEqual((total, total - principal), differential_summary(principal, n, interest, exact=True))
+
+    def test_schedule_is_lazy(self):
+        first = list(itertools.islice(differential_schedule(500000, 10 ** 12, 7.8), 2))
+        self.assertEqual(2, len(first))
+
+
+class TestBatchCalculator(unittest.TestCase):
+    def test_batch_differential_payment(self):
+        total, overpayment = batch_differential_payment([1000000, 500000], [10, 8], [10, 7.8])
+        self.assertEqual([1045837, 514628], total.tolist())
+        self.assertEqual([45837, 14628], overpayment.tolist())
+
+    def test_batch_differential_payment_invalid_periods(self):
+        with self.assertRaises(ValueError):
+            batch_differential_payment([1000], [0], [10])
+
+    def test_batch_differential_payment_matches_schedule(self):
+        principals, periods, rates = [[1234567, 3200000], [1000, 500000]], [[3650, 240], [1, 8]], 7.3
+        total, overpayment = batch_differential_payment(principals, periods, rates)
+        self.assertEqual((2, 2), total.shape)
+        for row in range(2):
+            for column in range(2):
+                expected = sum(differential_schedule(principals[row][column], periods[row][column], rates))
+                self.assertEqual(expected, total[row, column])
+                self.assertEqual(expected - principals[row][column], overpayment[row, column])
+
+    def test_batch_invalid_inputs(self):
+        for function in (batch_annuity_payment, batch_credit_principal):
+            with self.assertRaises(ValueError):
+                function([1000, 1000], [12, 12], [10, 0])
+            with self.assertRaises(ValueError):
+                function([1000], [0], [10])
+        with self.assertRaises(ValueError):
+            batch_periods([500000, 500000], [23000, 3000], [7.8, 7.8])
+        with self.assertRaises(ValueError):
+            batch_periods([500000], [23000], [0])
+
+    def test_batch_annuity_payment(self):
+        payment, overpayment = batch_annuity_payment([1000000, 500000], [60, 8], [10, 7.8])
+        self.assertEqual([21248, 64342], payment.tolist())
+        self.assertEqual([274880, 14736], overpayment.tolist())
+
+    def test_batch_credit_principal(self):
+        principal, overpayment = batch_credit_principal([8722], [120], [5.6])
+        self.assertEqual([800018], principal.tolist())
+        self.assertEqual([246622], overpayment.tolist())
+
+    def test_batch_periods(self):
+        n, overpayment = batch_periods([500000, 500000], [23000, 5000], [7.8, 7.8])
+        self.assertEqual([24, 163], n.tolist())
+        self.assertEqual([52000, 315000], overpayment.tolist())
+
+    def test_broadcasting(self):
+        payment, _ = batch_annuity_payment(1000000, [60, 60], 10)
+        self.assertEqual([21248, 21248], payment.tolist())
+
+
+class TestExactMode(unittest.TestCase):
+    def test_exact_annuity_payment(self):
+        self.assertEqual((21248, 274880), exact_annuity_payment(1000000, 60, 10))
+        for principal, n, interest in ((500000, 8, 7.8), (1234567, 480, 3.3), (1000, 1, 10)):
+            i = Fraction(str(interest)) / 1200
+            factor = i * (1 + i) ** n / ((1 + i) ** n - 1)
+            self.assertEqual(-(-principal * factor // 1), exact_annuity_payment(principal, n, interest)[0])
+            self.assertEqual(calc_annuity_payment(principal, n, interest), exact_annuity_payment(principal, n, interest))
+
+    def test_exact_credit_principal(self):
+        self.assertEqual((800018, 246622), exact_credit_principal(8722, 120, 5.6))
+        self.assertEqual(calc_credit_principal(23000, 480, 7.8), exact_credit_principal(23000, 480, 7.8))
+
+    def test_exact_periods(self):
+        self.assertEqual((24, 52000), exact_periods(500000, 23000, 7.8))
+        self.assertEqual(calc_periods(500000, 5000, 7.8), exact_periods(500000, 5000, 7.8))
+        with self.assertRaises(ValueError):
+            exact_periods(1000, 1, 10)
+
+    def test_exact_differential_summary(self):
+        # the float schedule rounds a few whole payments up, the exact one doesn't
+        self.assertEqual((4534969, 3534969), differential_summary(1000000, 360, 23.5, exact=True))
+        self.assertEqual((4534970, 3534970), differential_summary(1000000, 360, 23.5))
+
+    def test_calculate_exact(self):
+        loan = {'type': 'diff', 'principal': 1000000, 'periods': 360, 'interest': 23.5}
+        self.assertEqual(3534969, calculate(loan, exact=True)['overpayment'])
+        self.assertEqual(3534970, calculate(loan)['overpayment'])
+
+
+class TestRateSweep(unittest.TestCase):
+    def test_sweep_annuity_payment(self):
+        principals, rates, periods = [1000000, 500000, 1234], [5.6, 7.8, 10], [8, 60, 120]
+        matrix = sweep_annuity_payment(principals, rates, periods)
+        self.assertEqual((3, 3, 3), matrix.shape)
+        for k, principal in enumerate(principals):
+            for r, rate in enumerate(rates):
+                for t, n in enumerate(periods):
+                    self.assertEqual(calc_annuity_payment(principal, n, rate)[0], matrix[k, r, t])
+
+    def test_sweep_credit_principal(self):
+        matrix = sweep_credit_principal([8722, 23000], [5.6, 7.8], [120])
+        self.assertEqual((2, 2, 1), matrix.shape)
+        self.assertEqual(800018, matrix[0, 0, 0])
+        self.assertEqual(calc_credit_principal(23000, 120, 7.8)[0], matrix[1, 1, 0])
+
+    def test_factor_is_memoized(self):
+        annuity_factor.cache_clear()
+        sweep_annuity_payment([1000, 2000], [5.6, 7.8], [12, 24, 36])
+        sweep_annuity_payment([3000], [5.6, 7.8], [12, 24, 36])
+        info = annuity_factor.cache_info()
+        self.assertEqual(6, info.misses)
+        self.assertEqual(6, info.hits)
+
+
+class TestBulkCalculator(unittest.TestCase):
+    def test_calculate(self):
+        self.assertEqual(21248, calculate({'type': 'annuity', 'principal': 1000000, 'periods': 60,
+                                           'interest': 10})['payment'])
+        self.assertEqual(800018, calculate({'type': 'annuity', 'payment': 8722, 'periods': 120,
+                                            'interest': 5.6})['principal'])
+        self.assertEqual(24, calculate({'type': 'annuity', 'principal': 500000, 'payment': 23000,
+                                        'interest': 7.8})['periods'])
+        self.assertEqual(14628, calculate({'type': 'diff', 'principal': 500000, 'periods': 8,
+                                           'interest': 7.8})['overpayment'])
+
+    def test_calculate_incorrect_parameters(self):
+        for loan in ({'type': 'diff', 'principal': 500000, 'periods': 8, 'interest': 7.8, 'payment': 10},
+                     {'type': 'annuity', 'principal': -1, 'periods': 8, 'interest': 7.8},
+                     {'type': 'annuity', 'principal': 1, 'interest': 7.8},
+                     {'type': 'other', 'principal': 1, 'periods': 8, 'interest': 7.8}):
+            with self.assertRaises(ValueError):
+                calculate(loan)
+
+    def test_bulk_csv(self):
+        source = io.StringIO('type,principal,periods,interest,payment\n'
+                             'annuity,1000000,60,10,\n'
+                             'annuity,abc,60,10,\n')
+        output = io.StringIO()
+        write_results(bulk_calculate(read_loans(source)), output)
+        lines = output.getvalue().splitlines()
+        self.assertEqual('type,principal,periods,interest,payment,overpayment,error', lines[0])
+        self.assertEqual('annuity,1000000,60,10.0,21248,274880,', lines[1])
+        self.assertTrue(lines[2].startswith('annuity,abc,60,10,,,'))
+
+    def test_bulk_jsonl(self):
+        source = io.StringIO('{"type": "diff", "principal": 500000, "periods": 8, "interest": 7.8}\n\n{oops\n'
+                             '[1, 2]\n5\n{"type": "annuity", "principal": -1}\n'
+                             '{"type": "annuity", "principal": 1000000, "periods": 60, "interest": 10}\n')
+        results = list(bulk_calculate(read_loans(source, 'jsonl')))
+        self.assertEqual(6, len(results))
+        self.assertEqual(14628, results[0]['overpayment'])
+        self.assertEqual('{oops', results[1]['input'])
+        self.assertEqual('[1, 2]', results[2]['input'])
+        self.assertEqual('5', results[3]['input'])
+        self.assertTrue(all('error' in result for result in results[1:5]))
+        self.assertEqual({'type': 'annuity', 'principal': -1, 'error': 'Incorrect parameters'}, results[4])
+        self.assertEqual(21248, results[5]['payment'])
+
+
+class TestMain(unittest.TestCase):
+    def run_main(self, *argv):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            main(list(argv))
+        return output.getvalue().splitlines()
+
+    def test_annuity_payment(self):
+        self.assertEqual(['Your annuity payment = 21248!', 'Overpayment = 274880'],
+                         self.run_main('--type=annuity', '--principal=1000000', '--periods=60', '--interest=10'))
+
+    def test_periods(self):
+        self.assertEqual(['You need 2 years to repay this credit!', 'Overpayment = 52000'],
+                         self.run_main('--type=annuity', '--principal=500000', '--payment=23000', '--interest=7.8'))
+
+    def test_differential_payment(self):
+        lines = self.run_main('--type=diff', '--principal=500000', '--periods=8', '--interest=7.8')
+        self.assertEqual('Month 1: paid out 65750', lines[0])
+        self.assertEqual('Overpayment = 14628', lines[-1])
+        self.assertEqual(['Overpayment = 14628'],
+                         self.run_main('--type=diff', '--principal=500000', '--periods=8', '--interest=7.8',
+                                       '--summary'))
+
+    def test_exact(self):
+        # float rounding pushes both of these up by one
+        annuity = ('--type=annuity', '--principal=9392600', '--periods=1', '--interest=18')
+        self.assertEqual('Your annuity payment = 9533490!', self.run_main(*annuity)[0])
+        self.assertEqual('Your annuity payment = 9533489!', self.run_main(*annuity, '--exact')[0])
+        diff = ('--type=diff', '--principal=161658', '--periods=49', '--interest=25')
+        self.assertEqual(['Overpayment = 84222'], self.run_main(*diff, '--summary'))
+        self.assertEqual(['Overpayment = 84221'], self.run_main(*diff, '--summary', '--exact'))
+        self.assertEqual('Overpayment = 84221', self.run_main(*diff, '--exact')[-1])
+        self.assertEqual(['You need 2 years to repay this credit!', 'Overpayment = 52000'],
+                         self.run_main('--type=annuity', '--principal=500000', '--payment=23000', '--interest=7.8',
+                                       '--exact'))
+
+    def test_incorrect_parameters(self):
+        self.assertEqual(['Incorrect parameters'],
+                         self.run_main('--type=diff', '--principal=500000', '--periods=8', '--payment=10'))
+
+
+def run_tests(test_class):
+    suite = unittest.TestLoader().loadTestsFromTestCase(test_class)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
+
+
+run_tests(TestDifferentialSchedule)
+run_tests(TestBatchCalculator)
+run_tests(TestExactMode)
+run_tests(TestRateSweep)
+run_tests(TestBulkCalculator)
+run_tests(TestMain)
@@ -0,0 +1,270 @@
+from OOP.ledger import Ledger, LedgerRecord, Snapshot, read_records, replay, write_snapshot, read_snapshot, recover
+from OOP.bank_account import Account
+from decimal import Decimal
+from fractions import Fraction
+from unittest import mock
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+"""Basic tests performed on the Ledger class and the replay functions in the ledger file."""
+
+
+class TestLedger(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'transactions.ledger')
+
+    def tearDown(self) -> None:
+        Account.ledger = None
+        self.directory.cleanup()
+
+    def read_lines(self):
+        with open(self.path) as file:
+            return file.read().splitlines()
+
+    def test_create_ledger(self):
+        with self.assertRaises(ValueError):
+            Ledger(self.path, fsync='sometimes')
+        with self.assertRaises(ValueError):
+            Ledger(self.path, batch_size=0)
+
+    def test_group_commit(self):
+        with mock.patch('OOP.ledger.os.fsync') as fsync:
+            ledger = Ledger(self.path, batch_size=3, max_delay=60)
+            ledger.append('D-A1-20240101000000-1', 'A1', 'deposit', 10, 10)
+            ledger.append('D-A1-20240101000000-2', 'A1', 'deposit', 5, 15)
+            self.assertEqual(2, ledger.pending)
+            self.assertEqual([], self.read_lines())
+            ledger.append('W-A1-20240101000000-3', 'A1', 'withdraw', 1.5, 13.5)
+            self.assertEqual(0, ledger.pending)
+            self.assertEqual(3, len(self.read_lines()))
+            self.assertEqual(1, fsync.call_count)
+            ledger.append('D-A2-20240101000000-4', 'A2', 'deposit', 1, 1)
+            ledger.close()
+            self.assertEqual(2, fsync.call_count)
+        self.assertEqual('W-A1-20240101000000-3\tA1\twithdraw\t1.5\t13.5', self.read_lines()[2])
+        self.assertEqual(4, len(self.read_lines()))
+
+    def test_fsync_policies(self):
+        for policy, calls, after_close in (('always', 4, 4), ('batch', 2, 2), ('interval', 0, 1), ('never', 0, 0)):
+            with mock.patch('OOP.ledger.os.fsync') as fsync:
+                with Ledger(self.path, batch_size=2, fsync=policy, max_delay=60, fsync_interval=60) as ledger:
+                    for i in range(4):
+                        ledger.append(f'D-A1-20240101000000-{i}', 'A1', 'deposit', 1, i + 1)
+                    self.assertEqual(calls, fsync.call_count, policy)
+                self.assertEqual(after_close, fsync.call_count, policy)
+
+    def test_append_many(self):
+        with Ledger(self.path, batch_size=4, fsync='never', max_delay=60) as ledger:
+            ledger.append_many(['I-A1-20240101000000-1', 'I-A2-20240101000000-2'], ['A1', 'A2'], 'interest',
+                               [0.5, 1.0], [100.5, 201.0])
+            self.assertEqual(2, ledger.pending)
+            ledger.append_many([f'I-A{i}-20240101000000-{i}' for i in range(3)], ['A0', 'A1', 'A2'], 'interest',
+                               [1, 2, 3], [4, 5, 6])
+            self.assertEqual(0, ledger.pending)
+        self.assertEqual(LedgerRecord('I-A2-20240101000000-2', 'A2', 'interest', 1.0, 201.0),
+                         list(read_records(self.path))[1])
+        self.assertEqual({'A0': 4.0, 'A1': 5.0, 'A2': 6.0}, replay(self.path))
+
+    def test_max_delay(self):
+        with Ledger(self.path, batch_size=1000, fsync='never', max_delay=0) as ledger:
+            ledger.append('D-A1-20240101000000-1', 'A1', 'deposit', 10, 10)
+            self.assertEqual(0, ledger.pending)
+        with self.assertRaises(ValueError):
+            Ledger(self.path, max_delay=-1)
+
+    def test_max_delay_without_appends(self):
+        with Ledger(self.path, batch_size=1000, fsync='never', max_delay=0.2) as ledger:
+            ledger.append('D-A1-20240101000000-1', 'A1', 'deposit', 10, 10)
+            self.assertEqual(1, ledger.pending)
+            # no further append comes, the background thread writes the record
+            deadline = time.monotonic() + 5
+            while ledger.pending and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(0, ledger.pending)
+            self.assertEqual(1, len(self.read_lines()))
+            ledger.append('D-A1-20240101000000-2', 'A1', 'deposit', 5, 15)
+        self.assertFalse(ledger._flush_thread.is_alive())
+        self.assertEqual(2, len(self.read_lines()))
+
+        with Ledger(self.path, batch_size=1000, fsync='never', max_delay=None) as ledger:
+            ledger.append('D-A1-20240101000000-3', 'A1', 'deposit', 1, 16)
+            time.sleep(0.1)
+            self.assertEqual(1, ledger.pending)
+            self.assertIsNone(ledger._flush_thread)
+        self.assertEqual(3, len(self.read_lines()))
+
+    def test_account_records_transactions(self):
+        Account.ledger = Ledger(self.path, fsync='never')
+        a = Account('A100', 'FIRST', 'LAST', initial_balance=100)
+        b = Account('B200', 'FIRST', 'LAST')
+        codes = [a.deposit(50), a.withdraw(500), a.withdraw(30), b.deposit(7), a.pay_interest()]
+        Account.ledger.close()
+
+        records = list(read_records(self.path))
+        self.assertEqual(codes, [record.confirmation_code for record in records[2:]])
+        self.assertEqual(['open', 'open', 'deposit', 'rejected', 'withdraw', 'deposit', 'interest'],
+                         [record.transaction for record in records])
+        self.assertEqual(('A100', 'open', 100.0, 100.0), records[0][1:])
+        self.assertTrue(records[0].confirmation_code.startswith('O-A100-'))
+        self.assertEqual(LedgerRecord(codes[2], 'A100', 'withdraw', 30.0, 120.0), records[4])
+        self.assertEqual({'A100': a.balance, 'B200': 7.0}, replay(self.path))
+
+    def test_opened_accounts_replayed(self):
+        Account.ledger = Ledger(self.path, fsync='never')
+        Account('A100', 'FIRST', 'LAST', initial_balance=100)
+        Account(7, 'FIRST', 'LAST', initial_balance=5)
+        Account.ledger.close()
+        # account numbers are stored as text
+        self.assertEqual({'A100': 100.0, '7': 5.0}, replay(self.path))
+
+    def test_replay(self):
+        self.assertEqual({}, replay(self.path))
+        with Ledger(self.path, fsync='never') as ledger:
+            for i in range(20000):
+                ledger.append(f'D-A{i % 7}-20240101000000-{i}', f'A{i % 7}', 'deposit', 1, i)
+        with open(self.path, 'a') as file:
+            file.write('D-A1-20240101000000-x\tA1\tdeposit\t1\t99')  # cut off by a crash
+        self.assertEqual({f'A{k}': float(max(range(k, 20000, 7))) for k in range(7)}, replay(self.path))
+        self.assertEqual(20000, sum(1 for _ in read_records(self.path)))
+
+        # reopening cuts the torn record off before appending
+        with Ledger(self.path) as ledger:
+            ledger.append('D-A1-20240101000001-y', 'A1', 'deposit', 1, 42)
+        self.assertEqual('D-A1-20240101000001-y\tA1\tdeposit\t1\t42', self.read_lines()[-1])
+        self.assertEqual(42.0, replay(self.path)['A1'])
+
+    def test_threads(self):
+        with Ledger(self.path, batch_size=64, fsync='never') as ledger:
+            def worker(n):
+                for i in range(2000):
+                    ledger.append(f'D-A{n}-20240101000000-{i}', f'A{n}', 'deposit', 1, i)
+
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(8000, len(self.read_lines()))
+        self.assertEqual({f'A{n}': 1999.0 for n in range(4)}, replay(self.path))
+
+
+class TestSnapshots(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'transactions.ledger')
+        self.snapshot_path = os.path.join(self.directory.name, 'balances.snapshot')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_snapshot_file(self):
+        balances = {'A100': 10.5, 'B7': 0.0, 'Ä1': 1e300}
+        write_snapshot(self.snapshot_path, balances, 1234)
+        self.assertEqual(Snapshot(balances, 1234), read_snapshot(self.snapshot_path))
+        self.assertEqual(24 + 8 * 3 + len('A100\nB7\nÄ1'.encode()), os.path.getsize(self.snapshot_path))
+        self.assertFalse(os.path.exists(self.snapshot_path + '.tmp'))
+
+        write_snapshot(self.snapshot_path, {7: 1.0, 'A8': 2.0}, 0)
+        self.assertEqual({'7': 1.0, 'A8': 2.0}, read_snapshot(self.snapshot_path).balances)
+        write_snapshot(self.snapshot_path, {}, 0)
+        self.assertEqual(Snapshot({}, 0), read_snapshot(self.snapshot_path))
+        with self.assertRaises(ValueError):
+            write_snapshot(self.snapshot_path, {'A\n1': 1.0}, 0)
+        # ints and fractions that are exact floats are fine, anything a float64 would round is not
+        write_snapshot(self.snapshot_path, {'A1': 100, 'A2': Fraction(1, 4)}, 0)
+        self.assertEqual({'A1': 100.0, 'A2': 0.25}, read_snapshot(self.snapshot_path).balances)
+        for balance in (Fraction(1, 3), Decimal('0.1'), 2 ** 53 + 1):
+            with self.assertRaises(ValueError):
+                write_snapshot(self.snapshot_path, {'A1': balance}, 0)
+
+        with open(self.snapshot_path, 'wb') as file:
+            file.write(b'not a snapshot at all, really')
+        with self.assertRaises(ValueError):
+            read_snapshot(self.snapshot_path)
+
+    def test_incremental_recovery(self):
+        with Ledger(self.path, fsync='never') as ledger:
+            for i in range(5000):
+                ledger.append(f'D-A{i % 13}-20240101000000-{i}', f'A{i % 13}', 'deposit', 1, i)
+            ledger.snapshot(self.snapshot_path, replay(self.path) | {'A0': 4992.0})
+            snapshot_offset = ledger.position
+            self.assertEqual(snapshot_offset, read_snapshot(self.snapshot_path).ledger_offset)
+            for i in range(5000, 5100):
+                ledger.append(f'D-A{i % 7}-20240101000000-{i}', f'A{i % 7}', 'deposit', 1, i)
+
+        self.assertEqual(replay(self.path), recover(self.path, self.snapshot_path))
+        self.assertEqual(replay(self.path), recover(self.path))
+        # only the tail is replayed: records before the snapshot offset are not read again
+        tail = replay(self.path, start=snapshot_offset)
+        self.assertEqual(7, len(tail))
+        self.assertEqual(recover(self.path, self.snapshot_path), {**read_snapshot(self.snapshot_path).balances, **tail})
+
+    def test_recover_number(self):
+        with Ledger(self.path, batch_size=1, fsync='never') as ledger:
+            ledger.append('D-A1-20240101000000-1', 'A1', 'deposit', 0.1, 0.1)
+            ledger.append('D-A2-20240101000000-2', 'A2', 'deposit', 0.2, 0.2)
+            ledger.snapshot(self.snapshot_path, replay(self.path))
+            ledger.append('D-A2-20240101000000-3', 'A2', 'deposit', 0.1, 0.30000000000000004)
+        expected = {'A1': Decimal('0.1'), 'A2': Decimal('0.30000000000000004')}
+        self.assertEqual(expected, replay(self.path, Decimal))
+        self.assertEqual(expected, recover(self.path, self.snapshot_path, Decimal))
+        self.assertEqual(Fraction(1, 10), recover(self.path, self.snapshot_path, Fraction)['A1'])
+
+    def test_periodic_snapshots(self):
+        with self.assertRaises(ValueError):
+            Ledger(self.path, snapshot_path=self.snapshot_path)
+
+        balances = {}
+        with Ledger(self.path, batch_size=10, fsync='never', snapshot_path=self.snapshot_path,
+                    balances=lambda: balances, snapshot_every=25) as ledger:
+            for i in range(30):
+                balances[f'A{i % 3}'] = float(i)
+                ledger.append(f'D-A{i % 3}-20240101000000-{i}', f'A{i % 3}', 'deposit', 1, i)
+            # the group of records 20-29 brought the count to 30, the snapshot covers all of them
+            ledger._snapshot_thread.join()
+            self.assertEqual(Snapshot({'A0': 27.0, 'A1': 28.0, 'A2': 29.0}, ledger.position),
+                             read_snapshot(self.snapshot_path))
+            balances['A0'] = 30.0
+            ledger.append('D-A0-20240101000000-30', 'A0', 'deposit', 1, 30)
+        self.assertEqual({'A0': 30.0, 'A1': 28.0, 'A2': 29.0}, recover(self.path, self.snapshot_path))
+
+    def test_periodic_snapshot_outside_lock(self):
+        # balances() needs a lock that the appending thread holds, like AccountRegistry's shard locks
+        lock = threading.Lock()
+
+        def balances():
+            with lock:
+                return {'A0': 5.0}
+
+        with Ledger(self.path, batch_size=1, fsync='never', snapshot_path=self.snapshot_path, balances=balances,
+                    snapshot_every=5) as ledger:
+            with lock:
+                for i in range(5):
+                    ledger.append(f'D-A0-20240101000000-{i}', 'A0', 'deposit', 1, i + 1)
+        self.assertEqual(Snapshot({'A0': 5.0}, os.path.getsize(self.path)), read_snapshot(self.snapshot_path))
+
+    def test_failed_periodic_snapshot(self):
+        def balances():
+            raise OSError('No space left on device')
+
+        with self.assertLogs('OOP.ledger', 'ERROR'):
+            with Ledger(self.path, batch_size=1, fsync='never', snapshot_path=self.snapshot_path,
+                        balances=balances, snapshot_every=2) as ledger:
+                for i in range(3):
+                    ledger.append(f'D-A0-20240101000000-{i}', 'A0', 'deposit', 1, i + 1)
+        self.assertFalse(os.path.exists(self.snapshot_path))
+        self.assertEqual({'A0': 3.0}, replay(self.path))
+
+
+def run_tests(test_class):
+    suite = unittest.TestLoader().loadTestsFromTestCase(test_class)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
+
+
+run_tests(TestLedger)
+run_tests(TestSnapshots)
@@ -0,0 +1,35 @@
+from OOP.loan_portfolio import evaluate_portfolio, random_portfolio
+from OOP.credit_calculator import calculate
+import unittest
+
+"""Basic tests performed on the portfolio evaluator in the loan_portfolio file."""
+
+
+class TestPortfolio(unittest.TestCase):
+    def setUp(self) -> None:
+        self.loans = list(random_portfolio(500, seed=1))
+        self.loans.append({'type': 'annuity', 'principal': 1000, 'payment': 1, 'interest': 10})
+
+    def test_evaluate_in_process(self):
+        report = evaluate_portfolio(self.loans, workers=1, chunk_size=64)
+        results = [calculate(loan) for loan in self.loans[:-1]]
+        self.assertEqual(len(self.loans), report.loans)
+        self.assertEqual(1, report.errors)
+        self.assertEqual(sum(result['overpayment'] for result in results), report.total_overpayment)
+        self.assertEqual(len(results), sum(report.terms.values()))
+        self.assertEqual(sum(result['periods'] == 12 for result in results), report.terms[12])
+
+    def test_evaluate_in_pool(self):
+        single = evaluate_portfolio(self.loans, workers=1, chunk_size=64)
+        pool = evaluate_portfolio(iter(self.loans), workers=2, chunk_size=64)
+        self.assertEqual(single[:4], pool[:4])
+        self.assertGreater(pool.loans_per_second, 0)
+
+
+def run_tests(test_class):
+    suite = unittest.TestLoader().loadTestsFromTestCase(test_class)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
+
+
+run_tests(TestPortfolio)
@@ -0,0 +1,112 @@
+from OOP.mod_poly import ModPoly
+from OOP.modular_arithmetic import Mod, ModArray
+import random
+import unittest
+
+"""Basic tests performed on the ModPoly class in the mod_poly file."""
+
+
+def naive_product(a, b, modulus):
+    result = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        for j, y in enumerate(b):
+            result[i + j] = (result[i + j] + x * y) % modulus
+    while result and not result[-1]:
+        result.pop()
+    return result
+
+
+class TestModPoly(unittest.TestCase):
+    def setUp(self) -> None:
+        self.random = random.Random(15)
+        # NTT prime, CRT-sized, small, 61-bit and object-backed moduli
+        self.moduli = (998244353, 10 ** 9 + 7, 7, 2 ** 61 - 1, 2 ** 127 - 1)
+
+    def random_poly(self, length, modulus):
+        coefficients = [self.random.randrange(modulus) for _ in range(length)]
+        coefficients[-1] = coefficients[-1] or 1
+        return coefficients
+
+    def test_create_mod_poly(self):
+        p = ModPoly([8, -1, 3, 0, 0], 3)
+        self.assertEqual([2, 2], p.coefficients.tolist())
+        self.assertEqual(1, p.degree)
+        self.assertEqual(3, p.modulus)
+        self.assertEqual(Mod(2, 3), p[1])
+        self.assertEqual(Mod(0, 3), p[5])
+        self.assertEqual('ModPoly([2, 2], 3)', repr(p))
+        self.assertEqual(-1, ModPoly([0, 0], 5).degree)
+        self.assertEqual(ModPoly([4], 7), 4)
+        self.assertEqual(hash(ModPoly([1, 2], 7)), hash(ModPoly([8, 9], 7)))
+
+        with self.assertRaises(ValueError):
+            ModPoly([1], 0)
+        with self.assertRaises(TypeError):
+            ModPoly([1.5], 3)
+        self.assertEqual([2 ** 63, 5], ModPoly([2 ** 63, 5], 2 ** 70).coefficients.tolist())
+
+    def test_math_operations(self):
+        p, q = ModPoly([1, 2, 3], 7), ModPoly([6, 5], 7)
+        self.assertEqual(ModPoly([0, 0, 3], 7), p + q)
+        self.assertEqual(ModPoly([2, 4, 3], 7), p - q)
+        self.assertEqual(ModPoly([5, 2, 3], 7), p + 4)
+        self.assertEqual(ModPoly([3, 5, 4], 7), 4 - p)
+        self.assertEqual(ModPoly([2, 4, 6], 7), Mod(2, 7) * p)
+        self.assertEqual(ModPoly([1, 3, 3, 1], 7), ModPoly([1, 1], 7) ** 3)
+        self.assertEqual(ModPoly([6, 3, 0, 1], 7), p * q)
+        with self.assertRaises(TypeError):
+            p + ModPoly([1], 5)
+        with self.assertRaises(TypeError):
+            p * Mod(1, 5)
+
+    def test_multiplication(self):
+        # the lengths cover the schoolbook, Karatsuba (balanced and unbalanced) and NTT paths
+        for m in self.moduli:
+            for la, lb in ((1, 1), (5, 3), (40, 40), (100, 37), (257, 130), (300, 5), (33, 200)):
+                a, b = self.random_poly(la, m), self.random_poly(lb, m)
+                self.assertEqual(naive_product(a, b, m), (ModPoly(a, m) * ModPoly(b, m)).coefficients.tolist())
+
+    def test_large_product(self):
+        for m in (998244353, 10 ** 9 + 7):
+            a, b = ModPoly(self.random_poly(20001, m), m), ModPoly(self.random_poly(20001, m), m)
+            product = a * b
+            self.assertEqual(40000, product.degree)
+            for x in (0, 1, 12345):
+                self.assertEqual(a(x) * b(x), product(x))
+
+    def test_divmod(self):
+        for m in self.moduli:
+            # short quotients use long division, long ones Newton iteration
+            for la, lb in ((10, 3), (100, 60), (300, 20), (5, 9)):
+                a, b = ModPoly(self.random_poly(la, m), m), ModPoly(self.random_poly(lb, m), m)
+                quotient, remainder = divmod(a, b)
+                self.assertEqual(a, quotient * b + remainder)
+                self.assertLess(remainder.degree, b.degree)
+                self.assertEqual(quotient, a // b)
+                self.assertEqual(remainder, a % b)
+        with self.assertRaises(ZeroDivisionError):
+            divmod(ModPoly([1, 2], 7), ModPoly([0], 7))
+        with self.assertRaises(ValueError):
+            divmod(ModPoly([1, 2, 3], 8), ModPoly([1, 2], 8))
+
+    def test_evaluation(self):
+        p = ModPoly([1, 2, 3], 7)
+        self.assertEqual(Mod(3, 7), p(2))
+        self.assertEqual(Mod(3, 7), p(Mod(2, 7)))
+        self.assertEqual(Mod(0, 7), ModPoly([], 7)(3))
+        self.assertEqual([1, 6, 3, 6], p.evaluate([0, 1, 2, 3]).tolist())
+        for m in self.moduli:
+            p = ModPoly(self.random_poly(50, m), m)
+            points = [self.random.randrange(m) for _ in range(20)]
+            self.assertEqual([p(x).value for x in points], p.evaluate(ModArray(points, m)).tolist())
+        with self.assertRaises(TypeError):
+            p.evaluate(ModArray([1], 5))
+
+
+def run_tests(test_class):
+    suite = unittest.TestLoader().loadTestsFromTestCase(test_class)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
+
+
+run_tests(TestModPoly)
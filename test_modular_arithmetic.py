@@ -1,7 +1,13 @@
-from OOP.modular_arithmetic import Mod
+from OOP.modular_arithmetic import Mod, ModArray, ModContext, mod_context, batch_inverse, crt, SMALL_MODULUS_LIMIT
+from OOP import modular_arithmetic
+import copy
+import pickle
+import random
+import threading
 import unittest
+from math import gcd
 
-"""Basic tests performed on the Mod class in the modular_arithmetic file."""
+"""Basic tests performed on the Mod, ModArray and ModContext classes in the modular_arithmetic file."""
 
 
 class TestMod(unittest.TestCase):
@@ -10,7 +16,7 @@ class TestMod(unittest.TestCase):
 
     def test_create_mod(self):
         x = Mod(8, 3)
-        self.assertEqual(8, x._value)
+        self.assertEqual(2, x._value)
         self.assertEqual(2, x.value)
         self.assertEqual(3, x._modulus)
         self.assertEqual(3, x.modulus)
@@ -30,6 +36,58 @@ class TestMod(unittest.TestCase):
         with self.assertRaises(TypeError):
             x = Mod('d', 3)
 
+    def test_slots(self):
+        x = Mod(-8, 3)
+        self.assertFalse(hasattr(x, '__dict__'))
+        self.assertEqual(1, x._value)
+        with self.assertRaises(AttributeError):
+            x.other = 1
+
+    def test_interning(self):
+        self.assertIs(Mod(3, 7) + 1, Mod(2, 7) + 2)
+        self.assertIs(Mod(3, 7) * Mod(2, 7), -Mod(1, 7))
+        self.assertEqual(Mod(6, 7), Mod(3, 7) * Mod(2, 7))
+        big = Mod(3, SMALL_MODULUS_LIMIT + 1)
+        self.assertIsNot(big + 1, big + 1)
+
+        class SubMod(Mod):
+            pass
+
+        self.assertIsNot(SubMod(3, 7), SubMod(3, 7))
+        self.assertIsInstance(SubMod(3, 7) + 1, SubMod)
+
+    def test_interning_limit(self):
+        moduli = range(SMALL_MODULUS_LIMIT - 40, SMALL_MODULUS_LIMIT + 1)
+
+        def use(offset):
+            for m in moduli[offset::4]:
+                self.assertEqual(2, (Mod(1, m) + 1).value)
+
+        threads = [threading.Thread(target=use, args=(offset,)) for offset in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        tables = modular_arithmetic._interned
+        self.assertEqual(sum(map(len, tables.values())), modular_arithmetic._interned_slots)
+        self.assertLessEqual(modular_arithmetic._interned_slots, modular_arithmetic._INTERNED_SLOTS_LIMIT)
+        self.assertLessEqual(len(tables), 4)
+        self.assertIs(Mod(3, 7) + 1, Mod(2, 7) + 2)
+
+    def test_immutable(self):
+        x = Mod(3, 7)
+        y = x
+        x += 1
+        x *= 3
+        self.assertEqual(Mod(5, 7), x)
+        self.assertEqual(Mod(3, 7), y)
+        self.assertEqual(Mod(3, 7), Mod(3, 7))
+
+    def test_copy_and_pickle(self):
+        for x in (Mod(3, 7), Mod(3, 2 ** 127 - 1)):
+            self.assertEqual(x, pickle.loads(pickle.dumps(x)))
+            self.assertEqual(x, copy.deepcopy(x))
+
     def test_representation(self):
         x = Mod(8, 3)
         self.assertEqual(repr(x), f'Mod({x.value}, {x.modulus})')
@@ -42,6 +100,8 @@ class TestMod(unittest.TestCase):
         for mod in (Mod(7, 3), Mod(8, 2), 1, 9):
             self.assertNotEqual(x, mod)
 
+        self.assertEqual({Mod(2, 3)}, {Mod(8, 3), Mod(-1, 3)})
+
     def test_hash(self):
         x = Mod(8, 3)
         self.assertEqual(hash(x), hash((x.value, x.modulus)))
@@ -68,7 +128,7 @@ class TestMod(unittest.TestCase):
         self.assertEqual(x * 3, Mod(24, 3))
         self.assertEqual(3 * x, Mod(24, 3))
         self.assertEqual(x ** y, Mod(8, 3))
-        self.assertEqual(x ** 5, Mod(64, 3))
+        self.assertEqual(x ** 5, Mod(32, 3))
         self.assertEqual(5 ** x, Mod(25, 3))
         self.assertTrue(x > y)
         self.assertTrue(x >= y)
@@ -85,6 +145,300 @@ class TestMod(unittest.TestCase):
         with self.assertRaises(TypeError):
             x ** z
 
+    def test_in_place_operations(self):
+        x = Mod(8, 3)
+        x += 7
+        self.assertEqual(Mod(15, 3), x)
+        x -= 10
+        self.assertEqual(Mod(5, 3), x)
+        x *= 7
+        self.assertEqual(Mod(35, 3), x)
+        x **= 5
+        self.assertEqual(Mod(32, 3), x)
+        self.assertEqual(2, x._value)
+
+    def test_pow(self):
+        x = Mod(3, 7)
+        self.assertEqual(Mod(3 ** 10, 7), x ** 10)
+        self.assertEqual(Mod(2 ** 3, 7), 2 ** x)
+        self.assertEqual(Mod(5, 7), x ** -1)
+        self.assertEqual(Mod(1, 7), x ** -2 * x ** 2)
+        self.assertEqual(Mod(1, 7), x ** 0)
+        with self.assertRaises(ValueError):
+            Mod(2, 4) ** -1
+
+    def test_pow_modulo(self):
+        x = Mod(5, 12)
+        self.assertEqual(Mod(5 ** 3, 4), pow(x, 3, 4))
+        self.assertEqual(4, pow(x, 3, 4).modulus)
+        with self.assertRaises(ValueError):
+            pow(x, 3, 5)
+
+    def test_inverse(self):
+        x = Mod(3, 7)
+        self.assertEqual(Mod(5, 7), x.inverse())
+        self.assertEqual(Mod(1, 7), x * x.inverse())
+        self.assertEqual(Mod(0, 1), Mod(5, 1).inverse())
+        with self.assertRaises(ValueError):
+            Mod(4, 8).inverse()
+
+    def test_division(self):
+        x, y = Mod(3, 7), Mod(5, 7)
+        self.assertEqual(x, x / y * y)
+        self.assertEqual(Mod(3 * 3, 7), x / 5)
+        self.assertEqual(Mod(2 * 5, 7), 2 / x)
+        x /= y
+        self.assertEqual(Mod(3 * 3, 7), x)
+        with self.assertRaises(ValueError):
+            Mod(1, 8) / 2
+        with self.assertRaises(TypeError):
+            x / Mod(1, 5)
+
+    def test_batch_inverse(self):
+        modulus = 2 ** 127 - 1
+        values = [Mod(value, modulus) for value in (2, 3, 10 ** 30, modulus - 1, 1)]
+        self.assertEqual([value.inverse() for value in values], batch_inverse(values))
+        self.assertEqual([Mod(4, 7), Mod(5, 7)], mod_context(7).batch_inverse([2, Mod(3, 7)]))
+        self.assertEqual([], batch_inverse([]))
+        with self.assertRaises(ValueError):
+            batch_inverse([Mod(2, 8), Mod(3, 8)])
+
+    def test_crt(self):
+        x = crt([Mod(2, 3), Mod(3, 5), Mod(2, 7)])
+        self.assertEqual(Mod(23, 105), x)
+        big = crt([Mod(12345, 2 ** 61 - 1), Mod(678, 2 ** 31 - 1), Mod(9, 10)])
+        self.assertEqual(12345, big.value % (2 ** 61 - 1))
+        self.assertEqual(678, big.value % (2 ** 31 - 1))
+        self.assertEqual(9, big.value % 10)
+        with self.assertRaises(ValueError):
+            crt([Mod(1, 4), Mod(1, 6)])
+        with self.assertRaises(TypeError):
+            crt([Mod(1, 4), 3])
+
+    def test_pow_large_modulus(self):
+        modulus = 2 ** 2048 - 1942289  # a 2048-bit modulus
+        x = Mod(3, modulus)
+        y = x ** (2 ** 2048)
+        self.assertEqual(pow(3, 2 ** 2048, modulus), y.value)
+        self.assertLess(y._value, modulus)
+        self.assertEqual(Mod(1, modulus), y * y ** -1)
+
+
+class TestModArray(unittest.TestCase):
+    def setUp(self) -> None:
+        self.moduli = (7, 2 ** 31 - 1, 2 ** 40 + 15, 2 ** 61 - 1, 2 ** 62, 2 ** 127 - 1)
+        self.a = [-10 ** 20, -5, 0, 3, 12345678901234, 2 ** 70 + 1]
+        self.b = [1, 2, 3, 2 ** 33, 99, 7 ** 30]
+
+    def test_create_mod_array(self):
+        x = ModArray([8, -1, 3], 3)
+        self.assertEqual([2, 2, 0], x.tolist())
+        self.assertEqual(3, x.modulus)
+        self.assertEqual(3, len(x))
+        self.assertEqual(Mod(2, 3), x[0])
+        self.assertEqual([Mod(2, 3), Mod(2, 3), Mod(0, 3)], list(x))
+        self.assertEqual([2, 0], x[1:].tolist())
+        self.assertEqual('ModArray([2, 2, 0], 3)', repr(x))
+
+        with self.assertRaises(ValueError):
+            ModArray([1], 0)
+        with self.assertRaises(TypeError):
+            ModArray([1.5], 3)
+        with self.assertRaises(TypeError):
+            ModArray([1], 3.5)
+
+    def test_residues_past_int64(self):
+        x = ModArray([2 ** 63, 5], 2 ** 70)
+        self.assertEqual([2 ** 63, 5], x.tolist())
+        self.assertEqual([2 ** 63 - 1, 5], ModArray([-1, 2 ** 63 + 5], 2 ** 63).tolist())
+        self.assertEqual([[5], [1]], ModArray([[2 ** 64 + 5], [1]], 2 ** 62).tolist())
+        with self.assertRaises(TypeError):
+            ModArray([2 ** 63, 1.5], 2 ** 70)
+
+    def test_math_operations(self):
+        for m in self.moduli:
+            x, y = ModArray(self.a, m), ModArray(self.b, m)
+            a, b = [v % m for v in self.a], [v % m for v in self.b]
+            self.assertEqual([(i + j) % m for i, j in zip(a, b)], (x + y).tolist())
+            self.assertEqual([(i - j) % m for i, j in zip(a, b)], (x - y).tolist())
+            self.assertEqual([(i * j) % m for i, j in zip(a, b)], (x * y).tolist())
+            self.assertEqual([-i % m for i in a], (-x).tolist())
+            self.assertEqual([pow(i, 2 ** 70, m) for i in a], (x ** 2 ** 70).tolist())
+            self.assertEqual([pow(i, j, m) for i, j in zip(a, self.b)], (x ** self.b).tolist())
+            self.assertEqual([pow(3, j, m) for j in b], (3 ** y).tolist())
+            self.assertEqual([(i * b[1]) % m for i in a], (x * ModArray(self.b[1], m)).tolist())
+
+    def test_broadcasting(self):
+        x = ModArray([1, 2, 3], 7)
+        self.assertEqual([6, 0, 1], (x + 5).tolist())
+        self.assertEqual([6, 0, 1], (5 + x).tolist())
+        self.assertEqual([6, 0, 1], (Mod(5, 7) + x).tolist())
+        self.assertEqual([3, 2, 1], (4 - x).tolist())
+        self.assertEqual([3, 6, 2], (Mod(3, 7) * x).tolist())
+        self.assertEqual([2, 4, 1], (Mod(2, 7) ** x).tolist())
+        self.assertEqual([[2, 3, 4], [5, 6, 0]], (x + ModArray([[1], [4]], 7)).tolist())
+        with self.assertRaises(TypeError):
+            x + Mod(1, 5)
+        with self.assertRaises(TypeError):
+            x + ModArray([1, 2, 3], 5)
+
+    def test_negative_power(self):
+        x = ModArray([2, 3, 4], 2 ** 61 - 1)
+        self.assertEqual([1, 1, 1], (x * x ** -1).tolist())
+        with self.assertRaises(ValueError):
+            ModArray([2], 4) ** -1
+
+    def test_unsigned_power(self):
+        import numpy as np
+        exponents = np.array([2 ** 63 + 1, 2], dtype=np.uint64)
+        self.assertEqual([pow(3, 2 ** 63 + 1, 7), 4], (ModArray([3, 5], 7) ** exponents).tolist())
+        self.assertEqual([2, 4], (ModArray([2, 2], 7) ** np.array([1, 2], dtype=np.uint64)).tolist())
+
+    def test_comparison(self):
+        x = ModArray([1, 5, 3], 7)
+        self.assertEqual([False, True, False], (x == Mod(5, 7)).tolist())
+        self.assertEqual([False, True, False], (Mod(5, 7) == x).tolist())
+        self.assertEqual([True, False, True], (x < 4).tolist())
+        self.assertEqual([False, True, False], (Mod(4, 7) < x).tolist())
+        self.assertEqual([False, True, True], (x >= ModArray([2, 5, 1], 7)).tolist())
+        with self.assertRaises(TypeError):
+            hash(x)
+
+    def test_reductions(self):
+        for m in self.moduli:
+            x = ModArray(self.a * 50, m)
+            product = 1
+            for value in self.a * 50:
+                product = product * value % m
+            self.assertEqual(Mod(sum(self.a * 50), m), x.sum())
+            self.assertEqual(Mod(product, m), x.prod())
+        self.assertEqual(Mod(0, 5), ModArray([], 5).sum())
+        self.assertEqual(Mod(1, 5), ModArray([], 5).prod())
+
+
+class TestModContext(unittest.TestCase):
+    def test_inverse_cache(self):
+        context = ModContext(10007)
+        for value in range(1, ModContext._INVERSE_CACHE_SIZE + 100):
+            self.assertEqual(1, value * context.inverse_value(value) % 10007)
+        self.assertEqual(ModContext._INVERSE_CACHE_SIZE, len(context._inverses))
+        self.assertNotIn(1, context._inverses)
+
+    def test_inverse_cache_threads(self):
+        context, errors = ModContext(10007), []
+
+        def worker(offset):
+            for value in range(1 + offset, 3000, 3):
+                if value * context.inverse_value(value) % 10007 != 1:
+                    errors.append(value)
+
+        threads = [threading.Thread(target=worker, args=(offset % 3,)) for offset in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        self.assertEqual(ModContext._INVERSE_CACHE_SIZE, len(context._inverses))
+
+    def test_create_context(self):
+        self.assertIs(mod_context(97), mod_context(97))
+        self.assertEqual(97, mod_context(97).modulus)
+        with self.assertRaises(ValueError):
+            ModContext(0)
+        with self.assertRaises(TypeError):
+            ModContext(9.5)
+
+    def test_operations(self):
+        context = mod_context(97)
+        self.assertEqual(Mod(3 * 40, 97), context.mul(3, Mod(40, 97)))
+        self.assertEqual(Mod(3, 97) ** -1, context.pow(Mod(3, 97), -1))
+        with self.assertRaises(TypeError):
+            context.mul(3, Mod(40, 96))
+
+    def test_product(self):
+        for modulus in (2 ** 64, 2 ** 255 - 19, 2 ** 4253 - 1, 2 ** 4253):
+            values = [modulus - 1, 3, 10 ** 30, Mod(12345, modulus)] * 5
+            expected = 1
+            for value in values:
+                expected = expected * int(value) % modulus
+            self.assertEqual(Mod(expected, modulus), mod_context(modulus).product(values))
+        self.assertEqual(Mod(1, 7), mod_context(7).product([]))
+
+
+class TestModProperties(unittest.TestCase):
+    """Randomized cross-checks of the fast paths (interning, exact type dispatch, ModContext reductions, batch
+    inversion, ModArray) against the same arithmetic on plain integers. The seed is fixed, so a failure repeats."""
+    def setUp(self) -> None:
+        self.random = random.Random(16)
+        # small (interned), 64-bit and 2048-bit primes, composite and even moduli, and a 4096+ bit one for Montgomery
+        self.moduli = (2, 97, 65521, 65536, 2 ** 64 - 59, 2 ** 64, 3 ** 40, 2 ** 2048 - 1942289, 2 ** 4253 - 1)
+
+    def operands(self, modulus, count=200):
+        for _ in range(count):
+            bound = modulus * self.random.choice((1, 3, 2 ** 70))
+            yield self.random.randrange(-bound, bound), self.random.randrange(-bound, bound)
+
+    def test_operators(self):
+        for m in self.moduli:
+            for a, b in self.operands(m):
+                x, y = Mod(a, m), Mod(b, m)
+                self.assertEqual((a + b) % m, (x + y).value)
+                self.assertEqual((a + b) % m, (x + b).value)
+                self.assertEqual((a + b) % m, (a + y).value)
+                self.assertEqual((a - b) % m, (x - y).value)
+                self.assertEqual((a - b) % m, (a - y).value)
+                self.assertEqual((a * b) % m, (x * y).value)
+                self.assertEqual((a * b) % m, (a * y).value)
+                self.assertEqual(-a % m, (-x).value)
+                self.assertEqual(a % m == b % m, x == y)
+                self.assertEqual(a % m < b % m, x < y)
+                self.assertEqual(x, Mod(a + m, m))
+                self.assertEqual(hash(x), hash(Mod(a + m, m)))
+
+    def test_pow_and_division(self):
+        for m in self.moduli:
+            for a, b in self.operands(m, 50):
+                x, y, e = Mod(a, m), Mod(b, m), abs(b) % 2 ** 80
+                self.assertEqual(pow(a, e, m), (x ** e).value)
+                if gcd(b, m) == 1:
+                    inverse = pow(b, -1, m)
+                    self.assertEqual(inverse, y.inverse().value)
+                    self.assertEqual(a * inverse % m, (x / y).value)
+                    self.assertEqual(pow(inverse, e, m), (y ** -e).value)
+                else:
+                    with self.assertRaises(ValueError):
+                        y.inverse()
+
+    def test_context(self):
+        for m in self.moduli:
+            context = ModContext(m)
+            values = [a for a, _ in self.operands(m, 100)]
+            expected = 1
+            for value in values:
+                expected = expected * value % m
+            self.assertEqual(expected, context.product(values).value)
+            units = [value for value in values if gcd(value, m) == 1]
+            self.assertEqual([pow(value, -1, m) for value in units], [v.value for v in context.batch_inverse(units)])
+
+    def test_crt(self):
+        moduli = (65521, 2 ** 64 - 59, 3 ** 40, 2 ** 61)
+        product = 65521 * (2 ** 64 - 59) * 3 ** 40 * 2 ** 61
+        for _ in range(100):
+            a = self.random.randrange(product)
+            self.assertEqual(Mod(a, product), crt(Mod(a, m) for m in moduli))
+
+    def test_mod_array(self):
+        for m in self.moduli:
+            pairs = list(self.operands(m, 100))
+            a, b = [p[0] for p in pairs], [p[1] for p in pairs]
+            x, y = ModArray(a, m), ModArray(b, m)
+            self.assertEqual([(i + j) % m for i, j in pairs], (x + y).tolist())
+            self.assertEqual([(i - j) % m for i, j in pairs], (x - y).tolist())
+            self.assertEqual([(i * j) % m for i, j in pairs], (x * y).tolist())
+            exponents = [abs(j) % 2 ** 80 for j in b]
+            self.assertEqual([pow(i, e, m) for i, e in zip(a, exponents)], (x ** exponents).tolist())
+            self.assertEqual([Mod(i * j, m) for i, j in pairs], [x[k] * y[k] for k in range(len(pairs))])
+
 
 def run_tests(test_class):
     suite = unittest.TestLoader().loadTestsFromTestCase(test_class)
@@ -93,3 +447,6 @@ def run_tests(test_class):
 
 
 run_tests(TestMod)
+run_tests(TestModArray)
+run_tests(TestModContext)
+run_tests(TestModProperties)